@@ -0,0 +1,96 @@
+"""add numeric coordinates and grid cell to jobs
+
+Revision ID: add_jobs_geo_columns
+Revises: unique_zan_crew_user_id
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from infrastructure.db.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_jobs_geo_columns'
+down_revision: Union[str, None] = 'unique_zan_crew_user_id'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match core.geo: 0.1 degree cells, 1800 rows x 3600 columns
+_NUMBER = r"'^\s*[-+]?[0-9]+(\.[0-9]+)?\s*$'"
+_LATITUDE = f"""CASE WHEN latitude ~ {_NUMBER}
+                      AND CAST(latitude AS double precision) BETWEEN -90 AND 90
+                     THEN CAST(latitude AS double precision) END"""
+_LONGITUDE = f"""CASE WHEN longitude ~ {_NUMBER}
+                       AND CAST(longitude AS double precision) BETWEEN -180 AND 180
+                      THEN CAST(longitude AS double precision) END"""
+
+# Rows backfilled per transaction, so no statement holds row locks on more
+# than a slice of jobs at a time
+BACKFILL_BATCH = 5000
+
+
+def upgrade() -> None:
+    # Check if table and columns exist
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'jobs' not in inspector.get_table_names():
+        return
+
+    # Nullable columns without a default are a catalog-only change
+    columns = [col['name'] for col in inspector.get_columns('jobs')]
+    if 'geo_lat' not in columns:
+        op.add_column('jobs', sa.Column('geo_lat', sa.Float(), nullable=True))
+    if 'geo_lng' not in columns:
+        op.add_column('jobs', sa.Column('geo_lng', sa.Float(), nullable=True))
+    if 'geo_cell' not in columns:
+        op.add_column('jobs', sa.Column('geo_cell', sa.Integer(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        # Backfill from the string coordinates in job_id ranges, each committed
+        # on its own, skipping values that are not numbers or are out of range.
+        # Rows the application has already filled in are left alone, so an
+        # interrupted run can simply be repeated
+        first, last = conn.execute(sa.text("SELECT min(job_id), max(job_id) FROM jobs")).one()
+        for start in range(first or 0, (last or -1) + 1, BACKFILL_BATCH):
+            op.execute(sa.text(f"""
+                UPDATE jobs SET
+                    geo_lat = parsed.lat,
+                    geo_lng = parsed.lng,
+                    geo_cell = CASE WHEN parsed.lat IS NOT NULL AND parsed.lng IS NOT NULL THEN CAST(
+                        LEAST(FLOOR((parsed.lat + 90.0) / 0.1), 1799) * 3600
+                        + LEAST(FLOOR((parsed.lng + 180.0) / 0.1), 3599) AS integer) END
+                FROM (
+                    SELECT job_id, {_LATITUDE} AS lat, {_LONGITUDE} AS lng
+                    FROM jobs
+                    WHERE job_id >= :start AND job_id < :end AND geo_cell IS NULL
+                ) AS parsed
+                WHERE jobs.job_id = parsed.job_id
+                  AND (parsed.lat IS NOT NULL OR parsed.lng IS NOT NULL)
+            """).bindparams(start=start, end=start + BACKFILL_BATCH))
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building
+        # without it would block writes to jobs for the whole build
+        create_index_concurrently(conn, 'ix_jobs_geo_cell', 'jobs', ['geo_cell'])
+
+
+def downgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'jobs' not in inspector.get_table_names():
+        return
+
+    with op.get_context().autocommit_block():
+        drop_index_concurrently(conn, 'ix_jobs_geo_cell', 'jobs')
+
+    columns = [col['name'] for col in inspector.get_columns('jobs')]
+    for name in ('geo_cell', 'geo_lng', 'geo_lat'):
+        if name in columns:
+            op.drop_column('jobs', name)
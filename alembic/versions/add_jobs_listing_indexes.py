@@ -0,0 +1,64 @@
+"""add composite indexes for filtered job listing
+
+Revision ID: add_jobs_listing_indexes
+Revises: add_jobs_search_columns
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from infrastructure.db.migrations import create_index_concurrently, drop_index_concurrently, index_state
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_jobs_listing_indexes'
+down_revision: Union[str, None] = 'add_jobs_search_columns'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Equality filter first, then the (sort column, job_id) keyset order of GET /jobs
+INDEXES = [
+    ('ix_jobs_payment_status_scheduled_at', ['payment_status', 'scheduled_at', 'job_id']),
+    ('ix_jobs_bucket_scheduled_at', ['bucket', 'scheduled_at', 'job_id']),
+    ('ix_jobs_assigned_scheduled_at', ['assigned_zancrew_user_id', 'scheduled_at', 'job_id']),
+    ('ix_jobs_scheduled_at_job_id', ['scheduled_at', 'job_id']),
+]
+# Single-column indexes made redundant by the composites above
+SUPERSEDED = [
+    ('ix_jobs_assigned_zancrew_user_id', ['assigned_zancrew_user_id']),
+    ('ix_jobs_scheduled_at', ['scheduled_at']),
+]
+
+
+def upgrade() -> None:
+    # Check if table exists
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    if 'jobs' not in inspect(conn).get_table_names():
+        return
+
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            create_index_concurrently(conn, name, 'jobs', columns)
+        for name, columns in SUPERSEDED:
+            drop_index_concurrently(conn, name, 'jobs')
+        # Keep the model's name for the (scheduled_at, job_id) index
+        if index_state(conn, 'ix_jobs_scheduled_at') is None:
+            op.execute('ALTER INDEX IF EXISTS ix_jobs_scheduled_at_job_id RENAME TO ix_jobs_scheduled_at')
+
+
+def downgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    if 'jobs' not in inspect(conn).get_table_names():
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute('ALTER INDEX IF EXISTS ix_jobs_scheduled_at RENAME TO ix_jobs_scheduled_at_job_id')
+        for name, columns in SUPERSEDED:
+            create_index_concurrently(conn, name, 'jobs', columns)
+        for name, columns in reversed(INDEXES):
+            drop_index_concurrently(conn, name, 'jobs')
@@ -0,0 +1,77 @@
+"""add full-text search and tag columns to jobs
+
+Run in a maintenance window: adding a STORED generated column rewrites the
+whole jobs table under an ACCESS EXCLUSIVE lock, so every read and write of
+jobs waits until both columns are filled (see MIGRATION_GUIDE.md).
+
+Revision ID: add_jobs_search_columns
+Revises: add_lookup_indexes
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from infrastructure.db.migrations import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_jobs_search_columns'
+down_revision: Union[str, None] = 'add_lookup_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(task_title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(short_title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(polished_task, '')), 'B')"
+)
+TAG_LIST = r"array_remove(regexp_split_to_array(lower(trim(tags)), '\s*,\s*'), '')"
+
+
+def upgrade() -> None:
+    # Check if table and columns exist
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'jobs' not in inspector.get_table_names():
+        return
+
+    # Stored generated columns are filled for existing rows when added, by a
+    # table rewrite that holds ACCESS EXCLUSIVE on jobs until it commits
+    columns = [col['name'] for col in inspector.get_columns('jobs')]
+    if 'search_vector' not in columns:
+        op.add_column('jobs', sa.Column(
+            'search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True)
+        ))
+    if 'tag_list' not in columns:
+        op.add_column('jobs', sa.Column(
+            'tag_list', postgresql.ARRAY(sa.String()), sa.Computed(TAG_LIST, persisted=True)
+        ))
+
+    with op.get_context().autocommit_block():
+        for name, column in (('ix_jobs_search_vector', 'search_vector'), ('ix_jobs_tag_list', 'tag_list')):
+            create_index_concurrently(conn, name, 'jobs', [column], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'jobs' not in inspector.get_table_names():
+        return
+
+    indexes = [ix['name'] for ix in inspector.get_indexes('jobs')]
+    for name in ('ix_jobs_tag_list', 'ix_jobs_search_vector'):
+        if name in indexes:
+            op.drop_index(name, table_name='jobs')
+
+    columns = [col['name'] for col in inspector.get_columns('jobs')]
+    for name in ('tag_list', 'search_vector'):
+        if name in columns:
+            op.drop_column('jobs', name)
@@ -0,0 +1,56 @@
+"""add indexes for hot lookup columns
+
+Revision ID: add_lookup_indexes
+Revises: add_jobs_geo_columns
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from infrastructure.db.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_lookup_indexes'
+down_revision: Union[str, None] = 'add_jobs_geo_columns'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns, partial index predicate)
+# zan_crew.zan_user_id is already covered by uq_zan_crew_zan_user_id
+INDEXES = [
+    ('ix_zan_user_phone', 'zan_user', ['phone'], None),
+    ('ix_zan_user_zancrew_id', 'zan_user', ['zancrew_id'], None),
+    ('ix_zan_crew_phone', 'zan_crew', ['phone'], None),
+    ('ix_zan_crew_dispatchable', 'zan_crew', ['zancrew_id'], "lower(is_online) = 'true' AND radius_km > 0"),
+    ('ix_jobs_user_id', 'jobs', ['user_id'], None),
+    ('ix_jobs_assigned_zancrew_user_id', 'jobs', ['assigned_zancrew_user_id'], None),
+    ('ix_jobs_scheduled_at', 'jobs', ['scheduled_at'], None),
+]
+
+
+def upgrade() -> None:
+    # Check if tables exist
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    tables = inspect(conn).get_table_names()
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building
+    # without it would block writes to these tables for the whole build
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            if table not in tables:
+                continue
+            create_index_concurrently(
+                conn, name, table, columns, postgresql_where=sa.text(where) if where else None
+            )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            drop_index_concurrently(conn, name, table)
@@ -0,0 +1,59 @@
+"""add unique constraint on zan_crew.zan_user_id
+
+Revision ID: unique_zan_crew_user_id
+Revises: modify_jobs_table
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'unique_zan_crew_user_id'
+down_revision: Union[str, None] = 'modify_jobs_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Check if table and constraint exist
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'zan_crew' not in inspector.get_table_names():
+        return
+
+    constraints = [uc['name'] for uc in inspector.get_unique_constraints('zan_crew')]
+    if 'uq_zan_crew_zan_user_id' in constraints:
+        return
+
+    # One crew profile per zan_user is already enforced by the service layer;
+    # refuse to guess which row to keep if duplicates slipped in
+    duplicates = conn.execute(sa.text(
+        "SELECT zan_user_id FROM zan_crew GROUP BY zan_user_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            "Cannot add unique constraint: zan_crew has duplicate rows for zan_user_id "
+            f"{', '.join(str(row[0]) for row in duplicates)}. Resolve them and re-run the migration."
+        )
+
+    # Backs INSERT ... ON CONFLICT (zan_user_id) for bulk onboarding
+    op.create_unique_constraint('uq_zan_crew_zan_user_id', 'zan_crew', ['zan_user_id'])
+
+
+def downgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'zan_crew' not in inspector.get_table_names():
+        return
+
+    constraints = [uc['name'] for uc in inspector.get_unique_constraints('zan_crew')]
+    if 'uq_zan_crew_zan_user_id' in constraints:
+        op.drop_constraint('uq_zan_crew_zan_user_id', 'zan_crew', type_='unique')
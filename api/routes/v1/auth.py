@@ -1,47 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
-from supabase import create_client, Client
-from supabase.lib.client_options import SyncClientOptions
-from supabase_auth.errors import AuthApiError
-import httpx
-from core.config import SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_VERIFY_SSL
-from domain.auth.schemas import SendOTPRequest, SendOTPResponse, VerifyOTPRequest, AuthResponse
+from core.auth import get_current_user
+from core.supabase import auth_api_error, get_supabase_client
+from domain.auth.schemas import SendOTPRequest, SendOTPResponse, VerifyOTPRequest, AuthResponse, CurrentUser
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-def get_supabase_client() -> Client:
-    """Get Supabase client instance with SSL configuration"""
-    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-        raise HTTPException(
-            status_code=500,
-            detail="Supabase configuration is missing"
-        )
-    
-    # Configure SSL verification for development
-    # For development, set SUPABASE_VERIFY_SSL=false in .env to disable SSL verification
-    if not SUPABASE_VERIFY_SSL:
-        # Disable SSL verification warnings
-        import urllib3
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    
-    # Create httpx client with SSL configuration
-    # This will be used by all Supabase clients (auth, postgrest, storage, etc.)
-    httpx_client = httpx.Client(
-        verify=SUPABASE_VERIFY_SSL,
-        timeout=30.0
-    )
-    
-    # Create SyncClientOptions with custom httpx client
-    options = SyncClientOptions(
-        httpx_client=httpx_client
-    )
-    
-    # Create Supabase client with custom options
-    return create_client(SUPABASE_URL, SUPABASE_ANON_KEY, options=options)
-
 @router.post("/phone/send-otp", response_model=SendOTPResponse)
 async def send_otp(
     request: SendOTPRequest,
-    supabase: Client = Depends(get_supabase_client)
+    supabase=Depends(get_supabase_client)
 ):
     """
     Send OTP to phone number for authentication.
@@ -50,7 +17,7 @@ async def send_otp(
     """
     try:
         # Send OTP via Supabase Auth
-        response = supabase.auth.sign_in_with_otp({
+        response = await supabase.auth.sign_in_with_otp({
             "phone": request.phone
         })
         
@@ -58,7 +25,7 @@ async def send_otp(
             message="OTP sent successfully",
             phone=request.phone
         )
-    except AuthApiError as e:
+    except auth_api_error() as e:
         # Handle Supabase Auth API errors
         error_message = str(e)
         if "Twilio" in error_message or "Invalid From Number" in error_message:
@@ -94,7 +61,7 @@ async def send_otp(
 @router.post("/phone/verify-otp", response_model=AuthResponse)
 async def verify_otp(
     request: VerifyOTPRequest,
-    supabase: Client = Depends(get_supabase_client)
+    supabase=Depends(get_supabase_client)
 ):
     """
     Verify OTP and authenticate user.
@@ -103,7 +70,7 @@ async def verify_otp(
     """
     try:
         # Verify OTP and get session
-        response = supabase.auth.verify_otp({
+        response = await supabase.auth.verify_otp({
             "phone": request.phone,
             "token": request.token,
             "type": "sms"
@@ -138,14 +105,14 @@ async def verify_otp(
 @router.post("/phone/resend-otp", response_model=SendOTPResponse)
 async def resend_otp(
     request: SendOTPRequest,
-    supabase: Client = Depends(get_supabase_client)
+    supabase=Depends(get_supabase_client)
 ):
     """
     Resend OTP to phone number.
     """
     try:
         # Resend OTP via Supabase Auth
-        response = supabase.auth.sign_in_with_otp({
+        response = await supabase.auth.sign_in_with_otp({
             "phone": request.phone
         })
         
@@ -153,7 +120,7 @@ async def resend_otp(
             message="OTP resent successfully",
             phone=request.phone
         )
-    except AuthApiError as e:
+    except auth_api_error() as e:
         # Handle Supabase Auth API errors
         error_message = str(e)
         if "Twilio" in error_message or "Invalid From Number" in error_message:
@@ -186,3 +153,9 @@ async def resend_otp(
             detail=f"Failed to resend OTP: {error_message}"
         )
 
+@router.get("/me", response_model=CurrentUser)
+async def get_me(user: CurrentUser = Depends(get_current_user)):
+    """
+    Return the authenticated user, verified locally from the access token.
+    """
+    return user
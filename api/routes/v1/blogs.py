@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 from domain.blog.schemas import BlogCreate, BlogResponse, BlogUpdate
 from core.dependencies import get_blog_service
+from core.pagination import set_next_cursor
+from core.conditional import is_conditional, is_not_modified, not_modified, row_version, validators
+from core.routing import SessionRoute
 
-router = APIRouter(prefix="/blogs", tags=["Blogs"])
+router = APIRouter(prefix="/blogs", tags=["Blogs"], route_class=SessionRoute)
 
 @router.post("", response_model=BlogResponse, status_code=201)
 def create_blog(
@@ -17,21 +20,38 @@ def create_blog(
 
 @router.get("", response_model=List[BlogResponse])
 def get_all_blogs(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
     service = Depends(get_blog_service)
 ):
-    return service.get_all_blogs(skip, limit)
+    try:
+        blogs = service.get_all_blogs(skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, blogs, limit, "id")
+    return blogs
 
 @router.get("/{blog_id}", response_model=BlogResponse)
 def get_blog(
     blog_id: int,
+    request: Request,
+    response: Response,
     service = Depends(get_blog_service)
 ):
     try:
-        return service.get_blog(blog_id)
+        if is_conditional(request):
+            # Revalidate against updated_at alone before loading the row
+            version = service.get_blog_version(blog_id)
+            headers = validators(f"blog-{blog_id}", version)
+            if is_not_modified(request, headers, version):
+                return not_modified(headers)
+        blog = service.get_blog(blog_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    response.headers.update(validators(f"blog-{blog_id}", row_version(blog)))
+    return blog
 
 @router.put("/{blog_id}", response_model=BlogResponse)
 def update_blog(
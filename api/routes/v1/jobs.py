@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List
-from domain.job.schemas import JobCreate, JobResponse, JobUpdate
-from core.dependencies import get_job_service
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
+from datetime import datetime
+from domain.job.schemas import (
+    JobCreate, JobResponse, JobUpdate, JobBulkResponse, JobNearbyResponse, JobSearchResponse
+)
+from domain.zan_crew.schemas import ZanCrewCandidate
+from core.geo import MAX_SEARCH_RADIUS_KM
+from core.dependencies import get_async_job_service
+from core.pagination import InvalidCursorError, set_next_cursor
+from core.fields import InvalidFieldsError, parse_fields, sparse_response
+from core.responses import compiled_response
+from core.auth import get_current_user
+from core.export import export_response
+from domain.job.repository import select_job_export
+from core.conditional import is_conditional, is_not_modified, not_modified, row_version, validators, with_version_fields
+from core.routing import SessionRoute
 
-router = APIRouter(prefix="/jobs", tags=["Jobs"])
+router = APIRouter(prefix="/jobs", tags=["Jobs"], route_class=SessionRoute)
 
 @router.post("", response_model=JobResponse, status_code=201)
-def create_job(
+async def create_job(
     data: JobCreate,
-    service = Depends(get_job_service)
+    service = Depends(get_async_job_service)
 ):
     try:
-        return service.create_job(
+        return await service.create_job(
             data.user_id,
             data.task_title,
             data.polished_task,
@@ -40,20 +53,87 @@ def create_job(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk", response_model=JobBulkResponse)
+async def create_jobs_bulk(
+    data: List[JobCreate],
+    service = Depends(get_async_job_service)
+):
+    """
+    Create many jobs in one request.
+
+    All user_ids are validated with one query and the valid jobs are inserted
+    in a single transaction. Jobs whose user_id does not exist are not created
+    and are reported in **errors** by their position in the request list.
+    """
+    try:
+        return await service.create_jobs_bulk([job.model_dump() for job in data])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("", response_model=List[JobResponse])
-def get_all_jobs(
+async def get_all_jobs(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    service = Depends(get_job_service)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. job_id,task_title"),
+    payment_status: Optional[str] = Query(None),
+    bucket: Optional[str] = Query(None),
+    currency: Optional[str] = Query(None),
+    assigned_zancrew_user_id: Optional[int] = Query(None),
+    scheduled_from: Optional[datetime] = Query(None, description="Only jobs scheduled at or after this time"),
+    scheduled_to: Optional[datetime] = Query(None, description="Only jobs scheduled before this time"),
+    sort: str = Query("job_id", description="job_id, scheduled_at or estimated_cost_pence; prefix with - for descending"),
+    service = Depends(get_async_job_service)
 ):
-    return service.get_all_jobs(skip, limit)
+    """
+    List jobs, optionally filtered and sorted.
+
+    - **payment_status**, **bucket**, **currency**, **assigned_zancrew_user_id**: Exact match filters
+    - **scheduled_from**, **scheduled_to**: Window on scheduled_at (from inclusive, to exclusive)
+    - **sort**: Sort key, e.g. `-scheduled_at` for the latest first
+    - **cursor**: Keyset cursor from the previous page's X-Next-Cursor header (overrides skip).
+      Keep the same filters and sort when following it
+    - **fields**: Optional comma separated list of fields to return
+    """
+    filters = {
+        name: value for name, value in (
+            ("payment_status", payment_status), ("bucket", bucket), ("currency", currency),
+            ("assigned_zancrew_user_id", assigned_zancrew_user_id),
+            ("scheduled_from", scheduled_from), ("scheduled_to", scheduled_to),
+        ) if value is not None
+    }
+    try:
+        selected = parse_fields(fields, JobResponse)
+        jobs = await service.get_all_jobs(skip, limit, cursor, selected, filters, sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    sort_key = sort.lstrip("-")
+    set_next_cursor(response, jobs, limit, "job_id" if sort_key == "job_id" else (sort_key, "job_id"))
+    if selected:
+        return sparse_response(jobs, selected, response)
+    return compiled_response(jobs, List[JobResponse], response)
+
+@router.get("/export", dependencies=[Depends(get_current_user)])
+async def export_jobs(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="ndjson or csv")
+):
+    """
+    Stream every job as an NDJSON or CSV download (requires a bearer token).
+
+    Rows come from one consistent snapshot, in job_id order.
+    """
+    return export_response(select_job_export(), export_format, "jobs")
 
 @router.get("/user/{user_id}", response_model=List[JobResponse])
-def get_jobs_by_user(
+async def get_jobs_by_user(
     user_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    service = Depends(get_job_service)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. job_id,task_title"),
+    service = Depends(get_async_job_service)
 ):
     """
     Get all jobs posted by a user from zan_user table.
@@ -61,67 +141,139 @@ def get_jobs_by_user(
     - **user_id**: The user_id from zan_user table
     - **skip**: Number of records to skip (for pagination)
     - **limit**: Maximum number of records to return (1-100)
+    - **cursor**: Keyset cursor from the previous page's X-Next-Cursor header (overrides skip)
+    - **fields**: Optional comma separated list of fields to return
     
     Returns a list of all jobs posted by the specified user.
     """
     try:
-        return service.get_jobs_by_user(user_id, skip, limit)
+        selected = parse_fields(fields, JobResponse)
+        jobs = await service.get_jobs_by_user(user_id, skip, limit, cursor, selected)
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    set_next_cursor(response, jobs, limit, "job_id")
+    if selected:
+        return sparse_response(jobs, selected, response)
+    return jobs
+
+@router.get("/nearby", response_model=List[JobNearbyResponse])
+async def get_nearby_jobs(
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=MAX_SEARCH_RADIUS_KM),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    service = Depends(get_async_job_service)
+):
+    """
+    Get jobs near a point, nearest first.
+
+    - **lat**, **lng**: The point to search around
+    - **radius_km**: Search radius in kilometres (at most 50)
+    - **limit**: Maximum number of records to return (1-100)
+    - **cursor**: Keyset cursor from the previous page's X-Next-Cursor header
+
+    Each job carries its **distance_km** from the point. Jobs whose stored
+    latitude/longitude are not valid numbers are never returned.
+    """
+    try:
+        jobs = await service.get_nearby_jobs(lat, lng, radius_km, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, jobs, limit, ("distance_km", "job_id"))
+    return compiled_response(jobs, List[JobNearbyResponse], response)
+
+@router.get("/search", response_model=List[JobSearchResponse])
+async def search_jobs(
+    response: Response,
+    q: Optional[str] = Query(None, max_length=200, description="Search text, e.g. garden \"fence repair\" -paint"),
+    tags: Optional[str] = Query(None, description="Comma separated tags the jobs must all carry"),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    service = Depends(get_async_job_service)
+):
+    """
+    Search jobs by text and/or tags, best match first.
+
+    - **q**: Matched against task_title, short_title and polished_task. Supports
+      quoted phrases, OR and -exclusions
+    - **tags**: Only jobs carrying every listed tag (case-insensitive)
+    - **limit**: Maximum number of records to return (1-100)
+    - **cursor**: Keyset cursor from the previous page's X-Next-Cursor header
+
+    Each job carries its search **rank** (0 when only tags are given).
+    """
+    try:
+        jobs = await service.search_jobs(q, tags, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, jobs, limit, ("rank", "job_id"))
+    return compiled_response(jobs, List[JobSearchResponse], response)
 
 @router.get("/{job_id}", response_model=JobResponse)
-def get_job(
+async def get_job(
     job_id: int,
-    service = Depends(get_job_service)
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. job_id,task_title"),
+    service = Depends(get_async_job_service)
 ):
     try:
-        return service.get_job(job_id)
+        selected = parse_fields(fields, JobResponse)
+        if is_conditional(request):
+            # Revalidate against updated_at alone before loading the row
+            version = await service.get_job_version(job_id)
+            headers = validators(f"job-{job_id}", version, selected)
+            if is_not_modified(request, headers, version):
+                return not_modified(headers)
+        job = await service.get_job(job_id, with_version_fields(selected))
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    response.headers.update(validators(f"job-{job_id}", row_version(job), selected))
+    if selected:
+        return sparse_response(job, selected, response)
+    return job
+
+@router.get("/{job_id}/candidate-crew", response_model=List[ZanCrewCandidate])
+async def get_candidate_crew(
+    job_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    service = Depends(get_async_job_service)
+):
+    """
+    Get crew who can be dispatched to a job, nearest first.
+
+    Candidates are online crew whose live location (or home location when no
+    live location is known) lies within their own **radius_km** of the job.
+    """
+    try:
+        return await service.get_candidate_crew(job_id, limit)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.put("/{job_id}", response_model=JobResponse)
-def update_job(
+async def update_job(
     job_id: int,
     data: JobUpdate,
-    service = Depends(get_job_service)
+    service = Depends(get_async_job_service)
 ):
     try:
-        return service.update_job(
-            job_id,
-            data.task_title,
-            data.polished_task,
-            data.location_address,
-            data.latitude,
-            data.longitude,
-            data.scheduled_at,
-            data.duration_hours,
-            data.duration_minutes,
-            data.estimated_cost_pence,
-            data.assigned_zancrew_user_id,
-            data.short_title,
-            data.people_required,
-            data.imp_notes,
-            data.actions,
-            data.tags,
-            data.bucket,
-            data.payment_mode,
-            data.payment_status,
-            data.currency,
-            data.chat_room_id,
-            data.pickup_adress,
-            data.pickup_latitude,
-            data.pickup_longitude
-        )
+        return await service.update_job(job_id, data.model_dump(exclude_unset=True))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.delete("/{job_id}", status_code=204)
-def delete_job(
+async def delete_job(
     job_id: int,
-    service = Depends(get_job_service)
+    service = Depends(get_async_job_service)
 ):
     try:
-        service.delete_job(job_id)
+        await service.delete_job(job_id)
         return None
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -1,4 +1,3 @@
-from fastapi import APIRouter
 from api.routes.v1.users import router as user_router
 from api.routes.v1.health import router as health_router
 from api.routes.v1.blogs import router as blog_router
@@ -7,12 +6,25 @@ from api.routes.v1.auth import router as auth_router
 from api.routes.v1.zan_users import router as zan_user_router
 from api.routes.v1.zan_crew import router as zan_crew_router
 
-router = APIRouter(prefix="/api/v1")
+PREFIX = "/api/v1"
 
-router.include_router(auth_router)
-router.include_router(user_router)
-router.include_router(health_router)
-router.include_router(blog_router)
-router.include_router(job_router)
-router.include_router(zan_user_router)
-router.include_router(zan_crew_router)
+routers = [
+    auth_router,
+    user_router,
+    health_router,
+    blog_router,
+    job_router,
+    zan_user_router,
+    zan_crew_router,
+]
+
+
+def include_routes(app):
+    """Mount the v1 routes on the app under PREFIX.
+
+    The routers are included straight into the app rather than through a
+    parent APIRouter: every include_router() level rebuilds each route's
+    dependency graph and response-model validators.
+    """
+    for router in routers:
+        app.include_router(router, prefix=PREFIX)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from domain.user.schemas import UserCreate, UserResponse
 from core.dependencies import get_user_service
+from core.routing import SessionRoute
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=SessionRoute)
 
 @router.post("", response_model=UserResponse)
 def create_user(
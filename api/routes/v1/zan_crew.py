@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List
-from domain.zan_crew.schemas import ZanCrewCreate, ZanCrewResponse, ZanCrewUpdate, ZanCrewWithUserResponse
-from core.dependencies import get_zan_crew_service
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
+from domain.zan_crew.schemas import (
+    ZanCrewCreate, ZanCrewResponse, ZanCrewUpdate, ZanCrewWithUserResponse, ZanCrewBulkUpsertResponse
+)
+from core.dependencies import get_async_zan_crew_service
+from core.pagination import set_next_cursor
+from core.fields import InvalidFieldsError, parse_fields, sparse_response
+from core.responses import compiled_response
+from core.auth import get_current_user
+from core.export import export_response
+from domain.zan_crew.repository import ZanCrewExistsError, select_zan_crew_export
+from core.conditional import is_conditional, is_not_modified, not_modified, row_version, validators, with_version_fields
+from core.routing import SessionRoute
 
-router = APIRouter(prefix="/zan-crew", tags=["ZanCrew"])
+router = APIRouter(prefix="/zan-crew", tags=["ZanCrew"], route_class=SessionRoute)
 
 @router.post("", response_model=ZanCrewResponse, status_code=201)
-def create_zan_crew(
+async def create_zan_crew(
     data: ZanCrewCreate,
-    service = Depends(get_zan_crew_service)
+    service = Depends(get_async_zan_crew_service)
 ):
     try:
-        return service.create_zan_crew(
+        return await service.create_zan_crew(
             data.phone,
             data.pan_id,
             data.adhar_id,
@@ -42,105 +52,140 @@ def create_zan_crew(
             data.face_verified,
             data.selfie_img_url
         )
+    except ZanCrewExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bulk-upsert", response_model=ZanCrewBulkUpsertResponse)
+async def upsert_zan_crew_bulk(
+    data: List[ZanCrewCreate],
+    service = Depends(get_async_zan_crew_service)
+):
+    """
+    Create or update many zan_crew records in one request.
+
+    Each record is matched to its zan_user by phone and written with
+    INSERT ... ON CONFLICT (zan_user_id) DO UPDATE. Fields sent as null keep
+    their stored value, and records that would change nothing are returned
+    without being rewritten. Records whose phone has no zan_user are reported in
+    **errors** by their position in the request list.
+    """
+    try:
+        return await service.upsert_zan_crew_bulk([item.model_dump() for item in data])
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("", response_model=List[ZanCrewResponse])
-def get_all_zan_crew(
+async def get_all_zan_crew(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    service = Depends(get_zan_crew_service)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. zancrew_id,latitude,longitude"),
+    service = Depends(get_async_zan_crew_service)
 ):
-    return service.get_all_zan_crew(skip, limit)
+    try:
+        selected = parse_fields(fields, ZanCrewResponse)
+        zan_crew = await service.get_all_zan_crew(skip, limit, cursor, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, zan_crew, limit, "zancrew_id")
+    if selected:
+        return sparse_response(zan_crew, selected, response)
+    return compiled_response(zan_crew, List[ZanCrewResponse], response)
 
 @router.get("/with-user", response_model=List[ZanCrewWithUserResponse])
-def get_all_zan_crew_with_user(
+async def get_all_zan_crew_with_user(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    service = Depends(get_zan_crew_service)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    service = Depends(get_async_zan_crew_service)
 ):
     """Get all zan_crew records with related zan_user data"""
-    return service.get_all_zan_crew_with_user(skip, limit)
+    try:
+        zan_crew = await service.get_all_zan_crew_with_user(skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, zan_crew, limit, "zancrew_id")
+    return compiled_response(zan_crew, List[ZanCrewWithUserResponse], response)
+
+@router.get("/export", dependencies=[Depends(get_current_user)])
+async def export_zan_crew(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="ndjson or csv")
+):
+    """
+    Stream every zan_crew record as an NDJSON or CSV download (requires a bearer token).
+
+    Rows come from one consistent snapshot, in zancrew_id order.
+    """
+    return export_response(select_zan_crew_export(), export_format, "zan-crew")
 
 @router.get("/phone/{phone}", response_model=ZanCrewResponse)
-def get_zan_crew_by_phone(
+async def get_zan_crew_by_phone(
     phone: str,
-    service = Depends(get_zan_crew_service)
+    service = Depends(get_async_zan_crew_service)
 ):
     try:
-        return service.get_zan_crew_by_phone(phone)
+        return await service.get_zan_crew_by_phone(phone)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.get("/user/{zan_user_id}", response_model=ZanCrewResponse)
-def get_zan_crew_by_user_id(
+async def get_zan_crew_by_user_id(
     zan_user_id: int,
-    service = Depends(get_zan_crew_service)
+    service = Depends(get_async_zan_crew_service)
 ):
     try:
-        return service.get_zan_crew_by_user_id(zan_user_id)
+        return await service.get_zan_crew_by_user_id(zan_user_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.get("/{zancrew_id}", response_model=ZanCrewResponse)
-def get_zan_crew(
+async def get_zan_crew(
     zancrew_id: int,
-    service = Depends(get_zan_crew_service)
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. zancrew_id,latitude,longitude"),
+    service = Depends(get_async_zan_crew_service)
 ):
     try:
-        return service.get_zan_crew(zancrew_id)
+        selected = parse_fields(fields, ZanCrewResponse)
+        if is_conditional(request):
+            # Revalidate against updated_at alone before loading the row
+            version = await service.get_zan_crew_version(zancrew_id)
+            headers = validators(f"zan-crew-{zancrew_id}", version, selected)
+            if is_not_modified(request, headers, version):
+                return not_modified(headers)
+        zan_crew = await service.get_zan_crew(zancrew_id, with_version_fields(selected))
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    response.headers.update(validators(f"zan-crew-{zancrew_id}", row_version(zan_crew), selected))
+    if selected:
+        return sparse_response(zan_crew, selected, response)
+    return zan_crew
 
 @router.put("/{zancrew_id}", response_model=ZanCrewResponse)
-def update_zan_crew(
+async def update_zan_crew(
     zancrew_id: int,
     data: ZanCrewUpdate,
-    service = Depends(get_zan_crew_service)
+    service = Depends(get_async_zan_crew_service)
 ):
     try:
-        return service.update_zan_crew(
-            zancrew_id,
-            data.phone,
-            data.pan_id,
-            data.adhar_id,
-            data.birth_date,
-            data.city,
-            data.state,
-            data.country,
-            data.latitude,
-            data.longitude,
-            data.martial_status,
-            data.status,
-            data.radius_km,
-            data.work_hours,
-            data.kyc_verified,
-            data.is_online,
-            data.payout_beneficiary_id,
-            data.bank_account,
-            data.ifsc_code,
-            data.home_lat,
-            data.home_lng,
-            data.idfy_refs,
-            data.pan_name,
-            data.pan_number_last4,
-            data.aadhaar_verified,
-            data.aadhaar_last4,
-            data.aadhar_city,
-            data.face_match_score,
-            data.face_verified,
-            data.selfie_img_url
-        )
+        return await service.update_zan_crew(zancrew_id, data.model_dump(exclude_unset=True))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.delete("/{zancrew_id}", status_code=204)
-def delete_zan_crew(
+async def delete_zan_crew(
     zancrew_id: int,
-    service = Depends(get_zan_crew_service)
+    service = Depends(get_async_zan_crew_service)
 ):
     try:
-        service.delete_zan_crew(zancrew_id)
+        await service.delete_zan_crew(zancrew_id)
         return None
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
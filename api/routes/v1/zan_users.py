@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
 from domain.zan_user.schemas import ZanUserCreate, ZanUserResponse, ZanUserUpdate
 from core.dependencies import get_zan_user_service
+from core.pagination import InvalidCursorError, set_next_cursor
+from core.fields import InvalidFieldsError, parse_fields, sparse_response
+from core.responses import compiled_response
+from core.auth import get_current_user
+from core.export import export_response
+from domain.zan_user.repository import select_zan_user_export
+from core.conditional import is_conditional, is_not_modified, not_modified, row_version, validators, with_version_fields
+from core.routing import SessionRoute
 
-router = APIRouter(prefix="/zan-users", tags=["ZanUsers"])
+router = APIRouter(prefix="/zan-users", tags=["ZanUsers"], route_class=SessionRoute)
 
 @router.post("", response_model=ZanUserResponse, status_code=201)
 def create_zan_user(
@@ -25,11 +33,33 @@ def create_zan_user(
 
 @router.get("", response_model=List[ZanUserResponse])
 def get_all_zan_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. user_id,first_name,phone"),
     service = Depends(get_zan_user_service)
 ):
-    return service.get_all_zan_users(skip, limit)
+    try:
+        selected = parse_fields(fields, ZanUserResponse)
+        zan_users = service.get_all_zan_users(skip, limit, cursor, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, zan_users, limit, "user_id")
+    if selected:
+        return sparse_response(zan_users, selected, response)
+    return compiled_response(zan_users, List[ZanUserResponse], response)
+
+@router.get("/export", dependencies=[Depends(get_current_user)])
+async def export_zan_users(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="ndjson or csv")
+):
+    """
+    Stream every zan_user as an NDJSON or CSV download (requires a bearer token).
+
+    Rows come from one consistent snapshot, in user_id order.
+    """
+    return export_response(select_zan_user_export(), export_format, "zan-users")
 
 # IMPORTANT: More specific routes must come BEFORE the generic /{user_id} route
 # FastAPI matches routes in order, so /{user_id} would match /zancrew/1 if defined first
@@ -46,8 +76,10 @@ def get_zan_user_by_email(
 @router.get("/zancrew/{user_id}", response_model=List[ZanUserResponse])
 def get_zan_users_by_zancrew(
     user_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
     service = Depends(get_zan_user_service)
 ):
     # Get the user by user_id to find their zancrew_id
@@ -56,8 +88,12 @@ def get_zan_users_by_zancrew(
         if not user.user_id:
             return []
         # Get all users with the same zancrew_id
-        users = service.get_zan_users_by_zancrew(user.user_id, skip, limit)
-        return list(users) if users is not None else []
+        users = service.get_zan_users_by_zancrew(user.user_id, skip, limit, cursor)
+        users = list(users) if users is not None else []
+        set_next_cursor(response, users, limit, "user_id")
+        return users
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError:
         # User not found
         return []
@@ -65,12 +101,30 @@ def get_zan_users_by_zancrew(
 @router.get("/{user_id}", response_model=ZanUserResponse)
 def get_zan_user(
     user_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. user_id,first_name,phone"),
     service = Depends(get_zan_user_service)
 ):
     try:
-        return service.get_zan_user(user_id)
+        selected = parse_fields(fields, ZanUserResponse)
+        if is_conditional(request):
+            # Revalidate against updated_at alone before loading the row
+            version = service.get_zan_user_version(user_id)
+            headers = validators(f"zan-user-{user_id}", version, selected)
+            if is_not_modified(request, headers, version):
+                return not_modified(headers)
+        # A revalidation that missed has just read the live version; load the
+        # live row too, so its ETag is not that of an older cached snapshot
+        zan_user = service.get_zan_user(user_id, with_version_fields(selected), cached=not is_conditional(request))
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    response.headers.update(validators(f"zan-user-{user_id}", row_version(zan_user), selected))
+    if selected:
+        return sparse_response(zan_user, selected, response)
+    return zan_user
 
 @router.put("/{user_id}", response_model=ZanUserResponse)
 def update_zan_user(
@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from core.health import database_probe
+from core.pool_metrics import pool_stats
+from domain.zan_user.repository import zan_user_cache
+from domain.zan_crew.repository import zan_crew_cache
 
 router = APIRouter(
     prefix="/health",
@@ -11,3 +15,40 @@ def health_check():
         "status": "ok",
         "service": "v2 health"
     }
+
+@router.get("/cache")
+def cache_stats():
+    """Hit/miss counters and occupancy of this worker's lookup caches"""
+    return {cache.name: cache.stats() for cache in (zan_user_cache, zan_crew_cache)}
+
+@router.get("/deep")
+async def deep_health_check(response: Response):
+    """
+    Database round trip, connection pool and cache state of this worker.
+
+    - **status**: "ok"; "degraded" if the replica is unreachable or a pool is
+      exhausted or has timed out checkouts; "down" (503) if the primary is unreachable.
+    - **database**: SELECT 1 latency per database; reused for a few seconds
+      (**cached**) so frequent checks don't load the database.
+    - **pools**: checkout wait percentiles, checked-out and overflow counts,
+      timeouts, invalidations and failed pre-pings per engine.
+    """
+    database, cached = await database_probe.result()
+    pools = pool_stats()
+    if not database["primary"]["ok"]:
+        status = "down"
+        response.status_code = 503
+    elif (
+        not database.get("replica", {"ok": True})["ok"]
+        or any(pool.get("exhausted") or pool["checkout_timeouts"] for pool in pools.values())
+    ):
+        status = "degraded"
+    else:
+        status = "ok"
+    return {
+        "status": status,
+        "service": "v2 health",
+        "database": {**database, "cached": cached},
+        "pools": pools,
+        "caches": cache_stats(),
+    }
@@ -1,6 +1,13 @@
-from fastapi import APIRouter
 from api.routes.v2.health import router as health_router
 
-router = APIRouter(prefix="/api/v2")
+PREFIX = "/api/v2"
 
-router.include_router(health_router)
+routers = [
+    health_router,
+]
+
+
+def include_routes(app):
+    """Mount the v2 routes on the app under PREFIX (see api.routes.v1.router)"""
+    for router in routers:
+        app.include_router(router, prefix=PREFIX)
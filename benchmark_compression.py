@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark for list endpoints.
+
+Builds a page of the GET /zan-crew/with-user and GET /jobs responses from
+in-memory rows (as in benchmark_serialization.py), runs it through
+CompressionMiddleware for identity, gzip and zstd, and reports the bytes
+on the wire, the time spent compressing and the transfer time saved at a
+few link speeds. No database is needed. The generated rows differ only
+in their ids, so real pages compress somewhat less than reported here.
+
+    python benchmark_compression.py [--rows 100] [--repeat 200]
+"""
+import argparse
+import asyncio
+import gzip
+import time
+from typing import List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import zstandard  # noqa: E402
+from benchmark_serialization import crew_rows, job_rows  # noqa: E402
+from core.compression import CompressionMiddleware  # noqa: E402
+from core.responses import compiled_response  # noqa: E402
+from domain.job.schemas import JobResponse  # noqa: E402
+from domain.zan_crew.schemas import ZanCrewWithUserResponse  # noqa: E402
+
+# Downlink bandwidth in bytes per second
+LINKS = [("3G", 1_600_000 // 8), ("4G", 12_000_000 // 8), ("broadband", 50_000_000 // 8)]
+ENCODINGS = ["identity", "gzip", "zstd"]
+
+
+async def fetch(app, accept_encoding: str):
+    """Run one request through the middleware; returns (headers, body)"""
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    headers = {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+    return headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+def decode(encoding: str, body: bytes) -> bytes:
+    if encoding == "zstd":
+        # Streamed frames carry no content size, so decode incrementally
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = [
+        ("GET /zan-crew/with-user", compiled_response(crew_rows(args.rows), List[ZanCrewWithUserResponse])),
+        ("GET /jobs", compiled_response(job_rows(args.rows), List[JobResponse])),
+    ]
+    loop = asyncio.new_event_loop()
+    print(f"{args.rows} rows per response, mean of {args.repeat} runs")
+    for label, response in cases:
+        app = CompressionMiddleware(response)
+        print(f"\n{label}")
+        sizes = {}
+        for encoding in ENCODINGS:
+            headers, body = loop.run_until_complete(fetch(app, encoding))
+            if headers.get("content-encoding", "identity") != encoding:
+                raise SystemExit(f"{label}: expected {encoding}, got {headers.get('content-encoding')}")
+            if decode(encoding, body) != response.body:
+                raise SystemExit(f"{label}: {encoding} body does not round-trip")
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                loop.run_until_complete(fetch(app, encoding))
+            elapsed_ms = (time.perf_counter() - start) / args.repeat * 1000
+            sizes[encoding] = len(body)
+
+            saved = [
+                f"{name} {(sizes['identity'] - len(body)) / rate * 1000:6.1f} ms"
+                for name, rate in LINKS
+            ]
+            print(f"  {encoding:<9} {len(body):8d} bytes ({len(body) / sizes['identity']:6.1%})   "
+                  f"middleware {elapsed_ms:6.3f} ms   transfer saved: {', '.join(saved)}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Connection hold time benchmark for list endpoints.
+
+Calls a few list endpoints through the ASGI app, with a client that takes
+--client-delay-ms to receive the response body, and reports how long each
+request kept its pooled database connection checked out, when the
+request's session gives the connection back:
+
+- sent: after the response has been sent (FastAPI's default dependency
+  scope)
+- serialized: once the endpoint's result is serialized (scope="function")
+- returned: as soon as the endpoint returns (SessionRoute, the default)
+
+Needs the database from DATABASE_URL, holding some zan_user, job and
+zan_crew rows.
+
+    python benchmark_connection_hold.py [--requests 20] [--client-delay-ms 200]
+"""
+import argparse
+import asyncio
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import event  # noqa: E402
+from core.db import AsyncLazySession, LazySession, all_engines, dispose_engines, init_engines  # noqa: E402
+from main import app  # noqa: E402
+
+PATHS = [
+    "/api/v1/zan-users?limit=50",
+    "/api/v1/jobs?limit=50",
+    "/api/v1/zan-crew/with-user?limit=50",
+]
+MODES = ["sent", "serialized", "returned"]
+
+
+def record_holds(holds: list):
+    """Append the checkout-to-checkin time (ms) of every pooled connection to holds"""
+    sync_engines, async_engines = all_engines()
+    for engine in sync_engines + [engine.sync_engine for engine in async_engines]:
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info["benchmark_checked_out_at"] = time.perf_counter()
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            checked_out_at = connection_record.info.pop("benchmark_checked_out_at", None)
+            if checked_out_at is not None:
+                holds.append((time.perf_counter() - checked_out_at) * 1000)
+
+
+class SessionLifetime:
+    """Patch the lazy sessions so they give their connection back in a given mode"""
+
+    def __init__(self):
+        self.mode = "returned"
+        self.pending = []
+        for cls in (LazySession, AsyncLazySession):
+            cls.release = self._patched(cls, "release")
+            cls.close = self._patched(cls, "close")
+
+    def _patched(self, cls, method: str):
+        original = getattr(cls, method)
+        lifetime = self
+
+        def deferred(session):
+            if method == "release":
+                return lifetime.mode != "returned"
+            if lifetime.mode == "sent":
+                lifetime.pending.append((original, session))
+                return True
+            return False
+
+        if cls is AsyncLazySession:
+            async def call(session):
+                if not deferred(session):
+                    await original(session)
+        else:
+            def call(session):
+                if not deferred(session):
+                    original(session)
+        return call
+
+    async def close_pending(self):
+        for original, session in self.pending:
+            result = original(session)
+            if asyncio.iscoroutine(result):
+                await result
+        self.pending.clear()
+
+
+async def call(path: str, client_delay: float) -> int:
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "server": ("benchmark", 80), "client": ("127.0.0.1", 1), "root_path": "",
+        "path": route, "raw_path": route.encode(), "query_string": query.encode(),
+        "headers": [(b"host", b"benchmark")], "app": app,
+    }
+    status = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body" and client_delay:
+            await asyncio.sleep(client_delay)
+
+    await app(scope, receive, send)
+    return status["code"]
+
+
+def percentile(samples: list, fraction: float):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run(requests: int, client_delay: float):
+    init_engines()
+    holds = []
+    record_holds(holds)
+    lifetime = SessionLifetime()
+    print(f"{requests} requests per endpoint, client takes {client_delay * 1000:g} ms to receive the body")
+    try:
+        for path in PATHS:
+            for mode in MODES:
+                lifetime.mode = mode
+                # Warm the pool and the route before measuring
+                code = await call(path, 0)
+                await lifetime.close_pending()
+                holds.clear()
+                for _ in range(requests):
+                    await call(path, client_delay)
+                    await lifetime.close_pending()
+                print(f"{path:<38} {code}  released when {mode:<10} hold p50 {percentile(holds, 0.5):8.3f} ms"
+                      f"   p95 {percentile(holds, 0.95):8.3f} ms")
+    finally:
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--client-delay-ms", type=float, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.client_delay_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the app's cold start.
+
+Runs `python -X importtime -c "import main"` in fresh processes and reports
+the median time to import the app, the total process time and where the
+import time goes: self time summed per top-level package, and the slowest
+modules by cumulative time. No database connection is made; engines and
+the Supabase SDK are only loaded by the lifespan or on first use.
+
+    python benchmark_importtime.py [--runs 5] [--top 15] [--module main]
+    python benchmark_importtime.py --budget-ms 1500 --record importtime.jsonl
+
+--budget-ms exits non-zero when the median import exceeds the budget, and
+--record appends the medians with the git commit to a JSONL file so the
+numbers can be tracked across changes.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr: str):
+    """[(module, depth, self_us, cumulative_us)] from -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append((module, (len(indent) - 1) // 2, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def profile_once(module: str):
+    begin = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    process_ms = (time.perf_counter() - begin) * 1000
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    modules = parse_importtime(result.stderr)
+    target = next((m for m in modules if m[0] == module and m[1] == 0), None)
+    if target is None:
+        raise SystemExit(f"{module} not found in -X importtime output")
+    return process_ms, target[3] / 1000, modules
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median import takes longer")
+    parser.add_argument("--record", help="Append the medians to this JSONL file")
+    args = parser.parse_args()
+
+    runs = [profile_once(args.module) for _ in range(args.runs)]
+    process_ms = statistics.median(run[0] for run in runs)
+    import_ms = statistics.median(run[1] for run in runs)
+
+    # Per-module medians across runs (a module is imported once per process)
+    self_us, cumulative_us = defaultdict(list), defaultdict(list)
+    for _, _, modules in runs:
+        for module, _, own, cumulative in modules:
+            self_us[module].append(own)
+            cumulative_us[module].append(cumulative)
+    by_package = defaultdict(float)
+    for module, samples in self_us.items():
+        by_package[module.split(".")[0]] += statistics.median(samples) / 1000
+
+    print(f"import {args.module}: {import_ms:.0f} ms (median of {args.runs}); "
+          f"process start to exit: {process_ms:.0f} ms")
+    print(f"\nSelf time by top-level package (top {args.top})")
+    for package, ms in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:8.1f} ms  {package}")
+    print(f"\nSlowest modules by cumulative time (top {args.top})")
+    slowest = sorted(cumulative_us.items(), key=lambda item: -statistics.median(item[1]))
+    for module, samples in [item for item in slowest if item[0] != args.module][:args.top]:
+        print(f"  {statistics.median(samples) / 1000:8.1f} ms  {module}")
+
+    if args.record:
+        with open(args.record, "a") as f:
+            f.write(json.dumps({
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "module": args.module,
+                "runs": args.runs,
+                "import_ms": round(import_ms, 1),
+                "process_ms": round(process_ms, 1),
+            }) + "\n")
+    if args.budget_ms is not None and import_ms > args.budget_ms:
+        raise SystemExit(f"import {args.module} took {import_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for list responses.
+
+Times FastAPI's default response path (validate into the response model,
+serialize to Python, encode with the stdlib json module) against
+core.responses.compiled_response for a page of in-memory ORM rows, and
+checks both produce the same bytes. No database is needed.
+
+    python benchmark_serialization.py [--rows 100] [--repeat 200]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+from api.routes.v1.jobs import router as jobs_router  # noqa: E402
+from api.routes.v1.zan_crew import router as zan_crew_router  # noqa: E402
+from core.responses import compiled_response  # noqa: E402
+from domain.job.schemas import JobResponse  # noqa: E402
+from domain.zan_crew.schemas import ZanCrewWithUserResponse  # noqa: E402
+from infrastructure.db.models import Job, ZanCrew, ZanUser  # noqa: E402
+
+NOW = datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def crew_rows(count: int):
+    rows = []
+    for i in range(1, count + 1):
+        user = ZanUser(user_id=i, phone=f"+4470000{i:05d}", first_name="Asha", last_name="Rao",
+                       email=f"crew{i}@example.com", address="12 High Street, Leeds", is_zancrew="true",
+                       zancrew_id=i, created_at=NOW)
+        rows.append(ZanCrew(
+            zancrew_id=i, phone=user.phone, city="Leeds", state="West Yorkshire", country="UK",
+            latitude="53.8008", longitude="-1.5491", zan_user_id=i, status="active", radius_km=12.5,
+            work_hours="09:00-18:00", kyc_verified="true", is_online="true", bank_account="12345678",
+            ifsc_code="HDFC0001234", home_lat="53.8", home_lng="-1.55", pan_name="ASHA RAO",
+            pan_number_last4="1234", aadhaar_verified="true", aadhaar_last4="9876", face_match_score=0.97,
+            face_verified="true", selfie_img_url=f"https://cdn.example.com/selfies/{i}.jpg",
+            created_at=NOW, updated_at=NOW, zan_user=user,
+        ))
+    return rows
+
+
+def job_rows(count: int):
+    return [
+        Job(job_id=i, user_id=i, task_title="Fix a leaking kitchen tap", short_title="Leaking tap",
+            polished_task="Replace the washer on a leaking kitchen mixer tap",
+            location_address="12 High Street, Leeds", latitude="53.8008", longitude="-1.5491",
+            scheduled_at=NOW.replace(tzinfo=None), duration_hours=1, duration_minutes=30,
+            estimated_cost_pence=4500, people_required=1, actions="repair", tags="Plumbing, Kitchen",
+            bucket="standard", payment_mode="card", payment_status="paid", currency="GBP",
+            pickup_adress="12 High Street, Leeds", pickup_latitude="53.8008", pickup_longitude="-1.5491",
+            created_at=NOW)
+        for i in range(1, count + 1)
+    ]
+
+
+def response_field(router, path: str):
+    for route in router.routes:
+        if isinstance(route, APIRoute) and route.path.endswith(path) and "GET" in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+async def default_path(field, rows) -> bytes:
+    content = await serialize_response(field=field, response_content=rows)
+    return JSONResponse(content).body
+
+
+def timed(repeat: int, call):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = [
+        ("GET /zan-crew/with-user", response_field(zan_crew_router, "/with-user"),
+         List[ZanCrewWithUserResponse], crew_rows(args.rows)),
+        ("GET /jobs", response_field(jobs_router, "/jobs"), List[JobResponse], job_rows(args.rows)),
+    ]
+    loop = asyncio.new_event_loop()
+    print(f"{args.rows} rows per response, mean of {args.repeat} runs")
+    for label, field, model, rows in cases:
+        default_body = loop.run_until_complete(default_path(field, rows))
+        compiled_body = compiled_response(rows, model).body
+        if default_body != compiled_body:
+            raise SystemExit(f"{label}: compiled JSON differs from the default path")
+
+        default_ms = timed(args.repeat, lambda: loop.run_until_complete(default_path(field, rows)))
+        compiled_ms = timed(args.repeat, lambda: compiled_response(rows, model))
+        print(f"{label:<26} default {default_ms:7.3f} ms   compiled {compiled_ms:7.3f} ms   "
+              f"({default_ms / compiled_ms:.1f}x, {len(compiled_body)} bytes)")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
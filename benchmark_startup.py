@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: time from a fresh interpreter to the first response.
+
+Each run starts a new Python process that imports main, runs the lifespan
+startup (schema check, pool pre-warm, cache warm-up) and then issues a
+database-backed request twice, so the first-request latency can be read
+against a warm one. Needs the database configured in .env.
+
+    python benchmark_startup.py [--runs 5] [--path /api/v1/jobs?limit=20] [--record startup.jsonl]
+
+--record appends the medians as a JSON line (with the git commit) so the
+numbers can be tracked across changes. Pool pre-warm is compared by running
+once with DB_POOL_PREWARM=0.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+import main
+imported = time.perf_counter()
+client = TestClient(main.app)
+client.__enter__()
+ready = time.perf_counter()
+timings = []
+for _ in range(2):
+    before = time.perf_counter()
+    response = client.get(sys.argv[1])
+    response.raise_for_status()
+    timings.append(time.perf_counter() - before)
+client.__exit__(None, None, None)
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": timings[0] * 1000,
+    "warm_request_ms": timings[1] * 1000,
+    "time_to_first_response_ms": (ready - started + timings[0]) * 1000,
+}))
+"""
+METRICS = ["import_ms", "startup_ms", "first_request_ms", "warm_request_ms", "time_to_first_response_ms"]
+
+
+def cold_start(path: str, env: dict) -> dict:
+    begin = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, path], env=env, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    # Includes interpreter start-up, which the in-process timings cannot see
+    timings["process_ms"] = (time.perf_counter() - begin) * 1000
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/api/v1/jobs?limit=20")
+    parser.add_argument("--record", help="Append the medians to this JSONL file")
+    args = parser.parse_args()
+
+    configurations = [("default", {}), ("no pre-warm", {"DB_POOL_PREWARM": "0"})]
+    results = {}
+    print(f"GET {args.path}, median of {args.runs} cold starts")
+    for label, overrides in configurations:
+        env = {**os.environ, **overrides}
+        runs = [cold_start(args.path, env) for _ in range(args.runs)]
+        medians = {metric: round(statistics.median(run[metric] for run in runs), 1) for metric in METRICS + ["process_ms"]}
+        results[label] = medians
+        print(f"  {label:<12} " + "   ".join(f"{metric} {value:8.1f}" for metric, value in medians.items()))
+
+    if args.record:
+        with open(args.record, "a") as f:
+            f.write(json.dumps({
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "path": args.path,
+                "runs": args.runs,
+                "results": results,
+            }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for the repository layer.
+
+Seeds a scratch schema in the database from DATABASE_URL (use a local
+Postgres, never production), runs every repository query against it and
+EXPLAINs each statement as it is sent. Exits with status 1 when any plan
+sequentially scans a table holding more than --max-seq-rows rows, which
+usually means a lookup is missing its index.
+
+    python check_query_plans.py [--scale 20000] [--max-seq-rows 1000] [--keep]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+load_dotenv()
+
+from core.db import Base, build_async_url, build_connect_args  # noqa: E402
+from domain.blog.repository import BlogRepository, AsyncBlogRepository  # noqa: E402
+from domain.job.repository import JobRepository, AsyncJobRepository  # noqa: E402
+from domain.zan_crew.repository import ZanCrewRepository, AsyncZanCrewRepository, zan_crew_cache  # noqa: E402
+from domain.zan_user.repository import ZanUserRepository, AsyncZanUserRepository, zan_user_cache  # noqa: E402
+import infrastructure.db.models  # noqa: E402,F401  (registers the tables on Base)
+
+SCHEMA = "query_plan_check"
+EXPLAINED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class PlanRecorder:
+    """EXPLAINs every statement a repository call sends and records seq scans"""
+
+    def __init__(self):
+        self.label = None
+        self.table_rows = {}
+        self.statements = 0
+        self.violations = []
+
+    def attach(self, engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label is None or executemany or not statement.lstrip().upper().startswith(EXPLAINED):
+            return
+        explain = conn.connection.dbapi_connection.cursor()
+        explain.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = explain.fetchone()[0]
+        explain.close()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        self.statements += 1
+        for node in _walk(plan[0]["Plan"]):
+            table = node.get("Relation Name")
+            if node["Node Type"] == "Seq Scan" and self.table_rows.get(table, 0) > self.max_seq_rows:
+                self.violations.append((self.label, table, " ".join(statement.split())))
+
+
+def _uncached(call):
+    """Run a repository call with empty lookup caches so its query reaches the database"""
+    zan_user_cache.clear()
+    zan_crew_cache.clear()
+    return call()
+
+
+def _walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def seed(conn, scale: int):
+    """Fill the scratch schema with scale users, scale / 2 crew and scale * 4 jobs"""
+    jobs = scale * 4
+    conn.execute(text("""
+        INSERT INTO users (id, email, name, mobile)
+        SELECT g, 'author' || g || '@example.com', 'Author ' || g, '+4470000' || g
+        FROM generate_series(1, 100) g
+    """))
+    conn.execute(text("""
+        INSERT INTO blogs (id, title, content, author_id)
+        SELECT g, 'Post ' || g, 'Body', 1 + g % 100 FROM generate_series(1, :n) g
+    """), {"n": scale})
+    conn.execute(text("""
+        INSERT INTO zan_user (user_id, first_name, email, phone, is_zancrew, zancrew_id)
+        SELECT g, 'User ' || g, 'user' || g || '@example.com', '+44' || (7000000000 + g),
+               CASE WHEN g % 2 = 0 THEN 'true' ELSE 'false' END, g % 500
+        FROM generate_series(1, :n) g
+    """), {"n": scale})
+    conn.execute(text("""
+        INSERT INTO zan_crew (zancrew_id, phone, zan_user_id, latitude, longitude, radius_km, is_online)
+        SELECT g, '+44' || (7000000000 + g), g,
+               (51.3 + (g % 97) * 0.01)::text, (-0.5 + (g % 89) * 0.01)::text, 10,
+               CASE WHEN g % 20 = 0 THEN 'true' ELSE 'false' END
+        FROM generate_series(1, :n) g
+    """), {"n": scale // 2})
+    conn.execute(text("""
+        INSERT INTO jobs (job_id, user_id, task_title, polished_task, location_address,
+                          latitude, longitude, geo_lat, geo_lng, scheduled_at, duration_hours,
+                          duration_minutes, estimated_cost_pence, assigned_zancrew_user_id,
+                          people_required, actions, tags, bucket, payment_mode, payment_status,
+                          currency, pickup_adress, pickup_latitude, pickup_longitude)
+        SELECT g, 1 + g % :users, 'Task ' || g, 'Polished task ' || g, 'Address',
+               (51.0 + (g % 1000) * 0.001)::text, (-1.0 + (g % 997) * 0.002)::text,
+               51.0 + (g % 1000) * 0.001, -1.0 + (g % 997) * 0.002,
+               now() + g * interval '1 minute', 1, 30, 1000 + g % 5000,
+               CASE WHEN g % 3 = 0 THEN 1 + g % :users END, 1, 'clean', 'Cleaning, area' || g % 500,
+               CASE WHEN g % 50 = 0 THEN 'urgent' END, 'card',
+               CASE WHEN g % 40 = 0 THEN 'paid' ELSE 'pending' END, 'GBP',
+               'Pickup', '51.5', '-0.1'
+        FROM generate_series(1, :n) g
+    """), {"n": jobs, "users": scale})
+    conn.execute(text("""
+        UPDATE jobs SET geo_cell = CAST(
+            LEAST(FLOOR((geo_lat + 90.0) / 0.1), 1799) * 3600
+            + LEAST(FLOOR((geo_lng + 180.0) / 0.1), 3599) AS integer)
+    """))
+    for table, key, count in (("users", "id", 100), ("blogs", "id", scale), ("zan_user", "user_id", scale),
+                              ("zan_crew", "zancrew_id", scale // 2), ("jobs", "job_id", jobs)):
+        conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', '{key}'), {count})"))
+
+
+def sync_calls(db, scale: int):
+    jobs, users, crew, blogs = JobRepository(db), ZanUserRepository(db), ZanCrewRepository(db), BlogRepository(db)
+    phone = "+44" + str(7000000000 + scale // 3)
+    return [
+        ("ZanUserRepository.get_by_id", lambda: users.get_by_id(42)),
+        ("ZanUserRepository.get_by_email", lambda: users.get_by_email("user42@example.com")),
+        ("ZanUserRepository.get_by_phone", lambda: users.get_by_phone(phone)),
+        ("ZanUserRepository.get_existing_ids", lambda: users.get_existing_ids([1, 2, 3])),
+        ("ZanUserRepository.get_ids_by_phones", lambda: users.get_ids_by_phones([phone])),
+        ("ZanUserRepository.get_all", lambda: users.get_all(0, 100)),
+        ("ZanUserRepository.get_all(after_id)", lambda: users.get_all(0, 100, scale // 2)),
+        ("ZanUserRepository.get_by_zancrew_id", lambda: users.get_by_zancrew_id(7, 0, 100)),
+        ("ZanUserRepository.update", lambda: users.update(43, first_name="Renamed", phone=phone)),
+        ("ZanUserRepository.get_version", lambda: users.get_version(42)),
+        ("ZanCrewRepository.get_by_id", lambda: crew.get_by_id(42)),
+        ("ZanCrewRepository.get_by_phone", lambda: crew.get_by_phone(phone)),
+        ("ZanCrewRepository.get_by_zan_user_id", lambda: crew.get_by_zan_user_id(42)),
+        ("ZanCrewRepository.get_all", lambda: crew.get_all(0, 100, 10)),
+        ("ZanCrewRepository.get_all_with_user", lambda: crew.get_all_with_user(0, 100, 10)),
+        ("ZanCrewRepository.update_fields", lambda: crew.update_fields(42, {"is_online": "true"})),
+        ("ZanCrewRepository.update_phone_by_user_id", lambda: crew.update_phone_by_user_id(42, phone)),
+        ("ZanCrewRepository.upsert_many", lambda: crew.upsert_many([{"zan_user_id": 42, "phone": phone}])),
+        ("JobRepository.get_by_id", lambda: jobs.get_by_id(42)),
+        ("JobRepository.get_all", lambda: jobs.get_all(0, 100, 1000)),
+        ("JobRepository.get_by_user_id", lambda: jobs.get_by_user_id(42, 0, 100)),
+        ("JobRepository.update_fields", lambda: jobs.update_fields(42, {"latitude": "51.6"})),
+        ("JobRepository.delete", lambda: jobs.delete(44)),
+        ("BlogRepository.get_by_id", lambda: blogs.get_by_id(42)),
+        ("BlogRepository.get_all", lambda: blogs.get_all(0, 100, 1000)),
+        ("BlogRepository.get_version", lambda: blogs.get_version(42)),
+    ]
+
+
+def async_calls(db, scale: int):
+    jobs, users, crew, blogs = (AsyncJobRepository(db), AsyncZanUserRepository(db),
+                                AsyncZanCrewRepository(db), AsyncBlogRepository(db))
+    phone = "+44" + str(7000000000 + scale // 3)
+    return [
+        ("AsyncZanUserRepository.get_by_id", lambda: users.get_by_id(42)),
+        ("AsyncZanUserRepository.get_by_phone", lambda: users.get_by_phone(phone)),
+        ("AsyncZanUserRepository.get_existing_ids", lambda: users.get_existing_ids([1, 2, 3])),
+        ("AsyncZanUserRepository.get_ids_by_phones", lambda: users.get_ids_by_phones([phone])),
+        ("AsyncZanCrewRepository.get_by_id", lambda: crew.get_by_id(42)),
+        ("AsyncZanCrewRepository.get_by_phone", lambda: crew.get_by_phone(phone)),
+        ("AsyncZanCrewRepository.get_by_zan_user_id", lambda: crew.get_by_zan_user_id(42)),
+        ("AsyncZanCrewRepository.get_all", lambda: crew.get_all(0, 100, 10)),
+        ("AsyncZanCrewRepository.get_all(fields)", lambda: crew.get_all(0, 100, 10, ["zancrew_id", "phone"])),
+        ("AsyncZanCrewRepository.get_all_with_user", lambda: crew.get_all_with_user(0, 100, 10)),
+        ("AsyncZanCrewRepository.get_dispatchable", lambda: crew.get_dispatchable()),
+        ("AsyncZanCrewRepository.update_fields", lambda: crew.update_fields(42, {"is_online": "true"})),
+        ("AsyncZanCrewRepository.upsert_many", lambda: crew.upsert_many([{"zan_user_id": 42, "phone": phone}])),
+        ("AsyncZanCrewRepository.get_version", lambda: crew.get_version(42)),
+        ("AsyncJobRepository.get_by_id", lambda: jobs.get_by_id(42)),
+        ("AsyncJobRepository.get_all", lambda: jobs.get_all(0, 100, 1000)),
+        ("AsyncJobRepository.get_all(fields)", lambda: jobs.get_all(0, 100, 10, ["job_id", "task_title"])),
+        ("AsyncJobRepository.get_by_user_id", lambda: jobs.get_by_user_id(42, 0, 100, 10)),
+        ("AsyncJobRepository.get_all(payment_status)",
+         lambda: jobs.get_all(0, 100, None, None, {"payment_status": "paid"}, "scheduled_at", True)),
+        ("AsyncJobRepository.get_all(bucket, window)",
+         lambda: jobs.get_all(0, 100, None, None, {"bucket": "urgent", "scheduled_from": datetime(2030, 1, 1),
+                                                   "scheduled_to": datetime(2030, 2, 1)}, "scheduled_at")),
+        ("AsyncJobRepository.get_all(assignee, cursor)",
+         lambda: jobs.get_all(0, 100, [datetime(2030, 1, 1), 10], None, {"assigned_zancrew_user_id": 42},
+                              "scheduled_at")),
+        ("AsyncJobRepository.get_all(-job_id)", lambda: jobs.get_all(0, 100, 5000, None, None, "job_id", True)),
+        ("AsyncJobRepository.get_nearby", lambda: jobs.get_nearby(51.5, -0.5, 5, 100)),
+        ("AsyncJobRepository.get_nearby(cursor)", lambda: jobs.get_nearby(51.5, -0.5, 5, 100, [1.0, 10])),
+        ("AsyncJobRepository.get_nearby(antimeridian)", lambda: jobs.get_nearby(0.0, 179.99, 50, 100)),
+        ("AsyncJobRepository.get_nearby(pole)", lambda: jobs.get_nearby(89.9, 0.0, 50, 100)),
+        ("AsyncJobRepository.search", lambda: jobs.search("task 4242", None, 100)),
+        ("AsyncJobRepository.search(tags)", lambda: jobs.search(None, ["area7"], 100)),
+        ("AsyncJobRepository.search(cursor)", lambda: jobs.search("task 4242", ["area242"], 100, [0.1, 10])),
+        ("AsyncJobRepository.get_version", lambda: jobs.get_version(42)),
+        ("AsyncJobRepository.update_fields", lambda: jobs.update_fields(42, {"latitude": "51.6"})),
+        ("AsyncJobRepository.delete", lambda: jobs.delete(43)),
+        ("AsyncBlogRepository.get_all", lambda: blogs.get_all(0, 100, 1000)),
+    ]
+
+
+async def run_async(recorder, database_url: str, scale: int):
+    async_url, connect_args = build_async_url(database_url)
+    connect_args["server_settings"] = {"search_path": SCHEMA}
+    engine = create_async_engine(async_url, connect_args=connect_args)
+    recorder.attach(engine.sync_engine)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            for label, call in async_calls(db, scale):
+                recorder.label = label
+                await _uncached(call)
+    finally:
+        recorder.label = None
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=20000, help="number of seeded zan_user rows")
+    parser.add_argument("--max-seq-rows", type=int, default=1000,
+                        help="fail on a sequential scan of any table larger than this")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema afterwards")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("❌ ERROR: DATABASE_URL is not set")
+        sys.exit(1)
+
+    connect_args = build_connect_args(database_url)
+    connect_args["options"] = f"-csearch_path={SCHEMA}"
+    engine = create_engine(database_url, connect_args=connect_args)
+    recorder = PlanRecorder()
+    recorder.max_seq_rows = args.max_seq_rows
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    try:
+        print(f"Seeding {SCHEMA} (scale {args.scale})...")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            seed(conn, args.scale)
+            for table in Base.metadata.tables:
+                conn.execute(text(f"ANALYZE {table}"))
+            recorder.table_rows = dict(conn.execute(text(
+                "SELECT relname, reltuples::bigint FROM pg_class "
+                "WHERE relnamespace = CAST(:schema AS regnamespace) AND relkind = 'r'"
+            ), {"schema": SCHEMA}).all())
+
+        recorder.attach(engine)
+        with Session(engine) as db:
+            for label, call in sync_calls(db, args.scale):
+                recorder.label = label
+                _uncached(call)
+        recorder.label = None
+        asyncio.run(run_async(recorder, database_url, args.scale))
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+    print(f"Explained {recorder.statements} statements at {datetime.now():%Y-%m-%d %H:%M:%S}")
+    if recorder.violations:
+        print(f"\n❌ {len(recorder.violations)} sequential scan(s) over tables above {args.max_seq_rows} rows:")
+        for label, table, statement in recorder.violations:
+            print(f"\n  {label}: Seq Scan on {table}\n    {statement[:300]}")
+        sys.exit(1)
+    print("✅ No sequential scans over large tables")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# Local verification of Supabase access tokens.
+#
+# Tokens are checked in-process with PyJWT, so authenticated routes make no
+# network call on the hot path:
+#   * HS256 tokens (legacy projects) against SUPABASE_JWT_SECRET
+#   * asymmetric tokens (ES256/RS256) against the project's JWKS, fetched
+#     once and cached; an unknown ``kid`` triggers a (rate limited) refetch
+#     so key rotation is picked up without a restart. The algorithm is the
+#     key's own, never the one the token's header names.
+# The audience and the issuer (the project's auth URL) must match.
+# Verified claims are cached by token hash until the token expires.
+import asyncio
+import hashlib
+import time
+from typing import Optional
+import anyio
+import jwt
+from cachetools import TLRUCache
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from core.config import (
+    SUPABASE_ANON_KEY, SUPABASE_JWT_SECRET, SUPABASE_JWKS_URL, SUPABASE_JWT_AUDIENCE,
+    SUPABASE_JWT_ISSUER, JWKS_CACHE_TTL, JWT_CLAIMS_CACHE_SIZE, JWT_CLAIMS_CACHE_TTL,
+)
+from core.supabase import open_supabase_pool
+from domain.auth.schemas import CurrentUser
+
+# Minimum seconds between JWKS refetches forced by an unknown kid
+JWKS_MIN_REFRESH_INTERVAL = 30
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256", "EdDSA"}
+
+
+class InvalidTokenError(ValueError):
+    pass
+
+
+class JWKSCache:
+    def __init__(self, url: str, ttl: int):
+        self.url = url
+        self.ttl = ttl
+        self._keys = {}
+        self._fetched_at = None
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl
+
+    async def get_signing_key(self, kid: str) -> jwt.PyJWK:
+        if kid not in self._keys or self._stale():
+            async with self._lock:
+                # Another request may have refreshed while we waited
+                recently = (
+                    self._fetched_at is not None
+                    and time.monotonic() - self._fetched_at < JWKS_MIN_REFRESH_INTERVAL
+                )
+                if self._stale() or (kid not in self._keys and not recently):
+                    await self._refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            raise InvalidTokenError("Unknown signing key")
+        return key
+
+    async def warm(self):
+        """Fetch the key set ahead of the first request; a failure is retried on demand"""
+        # Importing httpx and loading the TLS context block, so not on the event loop
+        await anyio.to_thread.run_sync(open_supabase_pool)
+        async with self._lock:
+            try:
+                await self._refresh()
+            except InvalidTokenError as e:
+                print(f"Warning: Could not prefetch JWKS: {e}")
+
+    async def _refresh(self):
+        try:
+            response = await open_supabase_pool().get(self.url, headers={"apikey": SUPABASE_ANON_KEY})
+            response.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(response.json())
+        except Exception as e:
+            if self._keys:
+                # Keep serving the last known keys if Supabase is unreachable
+                self._fetched_at = time.monotonic()
+                return
+            raise InvalidTokenError(f"Could not load signing keys: {e}")
+        self._keys = {key.key_id: key for key in key_set.keys if key.key_id}
+        self._fetched_at = time.monotonic()
+
+
+jwks_cache = JWKSCache(SUPABASE_JWKS_URL, JWKS_CACHE_TTL)
+
+# Verified claims by sha256(token); entries never outlive the token's exp
+claims_cache = TLRUCache(
+    maxsize=JWT_CLAIMS_CACHE_SIZE,
+    ttu=lambda _key, claims, now: min(now + JWT_CLAIMS_CACHE_TTL, claims["exp"]),
+    timer=time.time,
+)
+
+
+async def verify_token(token: str) -> dict:
+    """Verified claims of an access token, raising InvalidTokenError if it is not valid"""
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    claims = claims_cache.get(token_hash)
+    if claims is not None:
+        return claims
+
+    try:
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == "HS256" and SUPABASE_JWT_SECRET:
+            key = SUPABASE_JWT_SECRET
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            signing_key = await jwks_cache.get_signing_key(header.get("kid"))
+            key, algorithm = signing_key.key, signing_key.algorithm_name
+        else:
+            raise InvalidTokenError(f"Unsupported token algorithm: {algorithm}")
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=SUPABASE_JWT_AUDIENCE,
+            issuer=SUPABASE_JWT_ISSUER,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.PyJWTError as e:
+        raise InvalidTokenError(str(e))
+
+    claims_cache[token_hash] = claims
+    return claims
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> CurrentUser:
+    """Authenticate the request from its Supabase access token (Authorization: Bearer ...)"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        claims = await verify_token(credentials.credentials)
+    except InvalidTokenError as e:
+        raise HTTPException(
+            status_code=401,
+            detail=f"Invalid access token: {e}",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return CurrentUser(
+        id=claims["sub"],
+        phone=claims.get("phone") or None,
+        email=claims.get("email") or None,
+        role=claims.get("role"),
+        session_id=claims.get("session_id"),
+        expires_at=claims["exp"],
+    )
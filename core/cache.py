@@ -0,0 +1,117 @@
+# In-process read-through cache for hot single-row lookups.
+#
+# Entries are immutable-by-convention snapshots (pydantic response models),
+# never ORM instances, so they can be shared across sessions and threads.
+# Each entry is registered under the id of the entity it describes; writes
+# invalidate every key cached for that entity (e.g. both its id and its
+# phone). Misses are not cached, so newly created rows are visible at once.
+#
+# A lookup that misses takes the cache's generation before loading the row.
+# invalidate() bumps the generation, and set() drops a row loaded before
+# the last invalidation of its entity, so a read racing a write cannot put
+# the old row back.
+#
+# The cache is per worker process: a write only invalidates the entries of
+# the worker that made it, and the others keep serving their snapshot until
+# the TTL expires. Sessions say where their reads come from in Session.info:
+# - "replica": the replica may not have replayed a write that just
+#   invalidated an entry, so rows read from it are cached for the shorter
+#   replica TTL (or not at all when it is 0)
+# - "read_your_writes": a read carrying a consistency token must see the
+#   client's own write, which this worker's entry may predate, so it skips
+#   the cache
+import threading
+import time
+from cachetools import TLRUCache, TTLCache
+
+_MISSING = object()
+
+
+def cache_readable(db) -> bool:
+    """Whether lookups made over session db may be answered from the cache"""
+    return not db.info.get("read_your_writes")
+
+
+def from_replica(db) -> bool:
+    """Whether rows loaded over session db may come from the replica"""
+    return bool(db.info.get("replica"))
+
+
+def _expires(key, entry, now):
+    return now + entry[1]
+
+
+class LookupCache:
+    def __init__(self, name: str, maxsize: int, ttl: int, replica_ttl: int = 0, timer=time.monotonic):
+        self.name = name
+        self.ttl = ttl
+        self.replica_ttl = min(replica_ttl, ttl)
+        # (value, ttl) pairs, each expiring after its own ttl
+        self._entries = TLRUCache(maxsize=maxsize, ttu=_expires, timer=timer)
+        self._keys_by_owner = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        # Generation of each entity's last invalidation, kept for as long as
+        # a load that started before it could still be in flight
+        self._invalidated = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def generation(self) -> int:
+        """Generation to pass to set() for a row about to be loaded"""
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, owner, generation: int, replica: bool = False) -> bool:
+        """Cache value under key, unless owner was invalidated after generation was taken.
+
+        Values loaded from the replica are kept for replica_ttl seconds.
+        Returns whether the value was cached.
+        """
+        ttl = self.replica_ttl if replica else self.ttl
+        if ttl <= 0:
+            return False
+        with self._lock:
+            if self._invalidated.get(owner, -1) > generation:
+                return False
+            self._entries[key] = (value, ttl)
+            keys = self._keys_by_owner.get(owner, set())
+            keys.add(key)
+            self._keys_by_owner[owner] = keys
+            return True
+
+    def invalidate(self, owner):
+        """Drop every key cached for an entity, and any load of it still in flight"""
+        with self._lock:
+            self._generation += 1
+            self._invalidated[owner] = self._generation
+            for key in self._keys_by_owner.pop(owner, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_owner.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self._entries.maxsize,
+                "ttl_seconds": self.ttl,
+                "replica_ttl_seconds": self.replica_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
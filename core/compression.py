@@ -0,0 +1,146 @@
+# Response compression negotiated from Accept-Encoding (zstd, then gzip).
+#
+# List responses are large, highly repetitive JSON, so both codecs shrink
+# them several times over. Bodies under COMPRESSION_MINIMUM_SIZE go out
+# as-is; bodies of COMPRESSION_OFFLOAD_SIZE or more are compressed in a
+# worker thread so the event loop keeps serving other requests. Streaming
+# responses (the exports) are compressed chunk by chunk and flushed after
+# each chunk, so clients still receive rows as they are produced.
+import zlib
+import anyio
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from core.config import (
+    COMPRESSION_MINIMUM_SIZE, COMPRESSION_OFFLOAD_SIZE, COMPRESSION_ZSTD_LEVEL, COMPRESSION_GZIP_LEVEL,
+)
+
+# Preferred first when the client accepts several with the same q-value
+SUPPORTED_ENCODINGS = ("zstd", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+UNCOMPRESSED_STATUSES = {204, 206, 304}
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Best supported encoding for an Accept-Encoding header, or None for identity"""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            qualities[coding] = q
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = qualities.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class StreamCompressor:
+    """Incremental zstd/gzip encoder; flush() ends each chunk on a decodable boundary"""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._encoder = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._encoder = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        compressed = self._encoder.compress(data)
+        return compressed + (self._encoder.flush() if final else self._encoder.flush(self._flush_mode))
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """One-shot compression of a complete body"""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(body)
+    return StreamCompressor("gzip").compress(body, final=True)
+
+
+async def _run(function, *args):
+    # Big inputs are compressed off the event loop; zlib and zstandard release the GIL
+    if len(args[0]) >= COMPRESSION_OFFLOAD_SIZE:
+        return await anyio.to_thread.run_sync(function, *args)
+    return function(*args)
+
+
+class CompressionMiddleware:
+    """Compress compressible responses with the client's preferred encoding"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                passthrough = (
+                    message["status"] in UNCOMPRESSED_STATUSES
+                    or "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Hold the headers back until the first body chunk shows the size;
+                    # copied, as Response.__call__ sends its own raw_headers list
+                    start = {**message, "headers": list(message.get("headers", []))}
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < COMPRESSION_MINIMUM_SIZE:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                    compressor = StreamCompressor(encoding)
+                else:
+                    body = await _run(compress, body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+            elif compressor is None:
+                # Single-body response already compressed above
+                await send(message)
+                return
+            if compressor is not None:
+                body = await _run(compressor.compress, body, not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
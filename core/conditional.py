@@ -0,0 +1,85 @@
+# Conditional GETs (ETag / Last-Modified) for single-resource endpoints.
+#
+# Validators are derived from the row's version timestamp (updated_at, or
+# created_at for rows never updated), so a revalidation only needs that one
+# column: routes look it up with a primary-key SELECT and answer 304 Not
+# Modified without loading or serializing the row. A ?fields= projection is
+# a different representation and gets its own ETag.
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from sqlalchemy import func
+
+VERSION_FIELDS = ["updated_at", "created_at"]
+
+
+def is_conditional(request: Request) -> bool:
+    """Whether the client sent a validator worth checking before loading the row"""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def with_version_fields(fields: list = None):
+    """Extend a ?fields= projection with the columns the validators are computed from"""
+    if not fields:
+        return fields
+    return fields + [name for name in VERSION_FIELDS if name not in fields]
+
+
+def row_version(row):
+    """Version timestamp of an entity, snapshot or projected row"""
+    return row.updated_at or row.created_at
+
+
+def version_column(model):
+    """SQL expression for a model's version timestamp, mirroring row_version()"""
+    return func.coalesce(model.updated_at, model.created_at)
+
+
+def _utc(version: datetime) -> datetime:
+    if version.tzinfo is None:
+        return version.replace(tzinfo=timezone.utc)
+    return version.astimezone(timezone.utc)
+
+
+def validators(resource: str, version: datetime, fields: list = None) -> dict:
+    """ETag and Last-Modified headers for one representation of a resource version"""
+    version = _utc(version)
+    tag = f"{resource}-{int(version.timestamp() * 1_000_000)}"
+    if fields:
+        tag += "-" + hashlib.sha1(",".join(fields).encode()).hexdigest()[:10]
+    return {
+        "ETag": f'W/"{tag}"',
+        "Last-Modified": format_datetime(version.replace(microsecond=0), usegmt=True),
+    }
+
+
+def _opaque(tag: str) -> str:
+    # Weak comparison: W/"x" and "x" match
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, headers: dict, version: datetime) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110 13.2.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = _opaque(headers["ETag"])
+        return any(_opaque(tag) == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        # Unparseable dates are ignored
+        return False
+    # Last-Modified only has second precision
+    return _utc(version).replace(microsecond=0) <= _utc(since)
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
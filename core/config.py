@@ -6,12 +6,81 @@ load_dotenv()
 APP_NAME = os.getenv("APP_NAME")
 DEBUG = os.getenv("DEBUG") == "true"
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional explicit asyncpg URL; derived from DATABASE_URL when not set
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Optional read replica; when set, GET/HEAD requests are served from it
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL")
+# Seconds a client stays pinned to the primary after a write
+CONSISTENCY_TOKEN_TTL = int(os.getenv("CONSISTENCY_TOKEN_TTL", "30"))
+
+# Seconds between full reloads of the in-memory crew dispatch index
+CREW_INDEX_REFRESH_SECONDS = int(os.getenv("CREW_INDEX_REFRESH_SECONDS", "60"))
+
+# Read-through cache for zan_user / zan_crew lookups (entries per cache, seconds).
+# Each worker process has its own cache, so after a write the other workers
+# may serve the previous snapshot for up to LOOKUP_CACHE_TTL seconds
+LOOKUP_CACHE_SIZE = int(os.getenv("LOOKUP_CACHE_SIZE", "10000"))
+LOOKUP_CACHE_TTL = int(os.getenv("LOOKUP_CACHE_TTL", "60"))
+# Rows read from the replica may predate a write this worker has just
+# invalidated, so they are cached for this shorter TTL; with the replica's
+# lag it should stay within LOOKUP_CACHE_TTL. 0 never caches replica reads
+LOOKUP_CACHE_REPLICA_TTL = int(os.getenv("LOOKUP_CACHE_REPLICA_TTL", "10"))
+
+# Rows fetched per server-side cursor round trip by the streaming exports
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Response compression: bodies below the minimum are sent as-is, bodies at
+# or above the offload size are compressed in a worker thread
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", "65536"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+# Connection pool sizing (applies to each engine)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Connections opened per engine at startup, so first requests skip the handshake
+DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", "2"))
+
+# GET /api/v2/health/deep: seconds a database probe result is reused, and
+# seconds before a probe counts as failed
+HEALTH_PROBE_TTL = float(os.getenv("HEALTH_PROBE_TTL", "5"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+
+# Startup schema check against alembic head: "strict" refuses to start on a
+# mismatch, "warn" logs it, "off" skips the check
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "warn").lower()
 
 # Supabase configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 # SSL verification for Supabase (set to "false" to disable SSL verification in development)
 SUPABASE_VERIFY_SSL = os.getenv("SUPABASE_VERIFY_SSL", "true").lower() == "true"
+# Shared HTTP/2 connection pool for Supabase API calls
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+
+# Local access token verification: HS256 shared secret (legacy projects)
+# and/or the project's JWKS for asymmetric signing keys
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{(SUPABASE_URL or '').rstrip('/')}/auth/v1/.well-known/jwks.json"
+)
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+# Expected "iss" claim; set it empty to skip the check
+SUPABASE_JWT_ISSUER = os.getenv(
+    "SUPABASE_JWT_ISSUER",
+    f"{(SUPABASE_URL or '').rstrip('/')}/auth/v1"
+) or None
+JWKS_CACHE_TTL = int(os.getenv("JWKS_CACHE_TTL", "600"))
+# Verified token claims (entries, max seconds; never beyond the token's exp)
+JWT_CLAIMS_CACHE_SIZE = int(os.getenv("JWT_CLAIMS_CACHE_SIZE", "10000"))
+JWT_CLAIMS_CACHE_TTL = int(os.getenv("JWT_CLAIMS_CACHE_TTL", "300"))
 
 if not DATABASE_URL:
     raise ValueError(
@@ -0,0 +1,98 @@
+# Read-your-writes consistency for replica routing.
+#
+# After a successful write the client receives the primary's current WAL LSN
+# as a short-lived token (cookie + response header). Reads carrying that token
+# are served from the primary until the replica has replayed past that LSN.
+import re
+from sqlalchemy import text
+from core.config import CONSISTENCY_TOKEN_TTL
+from core.db import REPLICA_ENABLED, get_engine, get_async_engine
+
+CONSISTENCY_COOKIE = "consistency_token"
+CONSISTENCY_HEADER = "X-Consistency-Token"
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_LSN_PATTERN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+_REPLICA_CAUGHT_UP = text(
+    "SELECT COALESCE(pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn), true)"
+)
+
+
+def get_consistency_token(request):
+    """Return the LSN token sent by the client, if it is well formed"""
+    token = request.headers.get(CONSISTENCY_HEADER) or request.cookies.get(CONSISTENCY_COOKIE)
+    if token and _LSN_PATTERN.match(token):
+        return token
+    return None
+
+
+def replica_has_caught_up(lsn: str) -> bool:
+    try:
+        with get_engine(replica=True).connect() as conn:
+            return bool(conn.execute(_REPLICA_CAUGHT_UP, {"lsn": lsn}).scalar())
+    except Exception:
+        # If the replica cannot answer, be safe and read from the primary
+        return False
+
+
+async def async_replica_has_caught_up(lsn: str) -> bool:
+    try:
+        async with get_async_engine(replica=True).connect() as conn:
+            return bool((await conn.execute(_REPLICA_CAUGHT_UP, {"lsn": lsn})).scalar())
+    except Exception:
+        return False
+
+
+def should_use_replica(request) -> bool:
+    if not REPLICA_ENABLED or request.method not in READ_METHODS:
+        return False
+    token = get_consistency_token(request)
+    return token is None or replica_has_caught_up(token)
+
+
+async def async_should_use_replica(request) -> bool:
+    if not REPLICA_ENABLED or request.method not in READ_METHODS:
+        return False
+    token = get_consistency_token(request)
+    return token is None or await async_replica_has_caught_up(token)
+
+
+class ConsistencyTokenMiddleware:
+    """Attach the primary's WAL LSN to responses of successful writes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not REPLICA_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] in READ_METHODS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                lsn = await self._current_lsn()
+                if lsn:
+                    headers = list(message.get("headers", []))
+                    headers.append((CONSISTENCY_HEADER.lower().encode(), lsn.encode()))
+                    cookie = (
+                        f"{CONSISTENCY_COOKIE}={lsn}; Max-Age={CONSISTENCY_TOKEN_TTL}; "
+                        "Path=/; HttpOnly; SameSite=Lax"
+                    )
+                    headers.append((b"set-cookie", cookie.encode()))
+                    message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_token)
+
+    async def _current_lsn(self):
+        try:
+            async with get_async_engine().connect() as conn:
+                return (await conn.execute(text("SELECT pg_current_wal_lsn()::text"))).scalar()
+        except Exception:
+            return None
@@ -1,7 +1,14 @@
 # app/core/db.py
+import inspect
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
-from core.config import DATABASE_URL
+from core.config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DATABASE_REPLICA_URL, ASYNC_DATABASE_REPLICA_URL,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW
+)
+from core.pool_metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument_engine
 
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not configured. Please set CONNECTION_STRING in your environment.")
@@ -12,38 +19,247 @@ if "supabase.co" in DATABASE_URL and ":5432" in DATABASE_URL and "pooler" not in
     print("   This may cause connection timeouts. Consider using the connection pooler (port 6543).")
     print("   Get it from: Supabase Dashboard → Settings → Database → Connection Pooling")
 
-# Configure engine with SSL support for Supabase/cloud databases
-# Supabase connection strings typically already include sslmode in the URL
-# If not present, we'll add it via connect_args
-connect_args = {}
-if "supabase.co" in DATABASE_URL:
-    # Supabase requires SSL connections - add if not already in URL
-    if "sslmode" not in DATABASE_URL.lower():
-        connect_args = {"sslmode": "require"}
-    # Add connection timeout and keepalive settings for Supabase
-    connect_args.update({
-        "connect_timeout": 10,  # 10 second connection timeout
-        "keepalives": 1,
-        "keepalives_idle": 30,
-        "keepalives_interval": 10,
-        "keepalives_count": 5,
-    })
-
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_size=5,  # Number of connections to maintain
-    max_overflow=10,  # Additional connections beyond pool_size
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    connect_args=connect_args
-)
-print(engine)
-print("Engine created successfully")
 
+def build_connect_args(url: str):
+    """psycopg2 connect_args with SSL support for Supabase/cloud databases"""
+    # Supabase connection strings typically already include sslmode in the URL
+    # If not present, we'll add it via connect_args
+    connect_args = {}
+    if "supabase.co" in url:
+        # Supabase requires SSL connections - add if not already in URL
+        if "sslmode" not in url.lower():
+            connect_args = {"sslmode": "require"}
+        # Add connection timeout and keepalive settings for Supabase
+        connect_args.update({
+            "connect_timeout": 10,  # 10 second connection timeout
+            "keepalives": 1,
+            "keepalives_idle": 30,
+            "keepalives_interval": 10,
+            "keepalives_count": 5,
+        })
+    return connect_args
+
+
+def build_async_url(url: str):
+    """Translate a libpq-style DATABASE_URL into an asyncpg URL plus connect_args.
+
+    asyncpg does not understand libpq query parameters such as ``sslmode``,
+    so they are stripped from the URL and mapped onto asyncpg arguments.
+    """
+    async_url = make_url(url)
+    if async_url.drivername in ("postgresql", "postgres", "postgresql+psycopg2"):
+        async_url = async_url.set(drivername="postgresql+asyncpg")
+
+    async_args = {}
+    sslmode = async_url.query.get("sslmode")
+    if sslmode and sslmode != "disable":
+        async_args["ssl"] = "require"
+    elif "supabase.co" in url or "supabase.com" in url:
+        # Supabase requires SSL connections
+        async_args["ssl"] = "require"
+    async_url = async_url.difference_update_query(["sslmode", "connect_timeout"])
+
+    if "supabase" in url:
+        async_args["timeout"] = 10  # 10 second connection timeout
+
+    # The Supabase pooler (PgBouncer in transaction mode) cannot keep
+    # prepared statements across transactions
+    if "pooler" in url or async_url.port == 6543:
+        async_args["statement_cache_size"] = 0
+        async_url = async_url.update_query_dict({"prepared_statement_cache_size": "0"})
+
+    return async_url, async_args
+
+
+def _create_engine(url: str, name: str):
+    engine = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,  # QueuePool reporting to core.pool_metrics
+        pool_pre_ping=True,  # Verify connections before using
+        pool_size=DB_POOL_SIZE,  # Number of connections to maintain
+        max_overflow=DB_MAX_OVERFLOW,  # Additional connections beyond pool_size
+        pool_recycle=3600,  # Recycle connections after 1 hour
+        connect_args=build_connect_args(url)
+    )
+    instrument_engine(engine, name)
+    return engine
+
+
+def _create_async_engine(url: str, name: str):
+    async_url, async_connect_args = build_async_url(url)
+    engine = create_async_engine(
+        async_url,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_pre_ping=True,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=3600,
+        connect_args=async_connect_args
+    )
+    instrument_engine(engine, name)
+    return engine
+
+
+# Reads are routed to the replica when one is configured; otherwise the
+# replica engines are simply the primary ones and routing is a no-op
+REPLICA_ENABLED = bool(DATABASE_REPLICA_URL)
+
+# Engines are created by init_engines() from the application lifespan (or
+# on first use by scripts), not at import: building them loads the
+# psycopg2/asyncpg dialects, which a process that never touches the
+# database should not pay for
+_engine = None
+_async_engine = None
+_replica_engine = None
+_async_replica_engine = None
+
+# Bound to their engines by init_engines()
 SessionLocal = sessionmaker(
     autocommit=False,
+    autoflush=False
+)
+
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    info={"replica": True}
+)
+
+# expire_on_commit=False so ORM objects stay readable after commit without
+# triggering implicit (and in asyncio, forbidden) lazy loads
+AsyncSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False
+)
+
+AsyncReplicaSessionLocal = async_sessionmaker(
     autoflush=False,
-    bind=engine
+    expire_on_commit=False,
+    info={"replica": True}
 )
 
+
+class LazySession:
+    """Stand-in for a Session that creates it on first use.
+
+    Requests that return early or are answered from a cache never build a
+    Session, and factory (which may first ask the replica whether it has
+    caught up) only runs when a repository actually touches the database.
+    The Session itself checks a connection out on its first query.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._session = None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    def release(self):
+        """End the transaction, returning the connection, and keep loaded objects readable"""
+        if self._session is not None:
+            self._session.expire_on_commit = False
+            self._session.commit()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class AsyncLazySession:
+    """Stand-in for an AsyncSession that opens it on first use.
+
+    open_session is a coroutine function, so choosing the engine may await
+    the replica; it runs on the first awaited call (execute, get, commit...).
+    A synchronous call made before any query, such as add(), cannot wait for
+    that and is served by fallback, the primary's factory. info is fixed up
+    front and given to whichever session is opened, so the lookup caches can
+    consult it before a session exists.
+    """
+
+    def __init__(self, open_session, fallback, info: dict = None):
+        self._open_session = open_session
+        self._fallback = fallback
+        self._session = None
+        self.info = info or {}
+
+    async def _opened(self):
+        if self._session is None:
+            self._session = await self._open_session(self.info)
+        return self._session
+
+    def __getattr__(self, name):
+        if self._session is None:
+            attribute = getattr(AsyncSession, name)
+            if inspect.iscoroutinefunction(attribute):
+                async def deferred(*args, **kwargs):
+                    return await getattr(await self._opened(), name)(*args, **kwargs)
+                return deferred
+            self._session = self._fallback(info=self.info)
+        return getattr(self._session, name)
+
+    async def release(self):
+        """End the transaction, returning the connection (expire_on_commit is already off)"""
+        if self._session is not None:
+            await self._session.commit()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+def init_engines():
+    """Create the engines and bind the session factories to them (idempotent)"""
+    global _engine, _async_engine, _replica_engine, _async_replica_engine
+    if _engine is not None:
+        return
+    _engine = _create_engine(DATABASE_URL, "primary")
+    _async_engine = _create_async_engine(ASYNC_DATABASE_URL or DATABASE_URL, "primary_async")
+    if REPLICA_ENABLED:
+        _replica_engine = _create_engine(DATABASE_REPLICA_URL, "replica")
+        _async_replica_engine = _create_async_engine(
+            ASYNC_DATABASE_REPLICA_URL or DATABASE_REPLICA_URL, "replica_async"
+        )
+    else:
+        _replica_engine = _engine
+        _async_replica_engine = _async_engine
+    SessionLocal.configure(bind=_engine)
+    ReplicaSessionLocal.configure(bind=_replica_engine)
+    AsyncSessionLocal.configure(bind=_async_engine)
+    AsyncReplicaSessionLocal.configure(bind=_async_replica_engine)
+
+
+def get_engine(replica: bool = False):
+    init_engines()
+    return _replica_engine if replica else _engine
+
+
+def get_async_engine(replica: bool = False):
+    init_engines()
+    return _async_replica_engine if replica else _async_engine
+
+
+def all_engines():
+    """Distinct (sync, async) engines; the replica ones may be the primary's"""
+    init_engines()
+    sync_engines = [_engine] + ([_replica_engine] if REPLICA_ENABLED else [])
+    async_engines = [_async_engine] + ([_async_replica_engine] if REPLICA_ENABLED else [])
+    return sync_engines, async_engines
+
+
+async def dispose_engines():
+    """Close every pooled connection and drop the engines"""
+    global _engine, _async_engine, _replica_engine, _async_replica_engine
+    if _engine is None:
+        return
+    sync_engines, async_engines = all_engines()
+    for async_engine in async_engines:
+        await async_engine.dispose()
+    for engine in sync_engines:
+        engine.dispose()
+    _engine = _async_engine = _replica_engine = _async_replica_engine = None
+
+
 Base = declarative_base()
@@ -1,42 +1,94 @@
-from fastapi import Depends
-from infrastructure.db.session import SessionLocal
+from fastapi import Depends, Request
+from infrastructure.db.session import (
+    SessionLocal, ReplicaSessionLocal, AsyncSessionLocal, AsyncReplicaSessionLocal
+)
+from core.consistency import READ_METHODS, get_consistency_token, should_use_replica, async_should_use_replica
+from core.db import REPLICA_ENABLED, AsyncLazySession, LazySession
+from core.routing import track_session
 from domain.user.repository import UserRepository
 from domain.user.service import UserService
 from domain.blog.repository import BlogRepository
 from domain.blog.service import BlogService
-from domain.job.repository import JobRepository
-from domain.job.service import JobService
-from domain.zan_user.repository import ZanUserRepository
+from domain.job.repository import JobRepository, AsyncJobRepository
+from domain.job.service import JobService, AsyncJobService
+from domain.zan_user.repository import ZanUserRepository, AsyncZanUserRepository
 from domain.zan_user.service import ZanUserService
-from domain.zan_crew.repository import ZanCrewRepository
-from domain.zan_crew.service import ZanCrewService
+from domain.zan_crew.repository import ZanCrewRepository, AsyncZanCrewRepository
+from domain.zan_crew.service import ZanCrewService, AsyncZanCrewService
 
-def get_db():
-    db = SessionLocal()
+def _session_info(request: Request):
+    """How the lookup caches may treat this request's session (see core.cache).
+
+    Known before routing: a read with a consistency token may go to either
+    database, so it neither reads nor fills the caches.
+    """
+    if not REPLICA_ENABLED or request.method not in READ_METHODS:
+        return {}
+    if get_consistency_token(request) is None:
+        return {"replica": True}
+    return {"replica": True, "read_your_writes": True}
+
+def get_db(request: Request):
+    # Reads go to the replica unless the client must see its own recent write;
+    # decided, and the session created, only once a query needs it
+    info = _session_info(request)
+    db = LazySession(lambda: (ReplicaSessionLocal if should_use_replica(request) else SessionLocal)(info=info))
+    track_session(db)
     try:
         yield db
     finally:
         db.close()
 
-def get_user_service(db=Depends(get_db)):
+async def _open_async_session(request: Request, info: dict):
+    use_replica = await async_should_use_replica(request)
+    return (AsyncReplicaSessionLocal if use_replica else AsyncSessionLocal)(info=info)
+
+async def get_async_db(request: Request):
+    db = AsyncLazySession(
+        lambda info: _open_async_session(request, info), AsyncSessionLocal, _session_info(request)
+    )
+    track_session(db)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+# Sessions are requested with scope="function": they are closed as soon as
+# the endpoint's result is serialized, rather than after the response
+# (compressed by CompressionMiddleware) has been sent to a possibly slow
+# client. On SessionRoute routes their transaction, and with it the
+# connection, already ends when the endpoint returns (see core.routing).
+
+def get_user_service(db=Depends(get_db, scope="function")):
     repo = UserRepository(db)
     return UserService(repo)
 
-def get_blog_service(db=Depends(get_db)):
+def get_blog_service(db=Depends(get_db, scope="function")):
     repo = BlogRepository(db)
     return BlogService(repo)
 
-def get_job_service(db=Depends(get_db)):
+def get_job_service(db=Depends(get_db, scope="function")):
     repo = JobRepository(db)
     zan_user_repo = ZanUserRepository(db)
     return JobService(repo, zan_user_repo)
 
-def get_zan_user_service(db=Depends(get_db)):
+def get_zan_user_service(db=Depends(get_db, scope="function")):
     repo = ZanUserRepository(db)
     zan_crew_repo = ZanCrewRepository(db)
     return ZanUserService(repo, zan_crew_repo)
 
-def get_zan_crew_service(db=Depends(get_db)):
+def get_zan_crew_service(db=Depends(get_db, scope="function")):
     zan_crew_repo = ZanCrewRepository(db)
     zan_user_repo = ZanUserRepository(db)
     return ZanCrewService(zan_crew_repo, zan_user_repo)
+
+def get_async_job_service(db=Depends(get_async_db, scope="function")):
+    repo = AsyncJobRepository(db)
+    zan_user_repo = AsyncZanUserRepository(db)
+    zan_crew_repo = AsyncZanCrewRepository(db)
+    return AsyncJobService(repo, zan_user_repo, zan_crew_repo)
+
+def get_async_zan_crew_service(db=Depends(get_async_db, scope="function")):
+    zan_crew_repo = AsyncZanCrewRepository(db)
+    zan_user_repo = AsyncZanUserRepository(db)
+    return AsyncZanCrewService(zan_crew_repo, zan_user_repo)
@@ -0,0 +1,52 @@
+# Sparse fieldsets (?fields=a,b,c) for GET endpoints.
+#
+# Repositories SELECT only the requested columns (plus the primary key, which
+# keyset pagination needs) and routes return just the requested keys,
+# bypassing the full response model.
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+class InvalidFieldsError(ValueError):
+    pass
+
+
+def parse_fields(fields: str, response_model):
+    """Validate a comma separated field list against a response model.
+
+    Returns None when no projection was requested, otherwise the field
+    names in request order without duplicates.
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        raise InvalidFieldsError("fields must name at least one field")
+    unknown = [name for name in names if name not in response_model.model_fields]
+    if unknown:
+        raise InvalidFieldsError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def projected_columns(model, fields, primary_key: str):
+    """Table columns to SELECT for a projection, always including the primary key"""
+    table_columns = model.__table__.c
+    names = fields if primary_key in fields else [primary_key] + fields
+    return [table_columns[name] for name in names]
+
+
+def sparse_response(rows, fields, response=None):
+    """JSON response holding only the requested keys of each row.
+
+    Headers already set on the route's injected ``response`` (e.g. the next
+    page cursor) are carried over, since FastAPI does not merge them into
+    responses returned directly.
+    """
+    if isinstance(rows, (list, tuple)):
+        content = [{name: row._mapping[name] for name in fields} for row in rows]
+    else:
+        content = {name: rows._mapping[name] for name in fields}
+    sparse = JSONResponse(content=jsonable_encoder(content))
+    if response is not None:
+        sparse.headers.raw.extend(response.headers.raw)
+    return sparse
@@ -0,0 +1,127 @@
+# Geospatial helpers for proximity search.
+#
+# Coordinates are bucketed into a fixed grid of CELL_SIZE_DEG x CELL_SIZE_DEG
+# cells. A B-tree index on the integer cell id narrows a radius search to the
+# few ranges of cell ids overlapping the search circle; the exact haversine
+# distance then refines and orders the candidates.
+import math
+from sqlalchemy import Float, Integer, cast, func, literal
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_SIZE_DEG = 0.1  # ~11 km of latitude
+CELL_ROWS = int(round(180 / CELL_SIZE_DEG))
+CELL_COLUMNS = int(round(360 / CELL_SIZE_DEG))
+MAX_SEARCH_RADIUS_KM = 50.0
+
+
+def parse_coordinate(value, bound: float):
+    """Parse a stored string coordinate, returning None if missing or out of range"""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number) or not -bound <= number <= bound:
+        return None
+    return number
+
+
+def parse_latitude(value):
+    return parse_coordinate(value, 90.0)
+
+
+def parse_longitude(value):
+    return parse_coordinate(value, 180.0)
+
+
+def _cell_row(lat: float) -> int:
+    return min(int(math.floor((lat + 90.0) / CELL_SIZE_DEG)), CELL_ROWS - 1)
+
+
+def _cell_column(lng: float) -> int:
+    return min(int(math.floor((lng + 180.0) / CELL_SIZE_DEG)), CELL_COLUMNS - 1)
+
+
+def grid_cell(lat: float, lng: float):
+    if lat is None or lng is None:
+        return None
+    return _cell_row(lat) * CELL_COLUMNS + _cell_column(lng)
+
+
+def bounding_box(lat: float, lng: float, radius_km: float):
+    """(min_lat, max_lat, longitude ranges) enclosing a circle.
+
+    The longitude span is split in two where it crosses the antimeridian and
+    covers every longitude when the circle comes close to a pole.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+    # Widest longitude span occurs at the latitude nearest a pole
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 89.9:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    lng_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(widest))))
+    west, east = lng - lng_delta, lng + lng_delta
+    if lng_delta >= 180.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    if west < -180.0:
+        return min_lat, max_lat, [(-180.0, east), (west + 360.0, 180.0)]
+    if east > 180.0:
+        return min_lat, max_lat, [(-180.0, east - 360.0), (west, 180.0)]
+    return min_lat, max_lat, [(west, east)]
+
+
+def cell_ranges(lat: float, lng: float, radius_km: float):
+    """Inclusive (first, last) ranges of the grid cell ids overlapping the bounding box of a circle.
+
+    Cells are numbered row by row, so each row needs one range per longitude
+    range and adjacent ranges merge: a box spanning every longitude near a
+    pole is a single range rather than thousands of cell ids.
+    """
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+    ranges = []
+    for row in range(_cell_row(min_lat), _cell_row(max_lat) + 1):
+        for west, east in lng_ranges:
+            first, last = row * CELL_COLUMNS + _cell_column(west), row * CELL_COLUMNS + _cell_column(east)
+            if ranges and first <= ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], max(last, ranges[-1][1]))
+            else:
+                ranges.append((first, last))
+    return ranges
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geo_columns(latitude, longitude):
+    """Numeric coordinates and grid cell derived from the stored string coordinates"""
+    lat, lng = parse_latitude(latitude), parse_longitude(longitude)
+    if lat is None or lng is None:
+        return {"geo_lat": lat, "geo_lng": lng, "geo_cell": None}
+    return {"geo_lat": lat, "geo_lng": lng, "geo_cell": grid_cell(lat, lng)}
+
+
+def grid_cell_sql(lat, lng):
+    """SQL counterpart of grid_cell() for use inside UPDATE statements"""
+    row = func.least(func.floor((lat + 90.0) / CELL_SIZE_DEG), CELL_ROWS - 1)
+    column = func.least(func.floor((lng + 180.0) / CELL_SIZE_DEG), CELL_COLUMNS - 1)
+    return cast(row * CELL_COLUMNS + column, Integer)
+
+
+def haversine_sql(lat: float, lng: float, lat_column, lng_column):
+    """SQL haversine distance in km from a fixed point to a pair of columns"""
+    phi1 = math.radians(lat)
+    phi2 = func.radians(lat_column)
+    d_phi = phi2 - literal(phi1, Float)
+    d_lambda = func.radians(lng_column) - literal(math.radians(lng), Float)
+    a = (
+        func.power(func.sin(d_phi / 2), 2)
+        + math.cos(phi1) * func.cos(phi2) * func.power(func.sin(d_lambda / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
@@ -0,0 +1,67 @@
+# Database probe behind GET /api/v2/health/deep.
+#
+# A probe runs SELECT 1 on every async engine and times the round trip.
+# Its result is reused for HEALTH_PROBE_TTL seconds, and concurrent checks
+# wait for the probe already in flight, so however often load balancers
+# poll, each worker sends at most one probe per engine per TTL.
+import asyncio
+import time
+from datetime import datetime, timezone
+from sqlalchemy import text
+from core.config import HEALTH_PROBE_TIMEOUT, HEALTH_PROBE_TTL
+from core.db import REPLICA_ENABLED, get_async_engine
+
+
+async def _select_one(async_engine):
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def _round_trip(async_engine):
+    # The timeout covers the pool checkout too, so an exhausted pool shows
+    # up as a failed probe instead of a check hanging for the pool timeout
+    start = time.perf_counter()
+    error = None
+    try:
+        await asyncio.wait_for(_select_one(async_engine), HEALTH_PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        error = f"Timed out after {HEALTH_PROBE_TIMEOUT:g}s"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    result = {"ok": error is None, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+class DatabaseProbe:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._result = None
+        self._probed_at = None
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._probed_at is not None and time.monotonic() - self._probed_at < self.ttl
+
+    async def result(self):
+        """Latest probe result and whether it came from the cache"""
+        if self._fresh():
+            return self._result, True
+        async with self._lock:
+            # Another check may have probed while we waited
+            if self._fresh():
+                return self._result, True
+            engines = {"primary": get_async_engine()}
+            if REPLICA_ENABLED:
+                engines["replica"] = get_async_engine(replica=True)
+            results = await asyncio.gather(*(_round_trip(engine) for engine in engines.values()))
+            self._result = {
+                "checked_at": datetime.now(timezone.utc).isoformat(),
+                **dict(zip(engines, results)),
+            }
+            self._probed_at = time.monotonic()
+        return self._result, False
+
+
+database_probe = DatabaseProbe(HEALTH_PROBE_TTL)
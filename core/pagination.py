@@ -0,0 +1,74 @@
+# Keyset (cursor) pagination helpers.
+#
+# Cursors are opaque to clients: a URL-safe base64 encoding of the ordering
+# key of the last row on the page. List endpoints return the cursor for the
+# next page in the X-Next-Cursor response header, so the response body keeps
+# its existing list shape and skip/limit clients are unaffected.
+import base64
+import json
+from datetime import date
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _json_default(value):
+    # Datetime ordering keys are stored as ISO 8601 strings
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(after) -> str:
+    raw = json.dumps({"after": after}, separators=(",", ":"), default=_json_default).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str):
+    """Return the ordering key stored in a cursor, raising InvalidCursorError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursorError("Invalid cursor")
+
+
+def decode_id_cursor(cursor: str = None):
+    """Decode a cursor ordered on an integer primary key (None passes through)"""
+    if cursor is None:
+        return None
+    after = decode_cursor(cursor)
+    if not isinstance(after, int) or isinstance(after, bool):
+        raise InvalidCursorError("Invalid cursor")
+    return after
+
+
+def decode_keyset_cursor(cursor: str = None, *types):
+    """Decode a cursor over a composite ordering key, checking the type of each part"""
+    if cursor is None:
+        return None
+    after = decode_cursor(cursor)
+    if not isinstance(after, list) or len(after) != len(types):
+        raise InvalidCursorError("Invalid cursor")
+    for value, expected in zip(after, types):
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise InvalidCursorError("Invalid cursor")
+    return after
+
+
+def set_next_cursor(response, rows, limit: int, key):
+    """Expose the cursor for the following page when this page is full.
+
+    ``key`` names the ordering attribute, or is a tuple of names for a
+    composite ordering such as (distance_km, job_id).
+    """
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        if isinstance(key, tuple):
+            after = [getattr(last, name) for name in key]
+        else:
+            after = getattr(last, key)
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(after)
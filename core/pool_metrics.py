@@ -0,0 +1,183 @@
+# Connection pool instrumentation.
+#
+# Every engine's pool reports into a PoolMetrics registered under the
+# engine's name (primary, replica, primary_async, replica_async):
+# - checkout wait: time spent in Pool.connect(), i.e. waiting for a free
+#   connection, opening a new one and the pre-ping, over the last
+#   RECENT_CHECKOUTS checkouts, plus checkouts that timed out
+# - hold time: how long each of those checkouts kept its connection
+# - checked-out and overflow counts, now and at their peak
+# - connections opened, invalidated (hard and soft) and failed pre-pings
+# Counters are per worker process and survive engine disposal.
+import threading
+import time
+from collections import deque
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+RECENT_CHECKOUTS = 1000
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self._recent_waits = deque(maxlen=RECENT_CHECKOUTS)
+        self._recent_holds = deque(maxlen=RECENT_CHECKOUTS)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.max_wait_ms = 0.0
+        self.max_hold_ms = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.connections_opened = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.pre_ping_failures = 0
+
+    def record_checkout(self, wait_seconds: float):
+        wait_ms = wait_seconds * 1000
+        with self._lock:
+            self.checkouts += 1
+            self._recent_waits.append(wait_ms)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_timeout(self):
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def record_checkin(self, held_seconds: float):
+        held_ms = held_seconds * 1000
+        with self._lock:
+            self._recent_holds.append(held_ms)
+            self.max_hold_ms = max(self.max_hold_ms, held_ms)
+
+    def record_checked_out(self, pool):
+        with self._lock:
+            self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+            self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        with self._lock:
+            snapshot = {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_wait_ms": _percentiles(self._recent_waits, self.max_wait_ms),
+                "hold_ms": _percentiles(self._recent_holds, self.max_hold_ms),
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+                "connections_opened": self.connections_opened,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "pre_ping_failures": self.pre_ping_failures,
+            }
+        pool = self.pool
+        if pool is not None:
+            snapshot.update({
+                "size": pool.size(),
+                "max_overflow": pool.max_overflow,
+                "timeout_seconds": pool.timeout(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # overflow() counts down from -size while the pool fills up
+                "overflow": max(pool.overflow(), 0),
+                "exhausted": pool.checkedout() >= pool.size() + pool.max_overflow,
+            })
+        return snapshot
+
+
+def _percentiles(samples, maximum: float):
+    ordered = sorted(samples)
+    return {
+        "p50": round(ordered[len(ordered) // 2], 3) if ordered else None,
+        "p95": round(ordered[int(len(ordered) * 0.95)], 3) if ordered else None,
+        "max": round(maximum, 3),
+    }
+
+
+pool_metrics = {}
+
+
+class _TimedCheckout:
+    metrics = None
+
+    @property
+    def max_overflow(self) -> int:
+        return self._max_overflow
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+        if self.metrics is not None:
+            self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine, name: str):
+    """Report an engine's pool (built with an Instrumented*QueuePool) as name"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics = pool_metrics.setdefault(name, PoolMetrics(name))
+    metrics.pool = sync_engine.pool
+    sync_engine.pool.metrics = metrics
+
+    # Pool listeners registered on the engine carry over to recreated pools
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.increment("connections_opened")
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        metrics.record_checked_out(metrics.pool)
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            metrics.record_checkin(time.perf_counter() - checked_out_at)
+
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+
+    @event.listens_for(sync_engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("soft_invalidations")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(context):
+        if context.is_pre_ping:
+            metrics.increment("pre_ping_failures")
+
+    return metrics
+
+
+def pool_stats():
+    return {name: metrics.stats() for name, metrics in pool_metrics.items()}
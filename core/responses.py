@@ -0,0 +1,102 @@
+# Fast JSON serialization for large list responses.
+#
+# By default FastAPI validates the returned ORM objects into the response
+# model, dumps the models to Python dicts and then encodes those with the
+# stdlib json module. compiled_response() does the same work in two
+# pydantic-core calls (validate from attributes, dump_json straight to
+# bytes) using a TypeAdapter built once per response model, and returns a
+# ready Response that FastAPI passes through untouched. The route keeps its
+# response_model for the OpenAPI schema and the JSON is byte for byte what
+# the default path produces. pydantic-core formats a float below 1e-4 or
+# from 1e16 up differently from the json module (0.00001 and 1e16 against
+# 1e-05 and 1e+16), so a page holding one is re-encoded the default way,
+# which costs about as much as the default path. On SessionRoute
+# routes the body is built after the request's sessions are released, so
+# serializing a large page does not hold a connection.
+import json
+from functools import lru_cache
+from typing import get_args
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from core.routing import after_release
+
+
+@lru_cache(maxsize=None)
+def compiled_adapter(response_model) -> TypeAdapter:
+    """TypeAdapter for a response model (e.g. List[JobResponse]), built once"""
+    return TypeAdapter(response_model)
+
+
+def _leaf_types(annotation) -> set:
+    args = get_args(annotation)
+    return set().union(*map(_leaf_types, args)) if args else {annotation}
+
+
+@lru_cache(maxsize=None)
+def _float_fields(model) -> tuple:
+    """Names of a model's fields that can hold a float or a nested model"""
+    return tuple(
+        name for name, field in model.model_fields.items()
+        if any(leaf is float or (isinstance(leaf, type) and issubclass(leaf, BaseModel))
+               for leaf in _leaf_types(field.annotation))
+    )
+
+
+def _unlike_stdlib_float(value) -> bool:
+    """True if value holds a float pydantic-core writes unlike json.dumps (or inf / nan)"""
+    if isinstance(value, float):
+        return value != 0 and not 1e-4 <= abs(value) < 1e16
+    if isinstance(value, BaseModel):
+        return any(_unlike_stdlib_float(getattr(value, name)) for name in _float_fields(type(value)))
+    if isinstance(value, (list, tuple)):
+        return any(map(_unlike_stdlib_float, value))
+    return False
+
+
+def compiled_json(content, response_model) -> bytes:
+    adapter = compiled_adapter(response_model)
+    validated = adapter.validate_python(content, from_attributes=True)
+    if not _unlike_stdlib_float(validated):
+        return adapter.dump_json(validated)
+    # Encoded as fastapi.responses.JSONResponse renders the default path
+    return json.dumps(
+        adapter.dump_python(validated, mode="json"),
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class CompiledResponse(Response):
+    """JSON response whose body is serialized by render_body(), at the latest when sent"""
+    media_type = "application/json"
+
+    def __init__(self, content, response_model):
+        super().__init__()
+        self._pending = (content, response_model)
+
+    def render_body(self):
+        if self._pending is None:
+            return
+        content, response_model = self._pending
+        self._pending = None
+        self.body = compiled_json(content, response_model)
+        self.headers["content-length"] = str(len(self.body))
+
+    async def __call__(self, scope, receive, send):
+        self.render_body()
+        await super().__call__(scope, receive, send)
+
+
+def compiled_response(content, response_model, response=None):
+    """JSON response serialized by a precompiled pydantic-core serializer.
+
+    Headers already set on the route's injected ``response`` (e.g. the next
+    page cursor) are carried over, as in sparse_response(). Within a
+    SessionRoute request the body is rendered once the sessions are
+    released; elsewhere it is rendered straight away.
+    """
+    compiled = CompiledResponse(content, response_model)
+    if response is not None:
+        compiled.headers.raw.extend(response.headers.raw)
+    if not after_release(compiled.render_body):
+        compiled.render_body()
+    return compiled
@@ -0,0 +1,92 @@
+# Database sessions end their transaction as soon as the endpoint returns.
+#
+# FastAPI serializes the endpoint's result, and only then closes even
+# scope="function" dependencies, so a session would keep its connection
+# checked out while a page of ORM rows is validated and encoded. Routes
+# built with SessionRoute commit every session the request opened right
+# after the endpoint returns. The commit does not expire loaded objects, so
+# serialization reads them from memory without a connection. Work the
+# endpoint hands to after_release(), such as a compiled_response() body,
+# runs only once the sessions are released. Endpoints that raise are left to
+# the dependency's close(), which rolls back.
+import functools
+import inspect
+from contextvars import ContextVar
+from fastapi.routing import APIRoute
+from core.db import LazySession
+
+_request_sessions: ContextVar[list] = ContextVar("request_sessions")
+_after_release: ContextVar[list] = ContextVar("after_release")
+
+
+def track_session(db):
+    """Have the current SessionRoute request release db when its endpoint returns"""
+    # Sync dependencies run in a copy of the request's context: append to
+    # the request's list rather than setting a new one
+    sessions = _request_sessions.get(None)
+    if sessions is not None:
+        sessions.append(db)
+    return db
+
+
+def after_release(callback) -> bool:
+    """Run callback once the current SessionRoute request has released its sessions.
+
+    Returns False outside such a request, where the caller runs it itself.
+    """
+    callbacks = _after_release.get(None)
+    if callbacks is None:
+        return False
+    callbacks.append(callback)
+    return True
+
+
+def _run_after_release():
+    for callback in _after_release.get(()):
+        callback()
+
+
+def _releasing(endpoint):
+    if getattr(endpoint, "releases_sessions", False):
+        # include_router() rebuilds routes from their (already wrapped) endpoint
+        return endpoint
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def release_after(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            for db in _request_sessions.get(()):
+                released = db.release()
+                if inspect.isawaitable(released):
+                    await released
+            _run_after_release()
+            return result
+    else:
+        # Runs in the threadpool, where only sync sessions are used
+        @functools.wraps(endpoint)
+        def release_after(*args, **kwargs):
+            result = endpoint(*args, **kwargs)
+            for db in _request_sessions.get(()):
+                if isinstance(db, LazySession):
+                    db.release()
+            _run_after_release()
+            return result
+    release_after.releases_sessions = True
+    return release_after
+
+
+class SessionRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _releasing(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def handle(request):
+            token = _request_sessions.set([])
+            callbacks_token = _after_release.set([])
+            try:
+                return await handler(request)
+            finally:
+                _after_release.reset(callbacks_token)
+                _request_sessions.reset(token)
+        return handle
@@ -0,0 +1,112 @@
+# Startup checks and warm-up run from the application lifespan.
+#
+# Tables are created and altered by alembic migrations only. On boot the
+# app just compares the database's alembic_version with the head revision
+# of the migration scripts (one single-row query), and opens a few pooled
+# connections per engine so the first requests don't pay for the TCP/TLS
+# and authentication handshakes.
+import ast
+import asyncio
+import glob
+import os
+import anyio
+from sqlalchemy import text
+from core.config import DB_POOL_PREWARM, DB_POOL_SIZE, SCHEMA_CHECK
+from core.db import all_engines, get_async_engine
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic", "versions")
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def _revision_identifiers(path: str) -> dict:
+    # Read statically: the local alembic/ package shadows the installed
+    # alembic when the app runs from the project root
+    with open(path) as f:
+        module = ast.parse(f.read(), path)
+    identifiers = {}
+    for node in module.body:
+        target = node.target if isinstance(node, ast.AnnAssign) else (
+            node.targets[0] if isinstance(node, ast.Assign) and len(node.targets) == 1 else None
+        )
+        if isinstance(target, ast.Name) and target.id in ("revision", "down_revision") and node.value is not None:
+            identifiers[target.id] = ast.literal_eval(node.value)
+    return identifiers
+
+
+def migration_heads() -> set:
+    """Head revision(s) of the migration scripts: those no other script revises"""
+    revisions, revised = set(), set()
+    for path in glob.glob(os.path.join(MIGRATIONS_DIR, "*.py")):
+        identifiers = _revision_identifiers(path)
+        if "revision" not in identifiers:
+            continue
+        revisions.add(identifiers["revision"])
+        down_revision = identifiers.get("down_revision")
+        if isinstance(down_revision, str):
+            revised.add(down_revision)
+        elif down_revision:
+            revised.update(down_revision)
+    return revisions - revised
+
+
+async def database_revisions() -> set:
+    """Revision(s) recorded in alembic_version; empty if never migrated"""
+    async with get_async_engine().connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        except Exception:
+            return set()
+        return set(result.scalars())
+
+
+async def check_schema_version():
+    """Compare the database with alembic head according to SCHEMA_CHECK"""
+    if SCHEMA_CHECK == "off":
+        return
+    heads, current = migration_heads(), await database_revisions()
+    if current == heads:
+        print(f"Database schema is at alembic head ({', '.join(sorted(heads))})")
+        return
+    message = (
+        f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+        f"expected alembic head {', '.join(sorted(heads))}. Run `alembic upgrade head`."
+    )
+    if SCHEMA_CHECK == "strict":
+        raise SchemaVersionError(message)
+    print(f"Warning: {message}")
+
+
+def _prewarm_sync(sync_engine, count: int):
+    # Held together so the pool opens count distinct connections
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(sync_engine.connect())
+    finally:
+        for conn in connections:
+            conn.close()
+
+
+async def _prewarm_async(async_engine, count: int):
+    results = await asyncio.gather(*(async_engine.connect().start() for _ in range(count)), return_exceptions=True)
+    await asyncio.gather(*(conn.close() for conn in results if not isinstance(conn, BaseException)))
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def prewarm_pools(count: int = DB_POOL_PREWARM):
+    """Open up to count pooled connections on every engine; returns the number opened per engine"""
+    count = max(0, min(count, DB_POOL_SIZE))
+    if not count:
+        return 0
+    sync_engines, async_engines = all_engines()
+    await asyncio.gather(
+        *(anyio.to_thread.run_sync(_prewarm_sync, sync_engine, count) for sync_engine in sync_engines),
+        *(_prewarm_async(async_engine, count) for async_engine in async_engines),
+    )
+    return count
+
@@ -0,0 +1,92 @@
+# Long-lived connection pool for Supabase API calls.
+#
+# One httpx.AsyncClient (HTTP/2, keep-alive) is opened on first use and closed
+# at shutdown, so OTP requests reuse warm TLS connections instead of opening
+# a new socket each time, and never block the event loop. The supabase
+# AsyncClient wrapped around it is built per request: it is cheap (no
+# network) but stateful, since verify_otp stores the signed-in session and
+# rewrites its Authorization header, which must never leak into another
+# user's request.
+#
+# The supabase SDK (and through it storage3/pyiceberg) takes longer to import
+# than the rest of the app put together, and httpx plus the TLS context cost
+# a quarter of a second more, so none of it is loaded until a request (or the
+# background JWKS prefetch) needs it.
+import threading
+from typing import TYPE_CHECKING, Optional
+from fastapi import HTTPException
+from core.config import (
+    SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_VERIFY_SSL, SUPABASE_TIMEOUT,
+    SUPABASE_MAX_CONNECTIONS, SUPABASE_MAX_KEEPALIVE_CONNECTIONS, SUPABASE_KEEPALIVE_EXPIRY,
+)
+
+if TYPE_CHECKING:
+    import httpx
+    from supabase import AsyncClient
+
+_http_client: Optional["httpx.AsyncClient"] = None
+# open_supabase_pool() may also run in a worker thread (see JWKSCache.warm)
+_http_client_lock = threading.Lock()
+
+
+def open_supabase_pool() -> "httpx.AsyncClient":
+    """Create the shared HTTP/2 connection pool (idempotent)"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = _create_http_client()
+    return _http_client
+
+
+def _create_http_client() -> "httpx.AsyncClient":
+    import httpx
+    if not SUPABASE_VERIFY_SSL:
+        # For development, set SUPABASE_VERIFY_SSL=false in .env to disable SSL verification
+        import urllib3
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    return httpx.AsyncClient(
+        http2=True,
+        verify=SUPABASE_VERIFY_SSL,
+        timeout=SUPABASE_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def close_supabase_pool():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def auth_api_error():
+    """The SDK's AuthApiError class, for ``except auth_api_error()`` clauses.
+
+    The except expression is only evaluated once an exception is raised, by
+    which time get_supabase_client() has loaded the SDK.
+    """
+    from supabase_auth.errors import AuthApiError
+    return AuthApiError
+
+
+async def get_supabase_client() -> "AsyncClient":
+    """Per-request Supabase client sharing the pooled connections"""
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        raise HTTPException(
+            status_code=500,
+            detail="Supabase configuration is missing"
+        )
+    from supabase import acreate_client
+    from supabase.lib.client_options import AsyncClientOptions
+
+    options = AsyncClientOptions(
+        httpx_client=open_supabase_pool(),
+        # Server-side use: never keep or refresh a user session on the client
+        persist_session=False,
+        auto_refresh_token=False,
+    )
+    return await acreate_client(SUPABASE_URL, SUPABASE_ANON_KEY, options=options)
@@ -19,3 +19,10 @@ class SendOTPResponse(BaseModel):
     message: str
     phone: str
 
+class CurrentUser(BaseModel):
+    id: str
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[str] = None
+    session_id: Optional[str] = None
+    expires_at: int
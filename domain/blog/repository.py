@@ -1,3 +1,5 @@
+from sqlalchemy import select
+from core.conditional import version_column
 from infrastructure.db.models import Blog
 
 class BlogRepository:
@@ -7,8 +9,17 @@ class BlogRepository:
     def get_by_id(self, blog_id: int):
         return self.db.query(Blog).filter(Blog.id == blog_id).first()
 
-    def get_all(self, skip: int = 0, limit: int = 100):
-        return self.db.query(Blog).offset(skip).limit(limit).all()
+    def get_version(self, blog_id: int):
+        """Version timestamp of a row for conditional GETs, or None if it does not exist"""
+        return self.db.execute(select(version_column(Blog)).where(Blog.id == blog_id)).scalar()
+
+    def get_all(self, skip: int = 0, limit: int = 100, after_id: int = None):
+        query = self.db.query(Blog)
+        if after_id is not None:
+            # Keyset pagination: seek past the last id instead of OFFSET
+            query = query.filter(Blog.id > after_id)
+            skip = 0
+        return query.order_by(Blog.id).offset(skip).limit(limit).all()
 
     def create(self, title: str, content: str, author_id: int):
         blog = Blog(title=title, content=content, author_id=author_id)
@@ -40,3 +51,54 @@ class BlogRepository:
         self.db.commit()
         return True
 
+
+class AsyncBlogRepository:
+    """asyncio counterpart of BlogRepository, bound to an AsyncSession"""
+    def __init__(self, db):
+        self.db = db
+
+    async def get_by_id(self, blog_id: int):
+        result = await self.db.execute(select(Blog).where(Blog.id == blog_id))
+        return result.scalars().first()
+
+    async def get_version(self, blog_id: int):
+        """Version timestamp of a row for conditional GETs, or None if it does not exist"""
+        return (await self.db.execute(select(version_column(Blog)).where(Blog.id == blog_id))).scalar()
+
+    async def get_all(self, skip: int = 0, limit: int = 100, after_id: int = None):
+        stmt = select(Blog)
+        if after_id is not None:
+            stmt = stmt.where(Blog.id > after_id)
+            skip = 0
+        result = await self.db.execute(stmt.order_by(Blog.id).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def create(self, title: str, content: str, author_id: int):
+        blog = Blog(title=title, content=content, author_id=author_id)
+        self.db.add(blog)
+        await self.db.commit()
+        await self.db.refresh(blog)
+        return blog
+
+    async def update(self, blog_id: int, title: str = None, content: str = None):
+        blog = await self.get_by_id(blog_id)
+        if not blog:
+            return None
+
+        if title is not None:
+            blog.title = title
+        if content is not None:
+            blog.content = content
+
+        await self.db.commit()
+        await self.db.refresh(blog)
+        return blog
+
+    async def delete(self, blog_id: int):
+        blog = await self.get_by_id(blog_id)
+        if not blog:
+            return False
+
+        await self.db.delete(blog)
+        await self.db.commit()
+        return True
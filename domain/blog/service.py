@@ -1,3 +1,5 @@
+from core.pagination import decode_id_cursor
+
 class BlogService:
     def __init__(self, repo):
         self.repo = repo
@@ -11,8 +13,14 @@ class BlogService:
             raise ValueError("Blog not found")
         return blog
 
-    def get_all_blogs(self, skip: int = 0, limit: int = 100):
-        return self.repo.get_all(skip, limit)
+    def get_blog_version(self, blog_id: int):
+        version = self.repo.get_version(blog_id)
+        if version is None:
+            raise ValueError("Blog not found")
+        return version
+
+    def get_all_blogs(self, skip: int = 0, limit: int = 100, cursor: str = None):
+        return self.repo.get_all(skip, limit, decode_id_cursor(cursor))
 
     def update_blog(self, blog_id: int, title: str = None, content: str = None):
         blog = self.repo.update(blog_id, title, content)
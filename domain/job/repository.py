@@ -1,17 +1,155 @@
+from sqlalchemy import Float, REAL, and_, func, insert, literal, or_, select, tuple_, update
+from core.conditional import version_column
+from core.fields import projected_columns
+from core.geo import (
+    bounding_box, cell_ranges, geo_columns, grid_cell_sql, haversine_sql,
+    parse_latitude, parse_longitude,
+)
+from domain.job.schemas import JobResponse
 from infrastructure.db.models import Job
 
+
+def _updatable(fields: dict):
+    """Drop explicit nulls aimed at NOT NULL columns, as the old update path did"""
+    columns = Job.__table__.c
+    return {k: v for k, v in fields.items() if v is not None or columns[k].nullable}
+
+
+def _select_jobs(fields: list = None):
+    """SELECT whole Job entities, or only the projected columns for ?fields="""
+    if fields:
+        return select(*projected_columns(Job, fields, "job_id"))
+    return select(Job)
+
+
+def _rows(result, fields: list = None):
+    return result.all() if fields else result.scalars().all()
+
+
+# Whitelisted GET /jobs filters, each mapped to an indexable predicate
+JOB_FILTERS = {
+    "payment_status": lambda value: Job.payment_status == value,
+    "bucket": lambda value: Job.bucket == value,
+    "currency": lambda value: Job.currency == value,
+    "assigned_zancrew_user_id": lambda value: Job.assigned_zancrew_user_id == value,
+    "scheduled_from": lambda value: Job.scheduled_at >= value,
+    "scheduled_to": lambda value: Job.scheduled_at < value,
+}
+
+# Sortable NOT NULL columns; job_id breaks ties so keyset cursors are stable
+JOB_SORT_KEYS = {
+    "job_id": Job.job_id,
+    "scheduled_at": Job.scheduled_at,
+    "estimated_cost_pence": Job.estimated_cost_pence,
+}
+
+
+def _filter_jobs(stmt, filters: dict = None, sort: str = "job_id", descending: bool = False,
+                 after=None):
+    """Apply whitelisted filters, the sort order and the keyset seek to a jobs SELECT.
+
+    ``after`` is the last job_id of the previous page when sorting by job_id,
+    otherwise its [sort value, job_id] pair.
+    """
+    for name, value in (filters or {}).items():
+        stmt = stmt.where(JOB_FILTERS[name](value))
+    if sort == "job_id":
+        keys, after_keys = [Job.job_id], [after]
+    else:
+        keys, after_keys = [JOB_SORT_KEYS[sort], Job.job_id], after
+    if after is not None:
+        row = tuple_(*keys)
+        seek = tuple_(*[literal(value, key.type) for key, value in zip(keys, after_keys)])
+        stmt = stmt.where(row < seek if descending else row > seek)
+    return stmt.order_by(*[key.desc() for key in keys] if descending else keys)
+
+
+def _with_geo(fields: dict):
+    """Add the geo_* columns derived from latitude/longitude to an UPDATE's values.
+
+    When only one coordinate changes the other is taken from the row being
+    updated, so the grid cell is recomputed without reading the job first.
+    """
+    if "latitude" not in fields and "longitude" not in fields:
+        return fields
+    lat = literal(parse_latitude(fields["latitude"]), Float) if "latitude" in fields else Job.geo_lat
+    lng = literal(parse_longitude(fields["longitude"]), Float) if "longitude" in fields else Job.geo_lng
+    return {**fields, "geo_lat": lat, "geo_lng": lng, "geo_cell": grid_cell_sql(lat, lng)}
+
+
+def _select_nearby(lat: float, lng: float, radius_km: float, after: list = None):
+    """Jobs within radius_km of a point, nearest first.
+
+    The geo_cell index narrows the scan to the ranges of grid cells
+    overlapping the search circle; the haversine distance then refines and
+    orders them. Ties on distance are broken by job_id so the keyset cursor
+    is stable.
+    """
+    distance = haversine_sql(lat, lng, Job.geo_lat, Job.geo_lng)
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+    stmt = select(Job, distance.label("distance_km")).where(
+        or_(*[Job.geo_cell.between(first, last) for first, last in cell_ranges(lat, lng, radius_km)]),
+        Job.geo_lat.between(min_lat, max_lat),
+        or_(*[Job.geo_lng.between(west, east) for west, east in lng_ranges]),
+        distance <= radius_km,
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(distance, Job.job_id) > tuple_(literal(after[0], Float), after[1]))
+    return stmt.order_by(distance, Job.job_id)
+
+def _select_search(query: str = None, tags: list = None, after: list = None):
+    """Jobs matching a web-style text query and/or carrying all the given tags.
+
+    Text matches use the GIN-indexed search_vector and are ranked with
+    ts_rank, best first; ties (and tag-only searches, which all rank 0) are
+    ordered by job_id so the (rank, job_id) keyset cursor is stable.
+    """
+    if query:
+        tsquery = func.websearch_to_tsquery("english", query)
+        rank = func.ts_rank(Job.search_vector, tsquery)
+        stmt = select(Job, rank.label("rank")).where(Job.search_vector.op("@@")(tsquery))
+    else:
+        rank = literal(0.0, REAL)
+        stmt = select(Job, rank.label("rank"))
+    if tags:
+        stmt = stmt.where(Job.tag_list.contains(tags))
+    if after is not None:
+        after_rank = literal(after[0], REAL)
+        stmt = stmt.where(or_(rank < after_rank, and_(rank == after_rank, Job.job_id > after[1])))
+    return stmt.order_by(rank.desc(), Job.job_id)
+
+
+def select_job_export():
+    """Response columns of every job in job_id order, for the streaming export"""
+    fields = list(JobResponse.model_fields)
+    return select(*projected_columns(Job, fields, "job_id")).order_by(Job.job_id)
+
+
 class JobRepository:
     def __init__(self, db):
         self.db = db
 
     def get_by_id(self, job_id: int):
-        return self.db.query(Job).filter(Job.job_id == job_id).first()
+        return self.db.execute(select(Job).where(Job.job_id == job_id)).scalars().first()
 
-    def get_all(self, skip: int = 0, limit: int = 100):
-        return self.db.query(Job).offset(skip).limit(limit).all()
+    def get_version(self, job_id: int):
+        """Version timestamp of a row for conditional GETs, or None if it does not exist"""
+        return self.db.execute(select(version_column(Job)).where(Job.job_id == job_id)).scalar()
 
-    def get_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100):
-        return self.db.query(Job).filter(Job.user_id == user_id).offset(skip).limit(limit).all()
+    def get_all(self, skip: int = 0, limit: int = 100, after=None, filters: dict = None,
+                sort: str = "job_id", descending: bool = False):
+        if after is not None:
+            # Keyset pagination: seek past the last sort key instead of OFFSET
+            skip = 0
+        stmt = _filter_jobs(select(Job), filters, sort, descending, after)
+        return self.db.execute(stmt.offset(skip).limit(limit)).scalars().all()
+
+    def get_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100, after_id: int = None):
+        stmt = select(Job).where(Job.user_id == user_id)
+        if after_id is not None:
+            stmt = stmt.where(Job.job_id > after_id)
+            skip = 0
+        return self.db.execute(stmt.order_by(Job.job_id).offset(skip).limit(limit)).scalars().all()
 
     def create(self, user_id: int, task_title: str, polished_task: str, location_address: str,
                latitude: str, longitude: str, scheduled_at, duration_hours: int, duration_minutes: int,
@@ -44,82 +182,174 @@ class JobRepository:
             short_title=short_title,
             imp_notes=imp_notes,
             bucket=bucket,
-            chat_room_id=chat_room_id
+            chat_room_id=chat_room_id,
+            **geo_columns(latitude, longitude)
         )
         self.db.add(job)
         self.db.commit()
         self.db.refresh(job)
         return job
 
-    def update(self, job_id: int, task_title: str = None, polished_task: str = None,
-               location_address: str = None, latitude: str = None, longitude: str = None,
-               scheduled_at = None, duration_hours: int = None, duration_minutes: int = None,
-               estimated_cost_pence: int = None, assigned_zancrew_user_id: int = None,
-               short_title: str = None, people_required: int = None, imp_notes: str = None,
-               actions: str = None, tags: str = None, bucket: str = None,
-               payment_mode: str = None, payment_status: str = None, currency: str = None,
-               chat_room_id: str = None, pickup_adress: str = None,
-               pickup_latitude: str = None, pickup_longitude: str = None):
-        job = self.get_by_id(job_id)
-        if not job:
-            return None
-        
-        if task_title is not None:
-            job.task_title = task_title
-        if polished_task is not None:
-            job.polished_task = polished_task
-        if location_address is not None:
-            job.location_address = location_address
-        if latitude is not None:
-            job.latitude = latitude
-        if longitude is not None:
-            job.longitude = longitude
-        if scheduled_at is not None:
-            job.scheduled_at = scheduled_at
-        if duration_hours is not None:
-            job.duration_hours = duration_hours
-        if duration_minutes is not None:
-            job.duration_minutes = duration_minutes
-        if estimated_cost_pence is not None:
-            job.estimated_cost_pence = estimated_cost_pence
-        if assigned_zancrew_user_id is not None:
-            job.assigned_zancrew_user_id = assigned_zancrew_user_id
-        if short_title is not None:
-            job.short_title = short_title
-        if people_required is not None:
-            job.people_required = people_required
-        if imp_notes is not None:
-            job.imp_notes = imp_notes
-        if actions is not None:
-            job.actions = actions
-        if tags is not None:
-            job.tags = tags
-        if bucket is not None:
-            job.bucket = bucket
-        if payment_mode is not None:
-            job.payment_mode = payment_mode
-        if payment_status is not None:
-            job.payment_status = payment_status
-        if currency is not None:
-            job.currency = currency
-        if chat_room_id is not None:
-            job.chat_room_id = chat_room_id
-        if pickup_adress is not None:
-            job.pickup_adress = pickup_adress
-        if pickup_latitude is not None:
-            job.pickup_latitude = pickup_latitude
-        if pickup_longitude is not None:
-            job.pickup_longitude = pickup_longitude
-        
+    def create_many(self, rows: list):
+        """Insert many jobs with one multi-row INSERT ... RETURNING in one transaction"""
+        if not rows:
+            return []
+        rows = [{**row, **geo_columns(row["latitude"], row["longitude"])} for row in rows]
+        stmt = insert(Job).returning(Job, sort_by_parameter_order=True)
+        jobs = self.db.scalars(stmt, rows).all()
+        for job in jobs:
+            # Detach so commit does not expire the freshly returned rows
+            self.db.expunge(job)
+        self.db.commit()
+        return jobs
+
+    def update_fields(self, job_id: int, fields: dict):
+        """Apply a partial update in one UPDATE ... RETURNING round trip.
+
+        ``fields`` holds only the columns the client sent. Explicit nulls are
+        kept for nullable columns and dropped for NOT NULL ones.
+        """
+        fields = _updatable(fields)
+        if not fields:
+            return self.get_by_id(job_id)
+
+        stmt = update(Job).where(Job.job_id == job_id).values(**_with_geo(fields)).returning(Job)
+        job = self.db.execute(stmt).scalars().first()
+        if job is not None:
+            self.db.expunge(job)
         self.db.commit()
-        self.db.refresh(job)
         return job
 
     def delete(self, job_id: int):
         job = self.get_by_id(job_id)
         if not job:
             return False
-        
+
         self.db.delete(job)
         self.db.commit()
         return True
+
+
+class AsyncJobRepository:
+    """asyncio counterpart of JobRepository, bound to an AsyncSession"""
+    def __init__(self, db):
+        self.db = db
+
+    async def get_by_id(self, job_id: int, fields: list = None):
+        result = await self.db.execute(_select_jobs(fields).where(Job.job_id == job_id))
+        return result.first() if fields else result.scalars().first()
+
+    async def get_version(self, job_id: int):
+        """Version timestamp of a row for conditional GETs, or None if it does not exist"""
+        return (await self.db.execute(select(version_column(Job)).where(Job.job_id == job_id))).scalar()
+
+    async def get_all(self, skip: int = 0, limit: int = 100, after=None, fields: list = None,
+                      filters: dict = None, sort: str = "job_id", descending: bool = False):
+        if after is not None:
+            # Keyset pagination: seek past the last sort key instead of OFFSET
+            skip = 0
+        if fields and sort not in fields:
+            # The next page cursor needs the sort value of the last row
+            fields = fields + [sort]
+        stmt = _filter_jobs(_select_jobs(fields), filters, sort, descending, after)
+        result = await self.db.execute(stmt.offset(skip).limit(limit))
+        return _rows(result, fields)
+
+    async def get_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100, after_id: int = None,
+                             fields: list = None):
+        stmt = _select_jobs(fields).where(Job.user_id == user_id)
+        if after_id is not None:
+            stmt = stmt.where(Job.job_id > after_id)
+            skip = 0
+        result = await self.db.execute(stmt.order_by(Job.job_id).offset(skip).limit(limit))
+        return _rows(result, fields)
+
+    async def get_nearby(self, lat: float, lng: float, radius_km: float, limit: int = 100,
+                         after: list = None):
+        """Nearest jobs first, each carrying its distance_km from the given point"""
+        result = await self.db.execute(_select_nearby(lat, lng, radius_km, after).limit(limit))
+        jobs = []
+        for job, distance_km in result.all():
+            job.distance_km = distance_km
+            jobs.append(job)
+        return jobs
+
+    async def search(self, query: str = None, tags: list = None, limit: int = 100, after: list = None):
+        """Best matching jobs first, each carrying its search rank"""
+        result = await self.db.execute(_select_search(query, tags, after).limit(limit))
+        jobs = []
+        for job, rank in result.all():
+            job.rank = rank
+            jobs.append(job)
+        return jobs
+
+    async def create(self, user_id: int, task_title: str, polished_task: str, location_address: str,
+                     latitude: str, longitude: str, scheduled_at, duration_hours: int, duration_minutes: int,
+                     estimated_cost_pence: int, people_required: int, actions: str, tags: str,
+                     payment_mode: str, payment_status: str, currency: str, pickup_adress: str,
+                     pickup_latitude: str, pickup_longitude: str, assigned_zancrew_user_id: int = None,
+                     short_title: str = None, imp_notes: str = None, bucket: str = None,
+                     chat_room_id: str = None):
+        job = Job(
+            user_id=user_id,
+            task_title=task_title,
+            polished_task=polished_task,
+            location_address=location_address,
+            latitude=latitude,
+            longitude=longitude,
+            scheduled_at=scheduled_at,
+            duration_hours=duration_hours,
+            duration_minutes=duration_minutes,
+            estimated_cost_pence=estimated_cost_pence,
+            people_required=people_required,
+            actions=actions,
+            tags=tags,
+            payment_mode=payment_mode,
+            payment_status=payment_status,
+            currency=currency,
+            pickup_adress=pickup_adress,
+            pickup_latitude=pickup_latitude,
+            pickup_longitude=pickup_longitude,
+            assigned_zancrew_user_id=assigned_zancrew_user_id,
+            short_title=short_title,
+            imp_notes=imp_notes,
+            bucket=bucket,
+            chat_room_id=chat_room_id,
+            **geo_columns(latitude, longitude)
+        )
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def create_many(self, rows: list):
+        """Insert many jobs with one multi-row INSERT ... RETURNING in one transaction"""
+        if not rows:
+            return []
+        rows = [{**row, **geo_columns(row["latitude"], row["longitude"])} for row in rows]
+        stmt = insert(Job).returning(Job, sort_by_parameter_order=True)
+        result = await self.db.scalars(stmt, rows)
+        jobs = result.all()
+        await self.db.commit()
+        return jobs
+
+    async def update_fields(self, job_id: int, fields: dict):
+        """Apply a partial update in one UPDATE ... RETURNING round trip"""
+        fields = _updatable(fields)
+        if not fields:
+            return await self.get_by_id(job_id)
+
+        stmt = update(Job).where(Job.job_id == job_id).values(**_with_geo(fields)).returning(Job)
+        result = await self.db.execute(stmt)
+        job = result.scalars().first()
+        await self.db.commit()
+        return job
+
+    async def delete(self, job_id: int):
+        job = await self.get_by_id(job_id)
+        if not job:
+            return False
+
+        await self.db.delete(job)
+        await self.db.commit()
+        return True
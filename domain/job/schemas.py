@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Optional
 
 class JobCreate(BaseModel):
     user_id: int
@@ -84,3 +84,17 @@ class JobResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class JobNearbyResponse(JobResponse):
+    distance_km: float
+
+class JobSearchResponse(JobResponse):
+    rank: float
+
+class JobBulkError(BaseModel):
+    index: int
+    detail: str
+
+class JobBulkResponse(BaseModel):
+    created: List[JobResponse]
+    errors: List[JobBulkError]
@@ -1,4 +1,72 @@
+from datetime import datetime, timezone
+from core.geo import MAX_SEARCH_RADIUS_KM
+from core.pagination import InvalidCursorError, decode_id_cursor, decode_keyset_cursor
+from domain.job.repository import JOB_SORT_KEYS
 from domain.zan_user.repository import ZanUserRepository
+from domain.zan_crew.index import crew_index
+
+MAX_BULK_JOBS = 1000
+MAX_SEARCH_TAGS = 20
+
+
+def _parse_tags(tags: str = None):
+    """Normalise a comma separated tag filter the same way Job.tag_list is generated"""
+    if tags is None:
+        return []
+    parsed = list(dict.fromkeys(tag.strip().lower() for tag in tags.split(",") if tag.strip()))
+    if len(parsed) > MAX_SEARCH_TAGS:
+        raise ValueError(f"At most {MAX_SEARCH_TAGS} tags can be searched at once")
+    return parsed
+
+
+def _naive_utc(value: datetime):
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _parse_listing(cursor: str = None, filters: dict = None, sort: str = "job_id"):
+    """Validate a GET /jobs sort key and filter window and decode its cursor.
+
+    ``sort`` is a whitelisted column name, prefixed with "-" for descending
+    order. scheduled_at is stored without a time zone, so aware window bounds
+    are converted to naive UTC. Returns (filters, sort column, descending,
+    keyset position).
+    """
+    descending = sort.startswith("-")
+    key = sort[1:] if descending else sort
+    if key not in JOB_SORT_KEYS:
+        raise ValueError(f"Cannot sort by {key}; choose from {', '.join(JOB_SORT_KEYS)}")
+    filters = {
+        name: _naive_utc(value) if isinstance(value, datetime) else value
+        for name, value in (filters or {}).items()
+    }
+    start, end = filters.get("scheduled_from"), filters.get("scheduled_to")
+    if start is not None and end is not None and start >= end:
+        raise ValueError("scheduled_from must be before scheduled_to")
+    if key == "job_id":
+        return filters, key, descending, decode_id_cursor(cursor)
+    if key == "scheduled_at":
+        after = decode_keyset_cursor(cursor, str, int)
+        if after is not None:
+            try:
+                after = [datetime.fromisoformat(after[0]), after[1]]
+            except ValueError:
+                raise InvalidCursorError("Invalid cursor")
+        return filters, key, descending, after
+    return filters, key, descending, decode_keyset_cursor(cursor, int, int)
+
+def _split_bulk_jobs(jobs: list, existing_user_ids: set):
+    """Separate insertable rows from per-item errors for a bulk create"""
+    rows, errors = [], []
+    for index, job in enumerate(jobs):
+        if job["user_id"] not in existing_user_ids:
+            errors.append({
+                "index": index,
+                "detail": f"User with user_id {job['user_id']} not found in zan_user table"
+            })
+        else:
+            rows.append(job)
+    return rows, errors
 
 class JobService:
     def __init__(self, repo, zan_user_repo=None):
@@ -17,7 +85,7 @@ class JobService:
             zan_user = self.zan_user_repo.get_by_id(user_id)
             if not zan_user:
                 raise ValueError(f"User with user_id {user_id} not found in zan_user table")
-        
+
         return self.repo.create(
             user_id, task_title, polished_task, location_address, latitude, longitude,
             scheduled_at, duration_hours, duration_minutes, estimated_cost_pence,
@@ -26,40 +94,48 @@ class JobService:
             short_title, imp_notes, bucket, chat_room_id
         )
 
+    def create_jobs_bulk(self, jobs: list):
+        """Create many jobs at once.
+
+        All referenced user_ids are validated with a single IN query and the
+        valid rows are inserted in one transaction. Items referencing unknown
+        users are skipped and reported by their index in the request.
+        """
+        if len(jobs) > MAX_BULK_JOBS:
+            raise ValueError(f"At most {MAX_BULK_JOBS} jobs can be created per request")
+        existing = self.zan_user_repo.get_existing_ids([job["user_id"] for job in jobs])
+        rows, errors = _split_bulk_jobs(jobs, existing)
+        return {"created": self.repo.create_many(rows), "errors": errors}
+
     def get_job(self, job_id: int):
         job = self.repo.get_by_id(job_id)
         if not job:
             raise ValueError("Job not found")
         return job
 
-    def get_all_jobs(self, skip: int = 0, limit: int = 100):
-        return self.repo.get_all(skip, limit)
+    def get_job_version(self, job_id: int):
+        version = self.repo.get_version(job_id)
+        if version is None:
+            raise ValueError("Job not found")
+        return version
+
+    def get_all_jobs(self, skip: int = 0, limit: int = 100, cursor: str = None, filters: dict = None,
+                     sort: str = "job_id"):
+        filters, key, descending, after = _parse_listing(cursor, filters, sort)
+        return self.repo.get_all(skip, limit, after, filters, key, descending)
 
-    def get_jobs_by_user(self, user_id: int, skip: int = 0, limit: int = 100):
+    def get_jobs_by_user(self, user_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
         # Validate user_id exists in zan_user table
         if self.zan_user_repo:
             zan_user = self.zan_user_repo.get_by_id(user_id)
             if not zan_user:
                 raise ValueError(f"User with user_id {user_id} not found in zan_user table")
-        
-        return self.repo.get_by_user_id(user_id, skip, limit)
-
-    def update_job(self, job_id: int, task_title: str = None, polished_task: str = None,
-                   location_address: str = None, latitude: str = None, longitude: str = None,
-                   scheduled_at = None, duration_hours: int = None, duration_minutes: int = None,
-                   estimated_cost_pence: int = None, assigned_zancrew_user_id: int = None,
-                   short_title: str = None, people_required: int = None, imp_notes: str = None,
-                   actions: str = None, tags: str = None, bucket: str = None,
-                   payment_mode: str = None, payment_status: str = None, currency: str = None,
-                   chat_room_id: str = None, pickup_adress: str = None,
-                   pickup_latitude: str = None, pickup_longitude: str = None):
-        job = self.repo.update(
-            job_id, task_title, polished_task, location_address, latitude, longitude,
-            scheduled_at, duration_hours, duration_minutes, estimated_cost_pence,
-            assigned_zancrew_user_id, short_title, people_required, imp_notes,
-            actions, tags, bucket, payment_mode, payment_status, currency,
-            chat_room_id, pickup_adress, pickup_latitude, pickup_longitude
-        )
+
+        return self.repo.get_by_user_id(user_id, skip, limit, decode_id_cursor(cursor))
+
+    def update_job(self, job_id: int, fields: dict):
+        """Partially update a job with only the fields the client sent"""
+        job = self.repo.update_fields(job_id, fields)
         if not job:
             raise ValueError("Job not found")
         return job
@@ -69,3 +145,118 @@ class JobService:
         if not success:
             raise ValueError("Job not found")
         return {"message": "Job deleted successfully"}
+
+
+class AsyncJobService:
+    """asyncio counterpart of JobService, used by the async job routes"""
+    def __init__(self, repo, zan_user_repo=None, zan_crew_repo=None):
+        self.repo = repo
+        self.zan_user_repo = zan_user_repo
+        self.zan_crew_repo = zan_crew_repo
+
+    async def create_job(self, user_id: int, task_title: str, polished_task: str, location_address: str,
+                         latitude: str, longitude: str, scheduled_at, duration_hours: int, duration_minutes: int,
+                         estimated_cost_pence: int, people_required: int, actions: str, tags: str,
+                         payment_mode: str, payment_status: str, currency: str, pickup_adress: str,
+                         pickup_latitude: str, pickup_longitude: str, assigned_zancrew_user_id: int = None,
+                         short_title: str = None, imp_notes: str = None, bucket: str = None,
+                         chat_room_id: str = None):
+        # Validate user_id exists in zan_user table
+        if self.zan_user_repo:
+            zan_user = await self.zan_user_repo.get_by_id(user_id)
+            if not zan_user:
+                raise ValueError(f"User with user_id {user_id} not found in zan_user table")
+
+        return await self.repo.create(
+            user_id, task_title, polished_task, location_address, latitude, longitude,
+            scheduled_at, duration_hours, duration_minutes, estimated_cost_pence,
+            people_required, actions, tags, payment_mode, payment_status, currency,
+            pickup_adress, pickup_latitude, pickup_longitude, assigned_zancrew_user_id,
+            short_title, imp_notes, bucket, chat_room_id
+        )
+
+    async def create_jobs_bulk(self, jobs: list):
+        """Create many jobs with one user_id IN query and one multi-row INSERT"""
+        if len(jobs) > MAX_BULK_JOBS:
+            raise ValueError(f"At most {MAX_BULK_JOBS} jobs can be created per request")
+        existing = await self.zan_user_repo.get_existing_ids([job["user_id"] for job in jobs])
+        rows, errors = _split_bulk_jobs(jobs, existing)
+        return {"created": await self.repo.create_many(rows), "errors": errors}
+
+    async def get_job(self, job_id: int, fields: list = None):
+        job = await self.repo.get_by_id(job_id, fields)
+        if not job:
+            raise ValueError("Job not found")
+        return job
+
+    async def get_job_version(self, job_id: int):
+        version = await self.repo.get_version(job_id)
+        if version is None:
+            raise ValueError("Job not found")
+        return version
+
+    async def get_all_jobs(self, skip: int = 0, limit: int = 100, cursor: str = None, fields: list = None,
+                           filters: dict = None, sort: str = "job_id"):
+        """List jobs matching whitelisted filters, ordered by a whitelisted sort key"""
+        filters, key, descending, after = _parse_listing(cursor, filters, sort)
+        return await self.repo.get_all(skip, limit, after, fields, filters, key, descending)
+
+    async def get_nearby_jobs(self, lat: float, lng: float, radius_km: float, limit: int = 100,
+                              cursor: str = None):
+        """Jobs within radius_km of a point, nearest first, keyset paginated on (distance, job_id)"""
+        if radius_km <= 0 or radius_km > MAX_SEARCH_RADIUS_KM:
+            raise ValueError(f"radius_km must be greater than 0 and at most {MAX_SEARCH_RADIUS_KM:g}")
+        after = decode_keyset_cursor(cursor, (float, int), int)
+        return await self.repo.get_nearby(lat, lng, radius_km, limit, after)
+
+    async def search_jobs(self, query: str = None, tags: str = None, limit: int = 100, cursor: str = None):
+        """Full-text search over job titles and descriptions, optionally narrowed to jobs
+        carrying all of the given tags; keyset paginated on (rank, job_id)"""
+        query = query.strip() if query else None
+        tag_list = _parse_tags(tags)
+        if not query and not tag_list:
+            raise ValueError("Provide a search query (q) and/or tags")
+        after = decode_keyset_cursor(cursor, (float, int), int)
+        return await self.repo.search(query, tag_list, limit, after)
+
+    async def get_candidate_crew(self, job_id: int, limit: int = 20):
+        """Online crew whose own radius covers the job location, nearest first.
+
+        Served from the in-memory crew index; a job without valid coordinates
+        has no candidates.
+        """
+        job = await self.repo.get_by_id(job_id)
+        if not job:
+            raise ValueError("Job not found")
+        if job.geo_lat is None or job.geo_lng is None:
+            return []
+        if not crew_index.loaded and self.zan_crew_repo:
+            crew_index.load(await self.zan_crew_repo.get_dispatchable())
+        return [
+            {"zancrew_id": position.zancrew_id, "zan_user_id": position.zan_user_id,
+             "distance_km": distance_km}
+            for position, distance_km in crew_index.candidates(job.geo_lat, job.geo_lng, limit)
+        ]
+
+    async def get_jobs_by_user(self, user_id: int, skip: int = 0, limit: int = 100, cursor: str = None,
+                               fields: list = None):
+        # Validate user_id exists in zan_user table
+        if self.zan_user_repo:
+            zan_user = await self.zan_user_repo.get_by_id(user_id)
+            if not zan_user:
+                raise ValueError(f"User with user_id {user_id} not found in zan_user table")
+
+        return await self.repo.get_by_user_id(user_id, skip, limit, decode_id_cursor(cursor), fields)
+
+    async def update_job(self, job_id: int, fields: dict):
+        """Partially update a job with only the fields the client sent"""
+        job = await self.repo.update_fields(job_id, fields)
+        if not job:
+            raise ValueError("Job not found")
+        return job
+
+    async def delete_job(self, job_id: int):
+        success = await self.repo.delete(job_id)
+        if not success:
+            raise ValueError("Job not found")
+        return {"message": "Job deleted successfully"}
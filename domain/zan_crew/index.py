@@ -0,0 +1,118 @@
+# In-process spatial index of dispatchable crew.
+#
+# Online crew are bucketed by the grid cell (core.geo) of their live position,
+# falling back to their home position. Finding the crew whose own radius_km
+# covers a job then probes only the cells around the job instead of scanning
+# zan_crew. The repositories keep the index current on every write made by
+# this process; a periodic full reload picks up writes made by other workers.
+import asyncio
+import threading
+from collections import namedtuple
+from core.geo import (
+    MAX_SEARCH_RADIUS_KM, cell_ranges, grid_cell, haversine_km, parse_latitude, parse_longitude,
+)
+
+CrewPosition = namedtuple("CrewPosition", "zancrew_id zan_user_id lat lng radius_km")
+
+
+def crew_position(crew):
+    """Where a crew member can be dispatched from, or None if they are not dispatchable.
+
+    Crew must be online and have a positive radius_km; radii above
+    MAX_SEARCH_RADIUS_KM are capped so a lookup never probes more cells.
+    """
+    if (crew.is_online or "").lower() != "true" or not crew.radius_km or crew.radius_km <= 0:
+        return None
+    lat, lng = parse_latitude(crew.latitude), parse_longitude(crew.longitude)
+    if lat is None or lng is None:
+        lat, lng = parse_latitude(crew.home_lat), parse_longitude(crew.home_lng)
+    if lat is None or lng is None:
+        return None
+    radius_km = min(crew.radius_km, MAX_SEARCH_RADIUS_KM)
+    return CrewPosition(crew.zancrew_id, crew.zan_user_id, lat, lng, radius_km)
+
+
+class CrewIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells = {}      # grid cell -> {zancrew_id: CrewPosition}
+        self._positions = {}  # zancrew_id -> (grid cell, CrewPosition)
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._positions)
+
+    def load(self, crew_rows):
+        """Replace the whole index with the given crew rows"""
+        cells, positions = {}, {}
+        for crew in crew_rows:
+            position = crew_position(crew)
+            if position is not None:
+                cell = grid_cell(position.lat, position.lng)
+                cells.setdefault(cell, {})[position.zancrew_id] = position
+                positions[position.zancrew_id] = (cell, position)
+        with self._lock:
+            self._cells, self._positions = cells, positions
+            self.loaded = True
+
+    def add(self, crew):
+        """Insert or move a crew member, dropping them if no longer dispatchable"""
+        position = crew_position(crew)
+        with self._lock:
+            self._discard(crew.zancrew_id)
+            if position is not None:
+                cell = grid_cell(position.lat, position.lng)
+                self._cells.setdefault(cell, {})[position.zancrew_id] = position
+                self._positions[position.zancrew_id] = (cell, position)
+
+    def remove(self, zancrew_id: int):
+        with self._lock:
+            self._discard(zancrew_id)
+
+    def _discard(self, zancrew_id: int):
+        entry = self._positions.pop(zancrew_id, None)
+        if entry is not None:
+            bucket = self._cells.get(entry[0])
+            bucket.pop(zancrew_id, None)
+            if not bucket:
+                del self._cells[entry[0]]
+
+    def candidates(self, lat: float, lng: float, limit: int = 20):
+        """Crew whose own radius covers the point, nearest first, as (position, distance_km)"""
+        ranges = cell_ranges(lat, lng, MAX_SEARCH_RADIUS_KM)
+        with self._lock:
+            if sum(last - first + 1 for first, last in ranges) > len(self._cells):
+                # Near a pole the ranges cover more cells than are occupied
+                cells = [cell for cell in self._cells if any(first <= cell <= last for first, last in ranges)]
+            else:
+                cells = [cell for first, last in ranges for cell in range(first, last + 1)]
+            nearby = [p for cell in cells for p in self._cells.get(cell, {}).values()]
+        matches = []
+        for position in nearby:
+            distance_km = haversine_km(lat, lng, position.lat, position.lng)
+            if distance_km <= position.radius_km:
+                matches.append((position, distance_km))
+        matches.sort(key=lambda match: (match[1], match[0].zancrew_id))
+        return matches[:limit]
+
+    async def reload(self, session_factory):
+        """Replace the index with the dispatchable crew currently in the database"""
+        from domain.zan_crew.repository import AsyncZanCrewRepository
+        async with session_factory() as db:
+            self.load(await AsyncZanCrewRepository(db).get_dispatchable())
+
+    async def refresh_periodically(self, session_factory, interval_seconds: int):
+        """Reload the index from the database every interval_seconds.
+
+        The first reload happens after one interval; the lifespan loads the
+        index before the app starts serving.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.reload(session_factory)
+            except Exception as e:
+                print(f"Warning: Could not reload crew index: {e}")
+
+
+crew_index = CrewIndex()
@@ -1,26 +1,149 @@
+from core.conditional import version_column
 from infrastructure.db.models import ZanCrew
 from datetime import datetime
+from sqlalchemy import func, select, text, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import joinedload
+from core.cache import LookupCache, cache_readable, from_replica
+from core.config import LOOKUP_CACHE_REPLICA_TTL, LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL
+from core.fields import projected_columns
+from domain.zan_crew.index import crew_index
+from domain.zan_crew.schemas import ZanCrewResponse
+
+# Snapshots of crew by ("zan_user_id", id) and ("phone", phone), owned by zan_user_id
+zan_crew_cache = LookupCache("zan_crew", LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL, LOOKUP_CACHE_REPLICA_TTL)
+
+
+class ZanCrewExistsError(ValueError):
+    pass
+
+
+def _updatable(fields: dict):
+    """Drop explicit nulls aimed at NOT NULL columns, as the old update path did"""
+    columns = ZanCrew.__table__.c
+    return {k: v for k, v in fields.items() if v is not None or columns[k].nullable}
+
+
+def _select_zan_crew(fields: list = None):
+    """SELECT whole ZanCrew entities, or only the projected columns for ?fields="""
+    if fields:
+        return select(*projected_columns(ZanCrew, fields, "zancrew_id"))
+    return select(ZanCrew)
+
+
+def _upsert_statement(rows: list):
+    """INSERT ... ON CONFLICT (zan_user_id) DO UPDATE for a batch of crew rows.
+
+    Null values in the batch never overwrite existing data, so re-sending a
+    partial KYC record is idempotent. Rows the batch would not change are
+    left alone: no new row version, no updated_at bump, and no RETURNING row.
+    """
+    # A single multi-row VALUES statement (1000 rows x 30 columns
+    # stays below the 32767 bind parameter limit)
+    stmt = pg_insert(ZanCrew).values(rows)
+    columns = sorted({key for row in rows for key in row} - {"zancrew_id", "zan_user_id", "updated_at"})
+    table = ZanCrew.__table__.c
+    set_ = {col: func.coalesce(stmt.excluded[col], table[col]) for col in columns}
+    changed = tuple_(*(table[col] for col in columns)).is_distinct_from(tuple_(*set_.values()))
+    set_["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(
+        index_elements=[ZanCrew.zan_user_id], set_=set_, where=changed
+    ).returning(ZanCrew).execution_options(populate_existing=True)
+
+def _select_skipped(rows: list, written: list):
+    """SELECT the batch rows an upsert left unchanged, or None if it wrote them all.
+
+    The DO UPDATE WHERE skips unchanged rows, so RETURNING omits them.
+    """
+    skipped = {row["zan_user_id"] for row in rows} - {crew.zan_user_id for crew in written}
+    if not skipped:
+        return None
+    return select(ZanCrew).where(ZanCrew.zan_user_id.in_(skipped))
+
+
+def _duplicate(error: IntegrityError, zan_user_id: int):
+    """ZanCrewExistsError for a create that lost the uq_zan_crew_zan_user_id race, else None"""
+    if "uq_zan_crew_zan_user_id" in str(error.orig):
+        return ZanCrewExistsError(f"ZanCrew already exists for user_id: {zan_user_id}")
+    return None
+
+
+def _cached_zan_crew(db, key):
+    """Cached snapshot under key, unless session db must bypass the cache"""
+    return zan_crew_cache.get(key) if cache_readable(db) else None
+
+
+def _cache_zan_crew(db, key, generation: int, zan_crew):
+    """Snapshot a loaded crew row, caching it under key.
+
+    generation is the cache's, taken before the row was loaded.
+    """
+    if zan_crew is None:
+        return None
+    snapshot = ZanCrewResponse.model_validate(zan_crew)
+    zan_crew_cache.set(key, snapshot, zan_crew.zan_user_id, generation, replica=from_replica(db))
+    return snapshot
+
+
+def _written(zan_crew):
+    """Propagate a committed crew write to the cache and the dispatch index"""
+    zan_crew_cache.invalidate(zan_crew.zan_user_id)
+    crew_index.add(zan_crew)
+
+
+def select_zan_crew_export():
+    """Response columns of every zan_crew record in zancrew_id order, for the streaming export"""
+    fields = list(ZanCrewResponse.model_fields)
+    return select(*projected_columns(ZanCrew, fields, "zancrew_id")).order_by(ZanCrew.zancrew_id)
+
 
 class ZanCrewRepository:
     def __init__(self, db):
         self.db = db
 
     def get_by_id(self, zancrew_id: int):
-        return self.db.query(ZanCrew).filter(ZanCrew.zancrew_id == zancrew_id).first()
+        return self.db.execute(select(ZanCrew).where(ZanCrew.zancrew_id == zancrew_id)).scalars().first()
+
+    def get_version(self, zancrew_id: int):
+        """Version timestamp of a row for conditional GETs, or None if it does not exist"""
+        return self.db.execute(select(version_column(ZanCrew)).where(ZanCrew.zancrew_id == zancrew_id)).scalar()
 
     def get_by_phone(self, phone: str):
-        return self.db.query(ZanCrew).filter(ZanCrew.phone == phone).first()
+        """Read-through cached lookup returning a snapshot"""
+        key = ("phone", phone)
+        cached = _cached_zan_crew(self.db, key)
+        if cached:
+            return cached
+        generation = zan_crew_cache.generation()
+        zan_crew = self.db.execute(select(ZanCrew).where(ZanCrew.phone == phone)).scalars().first()
+        return _cache_zan_crew(self.db, key, generation, zan_crew)
 
     def get_by_zan_user_id(self, zan_user_id: int):
-        return self.db.query(ZanCrew).filter(ZanCrew.zan_user_id == zan_user_id).first()
+        """Read-through cached lookup returning a snapshot"""
+        key = ("zan_user_id", zan_user_id)
+        cached = _cached_zan_crew(self.db, key)
+        if cached:
+            return cached
+        generation = zan_crew_cache.generation()
+        zan_crew = self.db.execute(select(ZanCrew).where(ZanCrew.zan_user_id == zan_user_id)).scalars().first()
+        return _cache_zan_crew(self.db, key, generation, zan_crew)
 
-    def get_all(self, skip: int = 0, limit: int = 100):
-        return self.db.query(ZanCrew).offset(skip).limit(limit).all()
+    def get_all(self, skip: int = 0, limit: int = 100, after_id: int = None):
+        stmt = select(ZanCrew)
+        if after_id is not None:
+            # Keyset pagination: seek past the last zancrew_id instead of OFFSET
+            stmt = stmt.where(ZanCrew.zancrew_id > after_id)
+            skip = 0
+        return self.db.execute(stmt.order_by(ZanCrew.zancrew_id).offset(skip).limit(limit)).scalars().all()
 
-    def get_all_with_user(self, skip: int = 0, limit: int = 100):
+    def get_all_with_user(self, skip: int = 0, limit: int = 100, after_id: int = None):
         """Get all zan_crew records with joined zan_user data"""
-        from sqlalchemy.orm import joinedload
-        return self.db.query(ZanCrew).options(joinedload(ZanCrew.zan_user)).offset(skip).limit(limit).all()
+        stmt = select(ZanCrew).options(joinedload(ZanCrew.zan_user))
+        if after_id is not None:
+            stmt = stmt.where(ZanCrew.zancrew_id > after_id)
+            skip = 0
+        return self.db.execute(stmt.order_by(ZanCrew.zancrew_id).offset(skip).limit(limit)).scalars().all()
 
     def create(self, phone: str, zan_user_id: int, pan_id: str = None, adhar_id: str = None,
                birth_date: datetime = None, city: str = None, state: str = None,
@@ -65,103 +188,232 @@ class ZanCrewRepository:
             selfie_img_url=selfie_img_url
         )
         self.db.add(zan_crew)
-        self.db.commit()
+        try:
+            self.db.commit()
+        except IntegrityError as e:
+            # A concurrent create for the same user got in first
+            self.db.rollback()
+            raise _duplicate(e, zan_user_id) or e
         self.db.refresh(zan_crew)
+        crew_index.add(zan_crew)
         return zan_crew
 
-    def update(self, zancrew_id: int, phone: str = None, pan_id: str = None,
-               adhar_id: str = None, birth_date: datetime = None, city: str = None,
-               state: str = None, country: str = None, latitude: str = None,
-               longitude: str = None, martial_status: str = None, status: str = None,
-               radius_km: float = None, work_hours: str = None, kyc_verified: str = None,
-               is_online: str = None, payout_beneficiary_id: str = None, bank_account: str = None,
-               ifsc_code: str = None, home_lat: str = None, home_lng: str = None,
-               idfy_refs: str = None, pan_name: str = None, pan_number_last4: str = None,
-               aadhaar_verified: str = None, aadhaar_last4: str = None, aadhar_city: str = None,
-               face_match_score: float = None, face_verified: str = None, selfie_img_url: str = None):
-        zan_crew = self.get_by_id(zancrew_id)
-        if not zan_crew:
-            return None
-        
-        if phone is not None:
-            zan_crew.phone = phone
-        if pan_id is not None:
-            zan_crew.pan_id = pan_id
-        if adhar_id is not None:
-            zan_crew.adhar_id = adhar_id
-        if birth_date is not None:
-            zan_crew.birth_date = birth_date
-        if city is not None:
-            zan_crew.city = city
-        if state is not None:
-            zan_crew.state = state
-        if country is not None:
-            zan_crew.country = country
-        if latitude is not None:
-            zan_crew.latitude = latitude
-        if longitude is not None:
-            zan_crew.longitude = longitude
-        if martial_status is not None:
-            zan_crew.martial_status = martial_status
-        if status is not None:
-            zan_crew.status = status
-        if radius_km is not None:
-            zan_crew.radius_km = radius_km
-        if work_hours is not None:
-            zan_crew.work_hours = work_hours
-        if kyc_verified is not None:
-            zan_crew.kyc_verified = kyc_verified
-        if is_online is not None:
-            zan_crew.is_online = is_online
-        if payout_beneficiary_id is not None:
-            zan_crew.payout_beneficiary_id = payout_beneficiary_id
-        if bank_account is not None:
-            zan_crew.bank_account = bank_account
-        if ifsc_code is not None:
-            zan_crew.ifsc_code = ifsc_code
-        if home_lat is not None:
-            zan_crew.home_lat = home_lat
-        if home_lng is not None:
-            zan_crew.home_lng = home_lng
-        if idfy_refs is not None:
-            zan_crew.idfy_refs = idfy_refs
-        if pan_name is not None:
-            zan_crew.pan_name = pan_name
-        if pan_number_last4 is not None:
-            zan_crew.pan_number_last4 = pan_number_last4
-        if aadhaar_verified is not None:
-            zan_crew.aadhaar_verified = aadhaar_verified
-        if aadhaar_last4 is not None:
-            zan_crew.aadhaar_last4 = aadhaar_last4
-        if aadhar_city is not None:
-            zan_crew.aadhar_city = aadhar_city
-        if face_match_score is not None:
-            zan_crew.face_match_score = face_match_score
-        if face_verified is not None:
-            zan_crew.face_verified = face_verified
-        if selfie_img_url is not None:
-            zan_crew.selfie_img_url = selfie_img_url
-        
+    def upsert_many(self, rows: list):
+        """Insert or update many crew rows keyed on zan_user_id in one transaction.
+
+        Returns every row of the batch, including the ones it left unchanged.
+        """
+        if not rows:
+            return []
+        written = self.db.scalars(_upsert_statement(rows)).all()
+        skipped = _select_skipped(rows, written)
+        zan_crew = written + ([] if skipped is None else self.db.scalars(skipped).all())
+        for crew in zan_crew:
+            # Detach so commit does not expire the freshly returned rows
+            self.db.expunge(crew)
         self.db.commit()
-        self.db.refresh(zan_crew)
+        for crew in written:
+            _written(crew)
+        return zan_crew
+
+    def update_fields(self, zancrew_id: int, fields: dict):
+        """Apply a partial update in one UPDATE ... RETURNING round trip.
+
+        ``fields`` holds only the columns the client sent. Explicit nulls are
+        kept for nullable columns and dropped for NOT NULL ones.
+        """
+        fields = _updatable(fields)
+        if not fields:
+            return self.get_by_id(zancrew_id)
+
+        stmt = update(ZanCrew).where(ZanCrew.zancrew_id == zancrew_id).values(**fields).returning(ZanCrew)
+        zan_crew = self.db.execute(stmt).scalars().first()
+        if zan_crew is not None:
+            self.db.expunge(zan_crew)
+        self.db.commit()
+        if zan_crew is not None:
+            _written(zan_crew)
         return zan_crew
 
     def update_phone_by_user_id(self, zan_user_id: int, phone: str):
         """Update phone in zan_crew when phone is updated in zan_user"""
-        zan_crew = self.get_by_zan_user_id(zan_user_id)
-        if zan_crew:
-            zan_crew.phone = phone
-            self.db.commit()
-            self.db.refresh(zan_crew)
-            return True
-        return False
+        result = self.db.execute(
+            update(ZanCrew).where(ZanCrew.zan_user_id == zan_user_id).values(phone=phone)
+        )
+        self.db.commit()
+        zan_crew_cache.invalidate(zan_user_id)
+        return result.rowcount > 0
+
+    def evict_user(self, zan_user_id: int):
+        """Drop the cached crew snapshots of a deleted zan_user"""
+        zan_crew_cache.invalidate(zan_user_id)
 
     def delete(self, zancrew_id: int):
         zan_crew = self.get_by_id(zancrew_id)
         if not zan_crew:
             return False
-        
+
+        zan_user_id = zan_crew.zan_user_id
         self.db.delete(zan_crew)
         self.db.commit()
+        zan_crew_cache.invalidate(zan_user_id)
+        crew_index.remove(zancrew_id)
         return True
 
+
+class AsyncZanCrewRepository:
+    """asyncio counterpart of ZanCrewRepository, bound to an AsyncSession"""
+    def __init__(self, db):
+        self.db = db
+
+    async def get_by_id(self, zancrew_id: int, fields: list = None):
+        result = await self.db.execute(_select_zan_crew(fields).where(ZanCrew.zancrew_id == zancrew_id))
+        return result.first() if fields else result.scalars().first()
+
+    async def get_version(self, zancrew_id: int):
+        """Version timestamp of a row for conditional GETs, or None if it does not exist"""
+        return (await self.db.execute(select(version_column(ZanCrew)).where(ZanCrew.zancrew_id == zancrew_id))).scalar()
+
+    async def get_by_phone(self, phone: str):
+        """Read-through cached lookup returning a snapshot"""
+        key = ("phone", phone)
+        cached = _cached_zan_crew(self.db, key)
+        if cached:
+            return cached
+        generation = zan_crew_cache.generation()
+        result = await self.db.execute(select(ZanCrew).where(ZanCrew.phone == phone))
+        return _cache_zan_crew(self.db, key, generation, result.scalars().first())
+
+    async def get_by_zan_user_id(self, zan_user_id: int):
+        """Read-through cached lookup returning a snapshot"""
+        key = ("zan_user_id", zan_user_id)
+        cached = _cached_zan_crew(self.db, key)
+        if cached:
+            return cached
+        generation = zan_crew_cache.generation()
+        result = await self.db.execute(select(ZanCrew).where(ZanCrew.zan_user_id == zan_user_id))
+        return _cache_zan_crew(self.db, key, generation, result.scalars().first())
+
+    async def get_all(self, skip: int = 0, limit: int = 100, after_id: int = None, fields: list = None):
+        stmt = _select_zan_crew(fields)
+        if after_id is not None:
+            stmt = stmt.where(ZanCrew.zancrew_id > after_id)
+            skip = 0
+        result = await self.db.execute(stmt.order_by(ZanCrew.zancrew_id).offset(skip).limit(limit))
+        return result.all() if fields else result.scalars().all()
+
+    async def get_all_with_user(self, skip: int = 0, limit: int = 100, after_id: int = None):
+        """Get all zan_crew records with joined zan_user data"""
+        # The relationship must be eager-loaded: lazy loads are not allowed under asyncio
+        stmt = select(ZanCrew).options(joinedload(ZanCrew.zan_user))
+        if after_id is not None:
+            stmt = stmt.where(ZanCrew.zancrew_id > after_id)
+            skip = 0
+        result = await self.db.execute(stmt.order_by(ZanCrew.zancrew_id).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def get_dispatchable(self):
+        """Columns the crew index needs for every online crew member with a radius"""
+        result = await self.db.execute(
+            select(
+                ZanCrew.zancrew_id, ZanCrew.zan_user_id, ZanCrew.latitude, ZanCrew.longitude,
+                ZanCrew.home_lat, ZanCrew.home_lng, ZanCrew.radius_km, ZanCrew.is_online,
+            # Literal predicate so the planner can match the partial ix_zan_crew_dispatchable
+            ).where(text("lower(zan_crew.is_online) = 'true' AND zan_crew.radius_km > 0"))
+        )
+        return result.all()
+
+    async def create(self, phone: str, zan_user_id: int, pan_id: str = None, adhar_id: str = None,
+                     birth_date: datetime = None, city: str = None, state: str = None,
+                     country: str = None, latitude: str = None, longitude: str = None,
+                     martial_status: str = None, status: str = None, radius_km: float = None,
+                     work_hours: str = None, kyc_verified: str = None, is_online: str = None,
+                     payout_beneficiary_id: str = None, bank_account: str = None, ifsc_code: str = None,
+                     home_lat: str = None, home_lng: str = None, idfy_refs: str = None,
+                     pan_name: str = None, pan_number_last4: str = None, aadhaar_verified: str = None,
+                     aadhaar_last4: str = None, aadhar_city: str = None, face_match_score: float = None,
+                     face_verified: str = None, selfie_img_url: str = None):
+        zan_crew = ZanCrew(
+            phone=phone,
+            pan_id=pan_id,
+            adhar_id=adhar_id,
+            birth_date=birth_date,
+            city=city,
+            state=state,
+            country=country,
+            latitude=latitude,
+            longitude=longitude,
+            martial_status=martial_status,
+            zan_user_id=zan_user_id,
+            status=status,
+            radius_km=radius_km,
+            work_hours=work_hours,
+            kyc_verified=kyc_verified,
+            is_online=is_online,
+            payout_beneficiary_id=payout_beneficiary_id,
+            bank_account=bank_account,
+            ifsc_code=ifsc_code,
+            home_lat=home_lat,
+            home_lng=home_lng,
+            idfy_refs=idfy_refs,
+            pan_name=pan_name,
+            pan_number_last4=pan_number_last4,
+            aadhaar_verified=aadhaar_verified,
+            aadhaar_last4=aadhaar_last4,
+            aadhar_city=aadhar_city,
+            face_match_score=face_match_score,
+            face_verified=face_verified,
+            selfie_img_url=selfie_img_url
+        )
+        self.db.add(zan_crew)
+        try:
+            await self.db.commit()
+        except IntegrityError as e:
+            # A concurrent create for the same user got in first
+            await self.db.rollback()
+            raise _duplicate(e, zan_user_id) or e
+        await self.db.refresh(zan_crew)
+        crew_index.add(zan_crew)
+        return zan_crew
+
+    async def upsert_many(self, rows: list):
+        """Insert or update many crew rows keyed on zan_user_id in one transaction.
+
+        Returns every row of the batch, including the ones it left unchanged.
+        """
+        if not rows:
+            return []
+        result = await self.db.scalars(_upsert_statement(rows))
+        written = result.all()
+        skipped = _select_skipped(rows, written)
+        unchanged = [] if skipped is None else (await self.db.scalars(skipped)).all()
+        await self.db.commit()
+        for crew in written:
+            _written(crew)
+        return written + unchanged
+
+    async def update_fields(self, zancrew_id: int, fields: dict):
+        """Apply a partial update in one UPDATE ... RETURNING round trip"""
+        fields = _updatable(fields)
+        if not fields:
+            return await self.get_by_id(zancrew_id)
+
+        stmt = update(ZanCrew).where(ZanCrew.zancrew_id == zancrew_id).values(**fields).returning(ZanCrew)
+        result = await self.db.execute(stmt)
+        zan_crew = result.scalars().first()
+        await self.db.commit()
+        if zan_crew is not None:
+            _written(zan_crew)
+        return zan_crew
+
+    async def delete(self, zancrew_id: int):
+        zan_crew = await self.get_by_id(zancrew_id)
+        if not zan_crew:
+            return False
+
+        zan_user_id = zan_crew.zan_user_id
+        await self.db.delete(zan_crew)
+        await self.db.commit()
+        zan_crew_cache.invalidate(zan_user_id)
+        crew_index.remove(zancrew_id)
+        return True
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Optional
 from domain.zan_user.schemas import ZanUserResponse
 
 class ZanCrewCreate(BaseModel):
@@ -142,3 +142,15 @@ class ZanCrewWithUserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ZanCrewBulkError(BaseModel):
+    index: int
+    detail: str
+
+class ZanCrewBulkUpsertResponse(BaseModel):
+    upserted: List[ZanCrewResponse]
+    errors: List[ZanCrewBulkError]
+
+class ZanCrewCandidate(BaseModel):
+    zancrew_id: int
+    zan_user_id: int
+    distance_km: float
@@ -1,30 +1,51 @@
+from core.pagination import decode_id_cursor
+from domain.zan_crew.repository import ZanCrewExistsError
 from domain.zan_user.repository import ZanUserRepository
 
+MAX_BULK_ZAN_CREW = 1000
+
+
+def _prepare_bulk_upsert(items: list, user_ids_by_phone: dict):
+    """Resolve phones to zan_user_id and collapse repeats of the same user.
+
+    Returns the rows to upsert and the per-item errors. When a batch holds
+    several records for one user the last one wins, since a single
+    INSERT ... ON CONFLICT cannot touch the same row twice.
+    """
+    rows_by_user, errors = {}, []
+    for index, item in enumerate(items):
+        zan_user_id = user_ids_by_phone.get(item["phone"])
+        if zan_user_id is None:
+            errors.append({"index": index, "detail": f"No zan_user found with phone: {item['phone']}"})
+            continue
+        rows_by_user[zan_user_id] = dict(item, zan_user_id=zan_user_id)
+    return list(rows_by_user.values()), errors
+
 class ZanCrewService:
     def __init__(self, repo, zan_user_repo):
         self.repo = repo
         self.zan_user_repo = zan_user_repo
 
     def create_zan_crew(self, phone: str, pan_id: str = None, adhar_id: str = None,
-                       birth_date = None, city: str = None, state: str = None,
-                       country: str = None, latitude: str = None, longitude: str = None,
-                       martial_status: str = None, status: str = None, radius_km: float = None,
-                       work_hours: str = None, kyc_verified: str = None, is_online: str = None,
-                       payout_beneficiary_id: str = None, bank_account: str = None, ifsc_code: str = None,
-                       home_lat: str = None, home_lng: str = None, idfy_refs: str = None,
-                       pan_name: str = None, pan_number_last4: str = None, aadhaar_verified: str = None,
-                       aadhaar_last4: str = None, aadhar_city: str = None, face_match_score: float = None,
-                       face_verified: str = None, selfie_img_url: str = None):
+                        birth_date = None, city: str = None, state: str = None,
+                        country: str = None, latitude: str = None, longitude: str = None,
+                        martial_status: str = None, status: str = None, radius_km: float = None,
+                        work_hours: str = None, kyc_verified: str = None, is_online: str = None,
+                        payout_beneficiary_id: str = None, bank_account: str = None, ifsc_code: str = None,
+                        home_lat: str = None, home_lng: str = None, idfy_refs: str = None,
+                        pan_name: str = None, pan_number_last4: str = None, aadhaar_verified: str = None,
+                        aadhaar_last4: str = None, aadhar_city: str = None, face_match_score: float = None,
+                        face_verified: str = None, selfie_img_url: str = None):
         # Validate phone by finding zan_user with this phone
         zan_user = self.zan_user_repo.get_by_phone(phone)
         if not zan_user:
             raise ValueError(f"No zan_user found with phone: {phone}")
-        
+
         # Check if zan_crew already exists for this user
         existing_crew = self.repo.get_by_zan_user_id(zan_user.user_id)
         if existing_crew:
-            raise ValueError(f"ZanCrew already exists for user_id: {zan_user.user_id}")
-        
+            raise ZanCrewExistsError(f"ZanCrew already exists for user_id: {zan_user.user_id}")
+
         return self.repo.create(
             phone=phone,
             zan_user_id=zan_user.user_id,
@@ -58,12 +79,31 @@ class ZanCrewService:
             selfie_img_url=selfie_img_url
         )
 
+    def upsert_zan_crew_bulk(self, items: list):
+        """Create or update many zan_crew records keyed on their zan_user.
+
+        Phones are resolved with one query and all rows are written with a
+        single INSERT ... ON CONFLICT (zan_user_id) DO UPDATE, so re-running
+        the same batch is safe.
+        """
+        if len(items) > MAX_BULK_ZAN_CREW:
+            raise ValueError(f"At most {MAX_BULK_ZAN_CREW} zan_crew records can be upserted per request")
+        user_ids_by_phone = self.zan_user_repo.get_ids_by_phones([item["phone"] for item in items])
+        rows, errors = _prepare_bulk_upsert(items, user_ids_by_phone)
+        return {"upserted": self.repo.upsert_many(rows), "errors": errors}
+
     def get_zan_crew(self, zancrew_id: int):
         zan_crew = self.repo.get_by_id(zancrew_id)
         if not zan_crew:
             raise ValueError("ZanCrew not found")
         return zan_crew
 
+    def get_zan_crew_version(self, zancrew_id: int):
+        version = self.repo.get_version(zancrew_id)
+        if version is None:
+            raise ValueError("ZanCrew not found")
+        return version
+
     def get_zan_crew_by_phone(self, phone: str):
         zan_crew = self.repo.get_by_phone(phone)
         if not zan_crew:
@@ -76,30 +116,16 @@ class ZanCrewService:
             raise ValueError("ZanCrew not found")
         return zan_crew
 
-    def get_all_zan_crew(self, skip: int = 0, limit: int = 100):
-        return self.repo.get_all(skip, limit)
+    def get_all_zan_crew(self, skip: int = 0, limit: int = 100, cursor: str = None):
+        return self.repo.get_all(skip, limit, decode_id_cursor(cursor))
 
-    def get_all_zan_crew_with_user(self, skip: int = 0, limit: int = 100):
+    def get_all_zan_crew_with_user(self, skip: int = 0, limit: int = 100, cursor: str = None):
         """Get all zan_crew records with related zan_user data"""
-        return self.repo.get_all_with_user(skip, limit)
-
-    def update_zan_crew(self, zancrew_id: int, phone: str = None, pan_id: str = None,
-                       adhar_id: str = None, birth_date = None, city: str = None,
-                       state: str = None, country: str = None, latitude: str = None,
-                       longitude: str = None, martial_status: str = None, status: str = None,
-                       radius_km: float = None, work_hours: str = None, kyc_verified: str = None,
-                       is_online: str = None, payout_beneficiary_id: str = None, bank_account: str = None,
-                       ifsc_code: str = None, home_lat: str = None, home_lng: str = None,
-                       idfy_refs: str = None, pan_name: str = None, pan_number_last4: str = None,
-                       aadhaar_verified: str = None, aadhaar_last4: str = None, aadhar_city: str = None,
-                       face_match_score: float = None, face_verified: str = None, selfie_img_url: str = None):
-        zan_crew = self.repo.update(
-            zancrew_id, phone, pan_id, adhar_id, birth_date, city, state,
-            country, latitude, longitude, martial_status, status, radius_km,
-            work_hours, kyc_verified, is_online, payout_beneficiary_id, bank_account,
-            ifsc_code, home_lat, home_lng, idfy_refs, pan_name, pan_number_last4,
-            aadhaar_verified, aadhaar_last4, aadhar_city, face_match_score, face_verified, selfie_img_url
-        )
+        return self.repo.get_all_with_user(skip, limit, decode_id_cursor(cursor))
+
+    def update_zan_crew(self, zancrew_id: int, fields: dict):
+        """Partially update a zan_crew record with only the fields the client sent"""
+        zan_crew = self.repo.update_fields(zancrew_id, fields)
         if not zan_crew:
             raise ValueError("ZanCrew not found")
         return zan_crew
@@ -110,3 +136,114 @@ class ZanCrewService:
             raise ValueError("ZanCrew not found")
         return {"message": "ZanCrew deleted successfully"}
 
+
+class AsyncZanCrewService:
+    """asyncio counterpart of ZanCrewService, used by the async zan_crew routes"""
+    def __init__(self, repo, zan_user_repo):
+        self.repo = repo
+        self.zan_user_repo = zan_user_repo
+
+    async def create_zan_crew(self, phone: str, pan_id: str = None, adhar_id: str = None,
+                              birth_date = None, city: str = None, state: str = None,
+                              country: str = None, latitude: str = None, longitude: str = None,
+                              martial_status: str = None, status: str = None, radius_km: float = None,
+                              work_hours: str = None, kyc_verified: str = None, is_online: str = None,
+                              payout_beneficiary_id: str = None, bank_account: str = None, ifsc_code: str = None,
+                              home_lat: str = None, home_lng: str = None, idfy_refs: str = None,
+                              pan_name: str = None, pan_number_last4: str = None, aadhaar_verified: str = None,
+                              aadhaar_last4: str = None, aadhar_city: str = None, face_match_score: float = None,
+                              face_verified: str = None, selfie_img_url: str = None):
+        # Validate phone by finding zan_user with this phone
+        zan_user = await self.zan_user_repo.get_by_phone(phone)
+        if not zan_user:
+            raise ValueError(f"No zan_user found with phone: {phone}")
+
+        # Check if zan_crew already exists for this user
+        existing_crew = await self.repo.get_by_zan_user_id(zan_user.user_id)
+        if existing_crew:
+            raise ZanCrewExistsError(f"ZanCrew already exists for user_id: {zan_user.user_id}")
+
+        return await self.repo.create(
+            phone=phone,
+            zan_user_id=zan_user.user_id,
+            pan_id=pan_id,
+            adhar_id=adhar_id,
+            birth_date=birth_date,
+            city=city,
+            state=state,
+            country=country,
+            latitude=latitude,
+            longitude=longitude,
+            martial_status=martial_status,
+            status=status,
+            radius_km=radius_km,
+            work_hours=work_hours,
+            kyc_verified=kyc_verified,
+            is_online=is_online,
+            payout_beneficiary_id=payout_beneficiary_id,
+            bank_account=bank_account,
+            ifsc_code=ifsc_code,
+            home_lat=home_lat,
+            home_lng=home_lng,
+            idfy_refs=idfy_refs,
+            pan_name=pan_name,
+            pan_number_last4=pan_number_last4,
+            aadhaar_verified=aadhaar_verified,
+            aadhaar_last4=aadhaar_last4,
+            aadhar_city=aadhar_city,
+            face_match_score=face_match_score,
+            face_verified=face_verified,
+            selfie_img_url=selfie_img_url
+        )
+
+    async def upsert_zan_crew_bulk(self, items: list):
+        """Create or update many zan_crew records with one phone lookup and one upsert"""
+        if len(items) > MAX_BULK_ZAN_CREW:
+            raise ValueError(f"At most {MAX_BULK_ZAN_CREW} zan_crew records can be upserted per request")
+        user_ids_by_phone = await self.zan_user_repo.get_ids_by_phones([item["phone"] for item in items])
+        rows, errors = _prepare_bulk_upsert(items, user_ids_by_phone)
+        return {"upserted": await self.repo.upsert_many(rows), "errors": errors}
+
+    async def get_zan_crew(self, zancrew_id: int, fields: list = None):
+        zan_crew = await self.repo.get_by_id(zancrew_id, fields)
+        if not zan_crew:
+            raise ValueError("ZanCrew not found")
+        return zan_crew
+
+    async def get_zan_crew_version(self, zancrew_id: int):
+        version = await self.repo.get_version(zancrew_id)
+        if version is None:
+            raise ValueError("ZanCrew not found")
+        return version
+
+    async def get_zan_crew_by_phone(self, phone: str):
+        zan_crew = await self.repo.get_by_phone(phone)
+        if not zan_crew:
+            raise ValueError("ZanCrew not found")
+        return zan_crew
+
+    async def get_zan_crew_by_user_id(self, zan_user_id: int):
+        zan_crew = await self.repo.get_by_zan_user_id(zan_user_id)
+        if not zan_crew:
+            raise ValueError("ZanCrew not found")
+        return zan_crew
+
+    async def get_all_zan_crew(self, skip: int = 0, limit: int = 100, cursor: str = None, fields: list = None):
+        return await self.repo.get_all(skip, limit, decode_id_cursor(cursor), fields)
+
+    async def get_all_zan_crew_with_user(self, skip: int = 0, limit: int = 100, cursor: str = None):
+        """Get all zan_crew records with related zan_user data"""
+        return await self.repo.get_all_with_user(skip, limit, decode_id_cursor(cursor))
+
+    async def update_zan_crew(self, zancrew_id: int, fields: dict):
+        """Partially update a zan_crew record with only the fields the client sent"""
+        zan_crew = await self.repo.update_fields(zancrew_id, fields)
+        if not zan_crew:
+            raise ValueError("ZanCrew not found")
+        return zan_crew
+
+    async def delete_zan_crew(self, zancrew_id: int):
+        success = await self.repo.delete(zancrew_id)
+        if not success:
+            raise ValueError("ZanCrew not found")
+        return {"message": "ZanCrew deleted successfully"}
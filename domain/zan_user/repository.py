@@ -1,23 +1,130 @@
+from sqlalchemy import select
+from core.conditional import version_column
+from core.cache import LookupCache, cache_readable, from_replica
+from core.config import LOOKUP_CACHE_REPLICA_TTL, LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL
+from core.fields import projected_columns
+from domain.zan_user.schemas import ZanUserResponse
 from infrastructure.db.models import ZanUser
 
+# Snapshots of users by ("user_id", id) and ("phone", phone), owned by user_id
+zan_user_cache = LookupCache("zan_user", LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL, LOOKUP_CACHE_REPLICA_TTL)
+
+
+def _select_zan_users(fields: list = None):
+    """SELECT whole ZanUser entities, or only the projected columns for ?fields="""
+    if fields:
+        return select(*projected_columns(ZanUser, fields, "user_id"))
+    return select(ZanUser)
+
+
+def _select_zan_user(user_id: int, fields: list = None):
+    """SELECT one user by id, shared by the sync and async repositories"""
+    return _select_zan_users(fields).where(ZanUser.user_id == user_id)
+
+
+def _select_existing_ids(user_ids):
+    return select(ZanUser.user_id).where(ZanUser.user_id.in_(set(user_ids)))
+
+
+def _select_ids_by_phones(phones):
+    # Descending, so building a dict keeps the lowest user_id of a shared phone
+    return (
+        select(ZanUser.phone, ZanUser.user_id)
+        .where(ZanUser.phone.in_(set(phones)))
+        .order_by(ZanUser.user_id.desc())
+    )
+
+
+def _cached_zan_user(db, key):
+    """Cached snapshot under key, unless session db must bypass the cache"""
+    return zan_user_cache.get(key) if cache_readable(db) else None
+
+
+def _cache_zan_user(db, key, generation: int, zan_user):
+    """Snapshot a loaded user, caching it under key.
+
+    generation is the cache's, taken before the row was loaded.
+    """
+    if zan_user is None:
+        return None
+    snapshot = ZanUserResponse.model_validate(zan_user)
+    zan_user_cache.set(key, snapshot, zan_user.user_id, generation, replica=from_replica(db))
+    return snapshot
+
+
+def select_zan_user_export():
+    """Response columns of every zan_user in user_id order, for the streaming export"""
+    fields = list(ZanUserResponse.model_fields)
+    return select(*projected_columns(ZanUser, fields, "user_id")).order_by(ZanUser.user_id)
+
+
 class ZanUserRepository:
     def __init__(self, db):
         self.db = db
 
-    def get_by_id(self, user_id: int):
-        return self.db.query(ZanUser).filter(ZanUser.user_id == user_id).first()
+    def get_by_id(self, user_id: int, fields: list = None, cached: bool = True):
+        """Read-through cached lookup returning a snapshot (projections bypass the cache).
+
+        With cached=False the row is always read from the database and the
+        cached snapshot refreshed.
+        """
+        if fields:
+            return self.db.execute(_select_zan_user(user_id, fields)).first()
+        key = ("user_id", user_id)
+        snapshot = _cached_zan_user(self.db, key) if cached else None
+        if snapshot:
+            return snapshot
+        generation = zan_user_cache.generation()
+        return _cache_zan_user(self.db, key, generation, self._load(user_id))
+
+    def _load(self, user_id: int):
+        """Uncached, session-bound load for write paths"""
+        return self.db.execute(_select_zan_user(user_id)).scalars().first()
+
+    def get_version(self, user_id: int):
+        """Version timestamp of a row for conditional GETs, or None if it does not exist"""
+        return self.db.execute(select(version_column(ZanUser)).where(ZanUser.user_id == user_id)).scalar()
 
     def get_by_email(self, email: str):
         return self.db.query(ZanUser).filter(ZanUser.email == email).first()
 
     def get_by_phone(self, phone: str):
-        return self.db.query(ZanUser).filter(ZanUser.phone == phone).first()
+        """Read-through cached lookup returning a snapshot"""
+        key = ("phone", phone)
+        cached = _cached_zan_user(self.db, key)
+        if cached:
+            return cached
+        generation = zan_user_cache.generation()
+        zan_user = self.db.execute(select(ZanUser).where(ZanUser.phone == phone)).scalars().first()
+        return _cache_zan_user(self.db, key, generation, zan_user)
+
+    def get_existing_ids(self, user_ids):
+        """Return the subset of user_ids that exist, in a single IN query"""
+        if not user_ids:
+            return set()
+        return set(self.db.execute(_select_existing_ids(user_ids)).scalars().all())
 
-    def get_all(self, skip: int = 0, limit: int = 100):
-        return self.db.query(ZanUser).offset(skip).limit(limit).all()
+    def get_ids_by_phones(self, phones):
+        """Map each known phone to its user_id in a single IN query (lowest user_id wins)"""
+        if not phones:
+            return {}
+        return {row.phone: row.user_id for row in self.db.execute(_select_ids_by_phones(phones))}
 
-    def get_by_zancrew_id(self, zancrew_id: int, skip: int = 0, limit: int = 100):
-        return self.db.query(ZanUser).filter(ZanUser.zancrew_id == zancrew_id).offset(skip).limit(limit).all()
+    def get_all(self, skip: int = 0, limit: int = 100, after_id: int = None, fields: list = None):
+        stmt = _select_zan_users(fields)
+        if after_id is not None:
+            # Keyset pagination: seek past the last user_id instead of OFFSET
+            stmt = stmt.where(ZanUser.user_id > after_id)
+            skip = 0
+        result = self.db.execute(stmt.order_by(ZanUser.user_id).offset(skip).limit(limit))
+        return result.all() if fields else result.scalars().all()
+
+    def get_by_zancrew_id(self, zancrew_id: int, skip: int = 0, limit: int = 100, after_id: int = None):
+        query = self.db.query(ZanUser).filter(ZanUser.zancrew_id == zancrew_id)
+        if after_id is not None:
+            query = query.filter(ZanUser.user_id > after_id)
+            skip = 0
+        return query.order_by(ZanUser.user_id).offset(skip).limit(limit).all()
 
     def create(self, phone: str, first_name: str = None, last_name: str = None, 
                email: str = None, address: str = None, is_zancrew: str = "false", zancrew_id: int = None):
@@ -38,7 +145,7 @@ class ZanUserRepository:
     def update(self, user_id: int, first_name: str = None, last_name: str = None, 
                email: str = None, phone: str = None, address: str = None, 
                is_zancrew: str = None, zancrew_id: int = None):
-        zan_user = self.get_by_id(user_id)
+        zan_user = self._load(user_id)
         if not zan_user:
             return None
         
@@ -58,15 +165,60 @@ class ZanUserRepository:
             zan_user.zancrew_id = zancrew_id
         
         self.db.commit()
+        zan_user_cache.invalidate(user_id)
         self.db.refresh(zan_user)
         return zan_user
 
     def delete(self, user_id: int):
-        zan_user = self.get_by_id(user_id)
+        zan_user = self._load(user_id)
         if not zan_user:
             return False
         
         self.db.delete(zan_user)
         self.db.commit()
+        zan_user_cache.invalidate(user_id)
         return True
 
+
+class AsyncZanUserRepository:
+    """Lookups the async job and zan_crew services make over an AsyncSession"""
+    def __init__(self, db):
+        self.db = db
+
+    async def get_by_id(self, user_id: int):
+        """Read-through cached lookup returning a snapshot"""
+        key = ("user_id", user_id)
+        cached = _cached_zan_user(self.db, key)
+        if cached:
+            return cached
+        generation = zan_user_cache.generation()
+        return _cache_zan_user(self.db, key, generation, await self._load(user_id))
+
+    async def _load(self, user_id: int):
+        """Uncached, session-bound load"""
+        result = await self.db.execute(_select_zan_user(user_id))
+        return result.scalars().first()
+
+    async def get_by_phone(self, phone: str):
+        """Read-through cached lookup returning a snapshot"""
+        key = ("phone", phone)
+        cached = _cached_zan_user(self.db, key)
+        if cached:
+            return cached
+        generation = zan_user_cache.generation()
+        result = await self.db.execute(select(ZanUser).where(ZanUser.phone == phone))
+        return _cache_zan_user(self.db, key, generation, result.scalars().first())
+
+    async def get_existing_ids(self, user_ids):
+        """Return the subset of user_ids that exist, in a single IN query"""
+        if not user_ids:
+            return set()
+        result = await self.db.execute(_select_existing_ids(user_ids))
+        return set(result.scalars().all())
+
+    async def get_ids_by_phones(self, phones):
+        """Map each known phone to its user_id in a single IN query (lowest user_id wins)"""
+        if not phones:
+            return {}
+        result = await self.db.execute(_select_ids_by_phones(phones))
+        return {row.phone: row.user_id for row in result}
@@ -1,3 +1,5 @@
+from core.pagination import decode_id_cursor
+
 class ZanUserService:
     def __init__(self, repo, zan_crew_repo=None):
         self.repo = repo
@@ -11,23 +13,29 @@ class ZanUserService:
         
         return self.repo.create(phone, first_name, last_name, email, address, is_zancrew, zancrew_id)
 
-    def get_zan_user(self, user_id: int):
-        zan_user = self.repo.get_by_id(user_id)
+    def get_zan_user(self, user_id: int, fields: list = None, cached: bool = True):
+        zan_user = self.repo.get_by_id(user_id, fields, cached)
         if not zan_user:
             raise ValueError("ZanUser not found")
         return zan_user
 
+    def get_zan_user_version(self, user_id: int):
+        version = self.repo.get_version(user_id)
+        if version is None:
+            raise ValueError("ZanUser not found")
+        return version
+
     def get_zan_user_by_email(self, email: str):
         zan_user = self.repo.get_by_email(email)
         if not zan_user:
             raise ValueError("ZanUser not found")
         return zan_user
 
-    def get_all_zan_users(self, skip: int = 0, limit: int = 100):
-        return self.repo.get_all(skip, limit)
+    def get_all_zan_users(self, skip: int = 0, limit: int = 100, cursor: str = None, fields: list = None):
+        return self.repo.get_all(skip, limit, decode_id_cursor(cursor), fields)
 
-    def get_zan_users_by_zancrew(self, zancrew_id: int, skip: int = 0, limit: int = 100):
-        return self.repo.get_by_zancrew_id(zancrew_id, skip, limit)
+    def get_zan_users_by_zancrew(self, zancrew_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+        return self.repo.get_by_zancrew_id(zancrew_id, skip, limit, decode_id_cursor(cursor))
 
     def update_zan_user(self, user_id: int, first_name: str = None, last_name: str = None,
                        email: str = None, phone: str = None, address: str = None,
@@ -47,5 +55,7 @@ class ZanUserService:
         success = self.repo.delete(user_id)
         if not success:
             raise ValueError("ZanUser not found")
+        if self.zan_crew_repo:
+            self.zan_crew_repo.evict_user(user_id)
         return {"message": "ZanUser deleted successfully"}
 
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Columnar export of the jobs table for analytics.
+
+Reads jobs through a server-side cursor inside one read-only REPEATABLE
+READ snapshot and writes them as Arrow record batches, either to a Parquet
+file or upserted into a local Iceberg table (needs pyiceberg).
+
+Runs are incremental: each one exports the jobs whose version timestamp
+(updated_at, or created_at for jobs never updated) lies in
+[previous watermark, now - --lag-seconds) and then records the new
+watermark, next to the Parquet files or as a property of the Iceberg
+table. The lag leaves room for transactions that were still in flight
+when the snapshot was taken; the watermark never moves back, so raising
+the lag between runs does not export the same changes twice. On a
+replica (DATABASE_REPLICA_URL) "now" is the commit time of the last
+replayed transaction, not the clock, so rows the replica has not
+received yet are never skipped however far it lags.
+--full ignores the watermark. updated_at is set by the application's
+UPDATEs, so manual SQL fixes must set it too. Deleted jobs leave no
+updated_at behind, so run --full now and then to drop them downstream.
+
+    python export_jobs_parquet.py --out exports/jobs [--full] [--batch-size 10000]
+    python export_jobs_parquet.py --iceberg-warehouse exports/warehouse [--iceberg-table analytics.jobs]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import ARRAY, DateTime, Float, Integer, create_engine, func, select
+
+load_dotenv()
+
+from core.conditional import version_column  # noqa: E402
+from core.db import build_connect_args  # noqa: E402
+from infrastructure.db.models import Job  # noqa: E402
+
+EXCLUDED_COLUMNS = {"search_vector"}
+WATERMARK_FILE = "_watermark.json"
+WATERMARK_PROPERTY = "zanzo.export.watermark"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def arrow_type(column):
+    column_type = column.type
+    if isinstance(column_type, ARRAY):
+        return pa.list_(pa.string())
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column_type.timezone else None)
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    return pa.string()
+
+
+EXPORT_COLUMNS = [column for column in Job.__table__.columns if column.name not in EXCLUDED_COLUMNS]
+SCHEMA = pa.schema([pa.field(column.name, arrow_type(column)) for column in EXPORT_COLUMNS])
+
+
+def window_end(conn, lag_seconds: int) -> datetime:
+    """Exclusive upper bound of this run's window, as seen by the snapshot.
+
+    pg_last_xact_replay_timestamp() is NULL on the primary; on a replica it
+    is how far the data actually reaches.
+    """
+    replayed_until = func.least(func.now(), func.coalesce(func.pg_last_xact_replay_timestamp(), func.now()))
+    return conn.execute(select(replayed_until - func.make_interval(0, 0, 0, 0, 0, 0, lag_seconds))).scalar()
+
+
+def record_batches(conn, lower, upper, batch_size: int):
+    """Arrow batches of the jobs whose version lies in [lower, upper)"""
+    version = version_column(Job)
+    stmt = select(*EXPORT_COLUMNS).where(version < upper)
+    if lower is not None:
+        stmt = stmt.where(version >= lower)
+    result = conn.execute(stmt.order_by(Job.job_id).execution_options(yield_per=batch_size))
+    for rows in result.mappings().partitions():
+        yield pa.RecordBatch.from_pylist([dict(row) for row in rows], schema=SCHEMA)
+
+
+def read_watermark(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return datetime.fromisoformat(json.load(f)["watermark"])
+
+
+def write_watermark(path: str, watermark: datetime):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"watermark": watermark.isoformat()}, f)
+    os.replace(tmp, path)
+
+
+def export_parquet(batches, upper, out_dir: str, full: bool):
+    """Write one Parquet file for the run; returns (rows, path) with path None if empty"""
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = upper.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
+    path = os.path.join(out_dir, f"jobs-{'full' if full else 'changes'}-{stamp}.parquet")
+    rows = 0
+    with pq.ParquetWriter(path + ".tmp", SCHEMA, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    if rows:
+        os.replace(path + ".tmp", path)
+    else:
+        os.remove(path + ".tmp")
+        path = None
+    write_watermark(os.path.join(out_dir, WATERMARK_FILE), upper)
+    return rows, path
+
+
+def load_iceberg_table(warehouse: str, identifier: str):
+    try:
+        from pyiceberg.catalog.sql import SqlCatalog
+    except ImportError:
+        sys.exit("Iceberg export needs pyiceberg (pip install pyiceberg)")
+    warehouse = os.path.abspath(warehouse)
+    os.makedirs(warehouse, exist_ok=True)
+    catalog = SqlCatalog(
+        "analytics",
+        uri=f"sqlite:///{os.path.join(warehouse, 'catalog.db')}",
+        warehouse=f"file://{warehouse}",
+    )
+    catalog.create_namespace_if_not_exists(identifier.rsplit(".", 1)[0])
+    return catalog.create_table_if_not_exists(identifier, schema=SCHEMA)
+
+
+def iceberg_watermark(table):
+    value = table.properties.get(WATERMARK_PROPERTY)
+    return datetime.fromisoformat(value) if value else None
+
+
+def export_iceberg(batches, upper, table, full: bool, chunk_rows: int):
+    """Upsert the run into the table on job_id, committing data and watermark together"""
+    from pyiceberg.expressions import AlwaysTrue
+
+    rows, chunk = 0, []
+
+    def flush(tx):
+        if chunk:
+            data = pa.Table.from_batches(chunk, schema=SCHEMA)
+            if full:
+                tx.append(data)
+            else:
+                tx.upsert(data, join_cols=["job_id"])
+            chunk.clear()
+
+    with table.transaction() as tx:
+        if full:
+            tx.delete(AlwaysTrue())
+        for batch in batches:
+            chunk.append(batch)
+            rows += batch.num_rows
+            # Bound memory: write every chunk_rows rows, still within the one commit
+            if sum(buffered.num_rows for buffered in chunk) >= chunk_rows:
+                flush(tx)
+        flush(tx)
+        tx.set_properties({WATERMARK_PROPERTY: upper.isoformat()})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default="exports/jobs", help="Parquet output directory")
+    parser.add_argument("--iceberg-warehouse", help="Upsert into a local Iceberg warehouse instead of Parquet files")
+    parser.add_argument("--iceberg-table", default="analytics.jobs")
+    parser.add_argument("--iceberg-chunk-rows", type=int, default=100_000, help="Rows buffered per Iceberg upsert")
+    parser.add_argument("--full", action="store_true", help="Export every job, ignoring the watermark")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per server-side cursor fetch")
+    parser.add_argument("--lag-seconds", type=int, default=60)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_REPLICA_URL") or os.getenv("DATABASE_URL")
+    engine = create_engine(database_url, connect_args=build_connect_args(database_url))
+
+    table = None
+    if args.iceberg_warehouse:
+        table = load_iceberg_table(args.iceberg_warehouse, args.iceberg_table)
+        lower = None if args.full else iceberg_watermark(table)
+    else:
+        lower = None if args.full else read_watermark(os.path.join(args.out, WATERMARK_FILE))
+
+    try:
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+            with conn.begin():
+                upper = window_end(conn, args.lag_seconds)
+                if lower is not None and upper < lower:
+                    upper = lower
+                batches = record_batches(conn, lower, upper, args.batch_size)
+                if table is not None:
+                    rows = export_iceberg(batches, upper, table, args.full, args.iceberg_chunk_rows)
+                    target = args.iceberg_table
+                else:
+                    rows, target = export_parquet(batches, upper, args.out, args.full)
+    finally:
+        engine.dispose()
+
+    window = f"{(lower or EPOCH).isoformat()} .. {upper.isoformat()}"
+    print(f"Exported {rows} jobs changed in [{window}) to {target or '(no file, nothing changed)'}")
+
+
+if __name__ == "__main__":
+    main()
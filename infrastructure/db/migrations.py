@@ -0,0 +1,32 @@
+# Helpers shared by the alembic revisions that build indexes concurrently.
+#
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction, so callers run
+# these inside op.get_context().autocommit_block(). A concurrent build that
+# fails leaves an INVALID index behind, which is dropped and rebuilt on the
+# next run rather than mistaken for a finished one.
+from alembic import op
+import sqlalchemy as sa
+
+
+def index_state(conn, name: str):
+    """True for a valid index, False for one left invalid by a failed build, None if missing"""
+    return conn.execute(sa.text(
+        "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+        "WHERE c.relname = :name"
+    ), {"name": name}).scalar()
+
+
+def create_index_concurrently(conn, name: str, table: str, columns: list, **kw):
+    """Build an index without blocking writes, unless a valid one already exists"""
+    state = index_state(conn, name)
+    if state:
+        return
+    if state is False:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+
+
+def drop_index_concurrently(conn, name: str, table: str):
+    """Drop an index without blocking reads or writes, if it exists"""
+    if index_state(conn, name) is not None:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
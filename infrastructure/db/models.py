@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Integer, String, Text, DateTime, ForeignKey, Float, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from core.db import Base
 
@@ -29,9 +30,18 @@ class Blog(Base):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_scheduled_at", "scheduled_at", "job_id"),
+        Index("ix_jobs_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_jobs_tag_list", "tag_list", postgresql_using="gin"),
+        # GET /jobs filters: equality column first, then the keyset sort order
+        Index("ix_jobs_payment_status_scheduled_at", "payment_status", "scheduled_at", "job_id"),
+        Index("ix_jobs_bucket_scheduled_at", "bucket", "scheduled_at", "job_id"),
+        Index("ix_jobs_assigned_scheduled_at", "assigned_zancrew_user_id", "scheduled_at", "job_id"),
+    )
 
     job_id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("zan_user.user_id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("zan_user.user_id"), nullable=False, index=True)
     task_title = Column(String, nullable=False)
     polished_task = Column(Text, nullable=False)
     location_address = Column(Text, nullable=False)
@@ -55,6 +65,23 @@ class Job(Base):
     pickup_adress = Column(Text, nullable=False)
     pickup_latitude = Column(String, nullable=False)
     pickup_longitude = Column(String, nullable=False)
+    # Numeric copies of latitude/longitude and their grid cell (core.geo), kept
+    # in step by the repository; geo_cell's index backs GET /jobs/nearby
+    geo_lat = Column(Float, nullable=True)
+    geo_lng = Column(Float, nullable=True)
+    geo_cell = Column(Integer, nullable=True, index=True)
+    # Generated search columns backing GET /jobs/search (GIN indexed). Deferred
+    # so ordinary job loads do not fetch them.
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(task_title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(short_title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(polished_task, '')), 'B')",
+        persisted=True
+    )))
+    tag_list = deferred(Column(ARRAY(String), Computed(
+        r"array_remove(regexp_split_to_array(lower(trim(tags)), '\s*,\s*'), '')",
+        persisted=True
+    )))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -68,10 +95,10 @@ class ZanUser(Base):
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
     email = Column(String, unique=True, nullable=True)
-    phone = Column(String, nullable=False)
+    phone = Column(String, nullable=False, index=True)
     address = Column(Text, nullable=True)
     is_zancrew = Column(String, nullable=True, default="false")
-    zancrew_id = Column(Integer, nullable=True)
+    zancrew_id = Column(Integer, nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -82,9 +109,18 @@ class ZanUser(Base):
 
 class ZanCrew(Base):
     __tablename__ = "zan_crew"
+    __table_args__ = (
+        # One crew profile per zan_user; target of the bulk upsert ON CONFLICT
+        UniqueConstraint("zan_user_id", name="uq_zan_crew_zan_user_id"),
+        # Online crew with a radius, read by the crew dispatch index reload
+        Index(
+            "ix_zan_crew_dispatchable", "zancrew_id",
+            postgresql_where=text("lower(is_online) = 'true' AND radius_km > 0"),
+        ),
+    )
 
     zancrew_id = Column(Integer, primary_key=True)
-    phone = Column(String, nullable=False)
+    phone = Column(String, nullable=False, index=True)
     pan_id = Column(String, nullable=True)
     adhar_id = Column(String, nullable=True)
     birth_date = Column(DateTime, nullable=True)
@@ -1,2 +1,2 @@
 # Use the centralized database configuration from core.db
-from core.db import SessionLocal
+from core.db import SessionLocal, ReplicaSessionLocal, AsyncSessionLocal, AsyncReplicaSessionLocal
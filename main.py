@@ -1,24 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from api.routes.v1.router import router as api_router_v1
-from api.routes.v2.router import router as api_router_v2
-from core.db import engine, Base
-from infrastructure.db.models import User, Blog, Job, ZanUser, ZanCrew  # Import models to register them
+from api.routes.v1.router import include_routes as include_v1_routes
+from api.routes.v2.router import include_routes as include_v2_routes
+from core.auth import jwks_cache
+from core.config import CREW_INDEX_REFRESH_SECONDS, SUPABASE_JWT_SECRET
+from core.compression import CompressionMiddleware
+from core.consistency import ConsistencyTokenMiddleware
+from core.db import dispose_engines, init_engines
+from core.startup import check_schema_version, prewarm_pools
+from core.supabase import close_supabase_pool
+from domain.zan_crew.index import crew_index
+from infrastructure.db.session import AsyncSessionLocal
 
-app = FastAPI(title="Zanzo Service")
 
-@app.on_event("startup")
-async def startup_event():
-    """Create database tables on startup"""
+async def warm_crew_index():
     try:
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created/verified successfully")
+        await crew_index.reload(AsyncSessionLocal)
     except Exception as e:
-        print(f"Warning: Could not create database tables: {e}")
-        print("Make sure your CONNECTION_STRING is correct and the database is accessible")
+        # Requests fall back to loading it on demand
+        print(f"Warning: Could not load crew index: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the engines, check the schema, warm pools and caches, then release everything on shutdown"""
+    init_engines()
+    await check_schema_version()
+    await asyncio.gather(prewarm_pools(), warm_crew_index())
+
+    background = []
+    if not SUPABASE_JWT_SECRET and jwks_cache.url.startswith("http"):
+        # Opens the Supabase pool, so it runs alongside serving rather than
+        # delaying startup; token checks wait on it through the cache's lock
+        background.append(asyncio.create_task(jwks_cache.warm()))
+    # Keep the crew dispatch index in step with writes made by other workers
+    app.state.crew_index_refresh = asyncio.create_task(
+        crew_index.refresh_periodically(AsyncSessionLocal, CREW_INDEX_REFRESH_SECONDS)
+    )
+    background.append(app.state.crew_index_refresh)
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await close_supabase_pool()
+        await dispose_engines()
+
+
+app = FastAPI(title="Zanzo Service", lifespan=lifespan)
+app.add_middleware(ConsistencyTokenMiddleware)
+# Outermost, so it sees the final response headers
+app.add_middleware(CompressionMiddleware)
 
 @app.get("/")
 def main():
     return {"message": "Welcome to Zanzo Backend API"}
 
-app.include_router(api_router_v1)
-app.include_router(api_router_v2)
\ No newline at end of file
+include_v1_routes(app)
+include_v2_routes(app)
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# core.config refuses to load without a database URL or Supabase settings.
+# Creating an engine does not connect, so unit tests never open a connection
+os.environ.setdefault("DATABASE_URL", "postgresql://postgres@localhost/unit_tests")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_ANON_KEY", "unit-tests")
+
+
+@pytest.fixture(scope="session")
+def database_url():
+    """URL of a migrated Postgres for the tests that need one (skipped without TEST_DATABASE_URL)"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return url
@@ -0,0 +1,156 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import FastAPI
+from fastapi.security import HTTPAuthorizationCredentials
+
+import core.auth
+from api.routes.v1 import jobs
+from core.auth import JWKSCache, get_current_user
+
+KEY = ec.generate_private_key(ec.SECP256R1())
+ROTATED_KEY = ec.generate_private_key(ec.SECP256R1())
+
+
+def _jwk(private_key, kid: str) -> dict:
+    return {**json.loads(jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key())), "kid": kid, "alg": "ES256"}
+
+
+class FakeJWKSEndpoint:
+    """Stands in for the Supabase connection pool, serving a JWKS and counting fetches"""
+
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.fetches = 0
+
+    async def get(self, url, headers=None):
+        self.fetches += 1
+        return httpx.Response(200, json={"keys": self.keys}, request=httpx.Request("GET", url))
+
+
+@pytest.fixture
+def jwks(monkeypatch):
+    endpoint = FakeJWKSEndpoint(_jwk(KEY, "key-1"))
+    monkeypatch.setattr(core.auth, "open_supabase_pool", lambda: endpoint)
+    monkeypatch.setattr(core.auth, "jwks_cache", JWKSCache("https://auth.test/jwks", ttl=600))
+    monkeypatch.setattr(core.auth, "SUPABASE_JWT_SECRET", None)
+    core.auth.claims_cache.clear()
+    yield endpoint
+    core.auth.claims_cache.clear()
+
+
+def _token(private_key=KEY, kid="key-1", **claims) -> str:
+    payload = {
+        "sub": "user-1", "phone": "447700900001", "role": "authenticated", "aud": "authenticated",
+        "iss": core.auth.SUPABASE_JWT_ISSUER, "exp": int(time.time()) + 3600, **claims,
+    }
+    return jwt.encode(payload, private_key, algorithm="ES256", headers={"kid": kid})
+
+
+def _authenticate(token: str):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(get_current_user(credentials))
+
+
+def _rejected(token: str) -> str:
+    with pytest.raises(core.auth.HTTPException) as raised:
+        _authenticate(token)
+    assert raised.value.status_code == 401
+    assert raised.value.headers == {"WWW-Authenticate": "Bearer"}
+    return raised.value.detail
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def test_valid_token(jwks):
+    user = _authenticate(_token())
+    assert (user.id, user.phone, user.role) == ("user-1", "447700900001", "authenticated")
+    # Verified claims are cached: the JWKS is fetched once
+    _authenticate(_token())
+    assert jwks.fetches == 1
+
+
+def test_expired_token(jwks):
+    assert "expired" in _rejected(_token(exp=int(time.time()) - 60))
+
+
+@pytest.mark.parametrize("claims", [{"aud": "anon"}, {"iss": "https://other.supabase.co/auth/v1"}])
+def test_wrong_audience_or_issuer(jwks, claims):
+    _rejected(_token(**claims))
+
+
+def test_token_without_a_subject(jwks):
+    payload = {"aud": "authenticated", "iss": core.auth.SUPABASE_JWT_ISSUER, "exp": int(time.time()) + 60}
+    assert "sub" in _rejected(jwt.encode(payload, KEY, algorithm="ES256", headers={"kid": "key-1"}))
+
+
+def test_unknown_kid_refetches_the_key_set_once(jwks):
+    _authenticate(_token())
+    assert jwks.fetches == 1
+
+    # A rotated key is picked up by one refetch
+    jwks.keys.append(_jwk(ROTATED_KEY, "key-2"))
+    core.auth.jwks_cache._fetched_at -= core.auth.JWKS_MIN_REFRESH_INTERVAL
+    _authenticate(_token(ROTATED_KEY, kid="key-2"))
+    assert jwks.fetches == 2
+
+    # Unknown kids within the refresh interval do not hammer the endpoint
+    for kid in ("key-3", "key-4"):
+        assert "Unknown signing key" in _rejected(_token(ROTATED_KEY, kid=kid))
+    assert jwks.fetches == 2
+
+
+def test_algorithm_comes_from_the_key_not_the_header(jwks, monkeypatch):
+    decoded_with = []
+    decode = jwt.decode
+    monkeypatch.setattr(jwt, "decode", lambda *args, algorithms, **kwargs: (
+        decoded_with.append(algorithms) or decode(*args, algorithms=algorithms, **kwargs)
+    ))
+
+    # The header names another asymmetric algorithm for an ES256 key
+    header = {"alg": "RS256", "typ": "JWT", "kid": "key-1"}
+    payload = {"sub": "user-1", "aud": "authenticated", "iss": core.auth.SUPABASE_JWT_ISSUER,
+               "exp": int(time.time()) + 60}
+    signing_input = f"{_b64(json.dumps(header).encode())}.{_b64(json.dumps(payload).encode())}"
+    signature = jwt.algorithms.ECAlgorithm(jwt.algorithms.ECAlgorithm.SHA256).sign(signing_input.encode(), KEY)
+    _rejected(f"{signing_input}.{_b64(signature)}")
+    assert decoded_with == [["ES256"]]
+
+    # HS256 signed with the public key, the classic algorithm confusion
+    public_pem = KEY.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    for alg in ("HS256", "ES256"):
+        header = {"alg": alg, "typ": "JWT", "kid": "key-1"}
+        signing_input = f"{_b64(json.dumps(header).encode())}.{_b64(json.dumps(payload).encode())}"
+        signature = hmac.new(public_pem, signing_input.encode(), hashlib.sha256).digest()
+        _rejected(f"{signing_input}.{_b64(signature)}")
+
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"Authorization": "Bearer not-a-token"},
+    {"Authorization": "Basic dXNlcjpwYXNz"},
+])
+def test_export_requires_a_valid_bearer_token(jwks, headers):
+    app = FastAPI()
+    app.include_router(jobs.router)
+
+    async def export():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/jobs/export", headers=headers)
+
+    response = asyncio.run(export())
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
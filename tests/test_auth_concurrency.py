@@ -0,0 +1,93 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import core.supabase
+from api.routes.v1 import auth
+
+CONCURRENT_CALLS = 10
+# Only reached if the calls do not overlap
+BARRIER_TIMEOUT = 10
+
+SESSION = {
+    "access_token": "access", "refresh_token": "refresh", "expires_in": 3600,
+    "expires_at": 9999999999, "token_type": "bearer",
+    "user": {
+        "id": "user-1", "phone": "+441234567890", "aud": "authenticated", "app_metadata": {},
+        "user_metadata": {}, "created_at": "2026-01-01T00:00:00Z",
+    },
+}
+
+
+class BarrierGoTrue(BaseHTTPRequestHandler):
+    """Answers no auth call until CONCURRENT_CALLS of them are in flight at once"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        try:
+            self.server.barrier.wait()
+        except threading.BrokenBarrierError:
+            status, body = 503, b"{}"
+        else:
+            status, body = 200, json.dumps(SESSION if self.path.startswith("/auth/v1/verify") else {}).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GoTrueServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 would drop some of the simultaneous
+    # connects, whose SYN retransmits then hold up the barrier for a second
+    request_queue_size = 64
+
+
+@pytest.fixture
+def gotrue(monkeypatch):
+    server = GoTrueServer(("127.0.0.1", 0), BarrierGoTrue)
+    server.barrier = threading.Barrier(CONCURRENT_CALLS, timeout=BARRIER_TIMEOUT)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(core.supabase, "SUPABASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(core.supabase, "SUPABASE_ANON_KEY", "anon")
+    yield server.barrier
+    server.shutdown()
+    server.server_close()
+
+
+async def _concurrently(path: str, payload: dict):
+    app = FastAPI()
+    app.include_router(auth.router)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[client.post(path, json=payload) for _ in range(CONCURRENT_CALLS)])
+    finally:
+        # The pool belongs to this event loop
+        await core.supabase.close_supabase_pool()
+
+
+def test_send_otp_calls_overlap(gotrue):
+    responses = asyncio.run(_concurrently("/auth/phone/send-otp", {"phone": "+441234567890"}))
+    # Serialized calls would break the barrier, failing every call
+    assert [r.status_code for r in responses] == [200] * CONCURRENT_CALLS
+    assert not gotrue.broken
+
+
+def test_verify_otp_calls_overlap(gotrue):
+    responses = asyncio.run(
+        _concurrently("/auth/phone/verify-otp", {"phone": "+441234567890", "token": "123456"})
+    )
+    assert [r.status_code for r in responses] == [200] * CONCURRENT_CALLS
+    assert responses[0].json()["access_token"] == "access"
+    assert not gotrue.broken
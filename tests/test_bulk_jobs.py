@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from core.db import build_async_url
+from domain.job.repository import AsyncJobRepository
+from domain.job.service import MAX_BULK_JOBS, AsyncJobService
+from infrastructure.db.models import Job, ZanUser
+
+
+def _job(user_id: int, title: str) -> dict:
+    return {
+        "user_id": user_id, "task_title": title, "polished_task": title, "location_address": "1 Park Row, Leeds",
+        "latitude": "53.8008", "longitude": "-1.5491", "scheduled_at": datetime(2030, 1, 1, 10, 0),
+        "duration_hours": 1, "duration_minutes": 0, "estimated_cost_pence": 4500, "people_required": 1,
+        "actions": "[]", "tags": "plumbing", "payment_mode": "card", "payment_status": "pending",
+        "currency": "GBP", "pickup_adress": "", "pickup_latitude": "", "pickup_longitude": "",
+    }
+
+
+class RecordingSession:
+    """AsyncSession stand-in that fails the test on any statement"""
+
+    info = {}
+
+    async def scalars(self, statement, params=None):
+        raise AssertionError(f"unexpected statement: {statement}")
+
+    async def execute(self, statement, params=None):
+        raise AssertionError(f"unexpected statement: {statement}")
+
+    async def commit(self):
+        raise AssertionError("unexpected commit")
+
+
+class FakeZanUserRepository:
+    def __init__(self, existing):
+        self.existing = set(existing)
+        self.lookups = []
+
+    async def get_existing_ids(self, user_ids):
+        self.lookups.append(list(user_ids))
+        return self.existing & set(user_ids)
+
+
+class FakeJobRepository:
+    def __init__(self):
+        self.batches = []
+
+    async def create_many(self, rows):
+        self.batches.append(rows)
+        return [{"job_id": i, **row} for i, row in enumerate(rows, 1)]
+
+
+def test_unknown_users_are_reported_by_index():
+    users, repo = FakeZanUserRepository({1, 2}), FakeJobRepository()
+    jobs = [_job(1, "a"), _job(9, "b"), _job(2, "c"), _job(9, "d"), _job(8, "e")]
+    result = asyncio.run(AsyncJobService(repo, users).create_jobs_bulk(jobs))
+
+    assert users.lookups == [[1, 9, 2, 9, 8]]
+    assert result["errors"] == [
+        {"index": 1, "detail": "User with user_id 9 not found in zan_user table"},
+        {"index": 3, "detail": "User with user_id 9 not found in zan_user table"},
+        {"index": 4, "detail": "User with user_id 8 not found in zan_user table"},
+    ]
+    # The valid rows go to one INSERT, in request order
+    assert [[row["task_title"] for row in batch] for batch in repo.batches] == [["a", "c"]]
+    assert [job["task_title"] for job in result["created"]] == ["a", "c"]
+
+
+def test_too_many_jobs_are_refused_before_any_query():
+    users = FakeZanUserRepository({1})
+    with pytest.raises(ValueError, match=f"At most {MAX_BULK_JOBS}"):
+        asyncio.run(AsyncJobService(FakeJobRepository(), users).create_jobs_bulk([_job(1, "a")] * (MAX_BULK_JOBS + 1)))
+    assert users.lookups == []
+
+
+@pytest.mark.parametrize("jobs", [[], [_job(9, "a"), _job(8, "b")]])
+def test_empty_or_all_invalid_batches_insert_nothing(jobs):
+    service = AsyncJobService(AsyncJobRepository(RecordingSession()), FakeZanUserRepository({1}))
+    result = asyncio.run(service.create_jobs_bulk(jobs))
+    assert result["created"] == []
+    assert [error["index"] for error in result["errors"]] == list(range(len(jobs)))
+
+
+def test_created_rows_come_back_in_request_order(database_url):
+    async def scenario():
+        url, connect_args = build_async_url(database_url)
+        engine = create_async_engine(url, connect_args=connect_args)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                user = ZanUser(phone="+447700900999", first_name="Bulk")
+                db.add(user)
+                await db.commit()
+                # Titles out of any natural order, so a reordered RETURNING shows
+                titles = [f"bulk-{(i * 37) % 200:03d}" for i in range(200)]
+                try:
+                    created = await AsyncJobRepository(db).create_many([_job(user.user_id, t) for t in titles])
+                    assert [job.task_title for job in created] == titles
+                    assert all(job.geo_cell is not None for job in created)
+                finally:
+                    await db.execute(delete(Job).where(Job.user_id == user.user_id))
+                    await db.delete(user)
+                    await db.commit()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
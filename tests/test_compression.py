@@ -0,0 +1,177 @@
+import asyncio
+import gzip
+import socket
+import threading
+import time
+import zlib
+
+import httpx
+import pytest
+import uvicorn
+import zstandard
+from starlette.datastructures import Headers
+from starlette.responses import StreamingResponse
+
+from core.compression import CompressionMiddleware, StreamCompressor, negotiate_encoding
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("zstd", "zstd"),
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("GZIP", "gzip"),
+    ("gzip;q=1.0, zstd;q=0.5", "gzip"),
+    ("gzip;q=0.4, zstd;q=0.8", "zstd"),
+    ("zstd;q=0.5, gzip;q=0.5", "zstd"),
+    ("deflate, br", None),
+    ("identity", None),
+    ("", None),
+])
+def test_preferred_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_wildcard_covers_unlisted_codings():
+    assert negotiate_encoding("*") == "zstd"
+    assert negotiate_encoding("zstd;q=0, *") == "gzip"
+    assert negotiate_encoding("gzip;q=0.9, *;q=0.1") == "gzip"
+
+
+def test_q_zero_refuses_a_coding():
+    assert negotiate_encoding("zstd;q=0, gzip") == "gzip"
+    assert negotiate_encoding("zstd;q=0, gzip;q=0") is None
+    assert negotiate_encoding("*;q=0") is None
+    assert negotiate_encoding("gzip, *;q=0") == "gzip"
+
+
+def test_malformed_q_values_refuse_the_coding():
+    assert negotiate_encoding("zstd;q=high, gzip") == "gzip"
+
+
+@pytest.mark.parametrize("encoding, decompress", [
+    ("gzip", gzip.decompress),
+    ("zstd", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+])
+def test_stream_chunks_concatenate_to_the_body(encoding, decompress):
+    compressor = StreamCompressor(encoding)
+    chunks = [b'{"job_id": %d}\n' % i for i in range(100)]
+    body = b"".join(compressor.compress(chunk, final=i == len(chunks) - 1) for i, chunk in enumerate(chunks))
+    assert decompress(body) == b"".join(chunks)
+
+
+def _http_app(body_chunks, status=200, headers=()):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (name.encode(), value.encode()) for name, value in headers
+        ]})
+        for i, chunk in enumerate(body_chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(body_chunks) - 1})
+    return app
+
+
+def _call(app, accept_encoding="gzip, zstd"):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    start, *bodies = messages
+    return start, Headers(raw=start["headers"]), bodies
+
+
+JSON_BODY = b'[' + b",".join(b'{"job_id": %d, "task_title": "Fix tap"}' % i for i in range(200)) + b']'
+
+
+def test_large_bodies_are_compressed_with_their_length():
+    start, headers, [body] = _call(_http_app([JSON_BODY], headers=[
+        ("content-type", "application/json"), ("content-length", str(len(JSON_BODY))),
+    ]))
+    assert headers["content-encoding"] == "zstd"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body["body"]) < len(JSON_BODY)
+    assert zstandard.ZstdDecompressor().decompress(body["body"]) == JSON_BODY
+
+
+def test_small_bodies_pass_uncompressed_but_vary():
+    start, headers, [body] = _call(_http_app([b'{"job_id": 1}'], headers=[
+        ("content-type", "application/json"), ("content-length", "13"),
+    ]))
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["content-length"] == "13" and body["body"] == b'{"job_id": 1}'
+
+
+@pytest.mark.parametrize("status, headers", [
+    (200, [("content-type", "application/json"), ("content-encoding", "br")]),
+    (304, [("content-type", "application/json"), ("etag", 'W/"job-1"')]),
+    (200, [("content-type", "image/png")]),
+    (200, [("content-type", "application/octet-stream")]),
+])
+def test_encoded_not_modified_and_binary_responses_pass_through(status, headers):
+    headers = [*headers, ("content-length", str(len(JSON_BODY)))]
+    start, sent_headers, [body] = _call(_http_app([JSON_BODY], status, headers))
+    assert start["status"] == status
+    assert start["headers"] == [(name.encode(), value.encode()) for name, value in headers]
+    assert body["body"] == JSON_BODY
+
+
+def test_identity_clients_get_the_body_as_is():
+    start, headers, [body] = _call(_http_app([JSON_BODY], headers=[("content-type", "application/json")]),
+                                   accept_encoding="identity")
+    assert "content-encoding" not in headers and body["body"] == JSON_BODY
+
+
+@pytest.mark.parametrize("accept_encoding, decompressor", [
+    ("zstd", lambda: zstandard.ZstdDecompressor().decompressobj()),
+    ("gzip", lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)),
+])
+def test_streams_are_compressed_chunk_by_chunk(accept_encoding, decompressor):
+    lines = [b'{"job_id": %d, "task_title": "Fix tap"}\n' % i for i in range(100)]
+    chunks = [b"".join(lines[i:i + 10]) for i in range(0, 100, 10)]
+    start, headers, bodies = _call(
+        _http_app(chunks, headers=[("content-type", "application/x-ndjson")]), accept_encoding
+    )
+    assert headers["content-encoding"] == accept_encoding
+    # No length up front: the server sends the body with chunked transfer encoding
+    assert "content-length" not in headers
+    assert [body["more_body"] for body in bodies] == [True] * 9 + [False]
+    # Every chunk is flushed, so the client can decode each one on arrival
+    decoder = decompressor()
+    for chunk, body in zip(chunks, bodies):
+        assert decoder.decompress(body["body"]) == chunk
+
+
+@pytest.fixture
+def ndjson_server():
+    async def rows():
+        for i in range(100):
+            yield b'{"job_id": %d}\n' % i
+
+    async def app(scope, receive, send):
+        if scope["type"] == "http":
+            await StreamingResponse(rows(), media_type="application/x-ndjson")(scope, receive, send)
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(CompressionMiddleware(app), lifespan="off", ws="none", log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    server.should_exit = True
+    thread.join()
+    sock.close()
+
+
+def test_streamed_response_goes_out_chunked(ndjson_server):
+    response = httpx.get(ndjson_server, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["transfer-encoding"] == "chunked"
+    assert "content-length" not in response.headers
+    assert response.content == b"".join(b'{"job_id": %d}\n' % i for i in range(100))
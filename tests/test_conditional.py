@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from starlette.requests import Request
+
+from core.conditional import is_conditional, is_not_modified, validators, with_version_fields
+
+VERSION = datetime(2026, 3, 1, 12, 0, 0, 250000)
+
+
+def _request(**headers) -> Request:
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+def _etag(version=VERSION, fields=None) -> str:
+    return validators("job-1", version, fields)["ETag"]
+
+
+def test_validators_are_weak_and_vary_with_version_and_fields():
+    headers = validators("job-1", VERSION)
+    assert headers["ETag"].startswith('W/"job-1-')
+    assert headers["Last-Modified"] == "Sun, 01 Mar 2026 12:00:00 GMT"
+    assert _etag(VERSION + timedelta(microseconds=1)) != _etag()
+    assert _etag(fields=["job_id"]) != _etag()
+    # Naive versions are UTC
+    assert _etag(VERSION.replace(tzinfo=timezone.utc)) == _etag()
+
+
+def test_only_requests_with_validators_are_conditional():
+    assert not is_conditional(_request())
+    assert is_conditional(_request(if_none_match=_etag()))
+    assert is_conditional(_request(if_modified_since="Sun, 01 Mar 2026 12:00:00 GMT"))
+
+
+@pytest.mark.parametrize("if_none_match", [
+    _etag(),
+    _etag()[2:],
+    f'"other", {_etag()}',
+    f'W/"other",{_etag()[2:]}',
+    "*",
+    " * ",
+])
+def test_if_none_match_matches(if_none_match):
+    headers = validators("job-1", VERSION)
+    assert is_not_modified(_request(if_none_match=if_none_match), headers, VERSION)
+
+
+@pytest.mark.parametrize("if_none_match", [
+    _etag(VERSION - timedelta(seconds=1)),
+    _etag(fields=["job_id"]),
+    'W/"other"',
+    "",
+])
+def test_if_none_match_mismatches(if_none_match):
+    headers = validators("job-1", VERSION)
+    assert not is_not_modified(_request(if_none_match=if_none_match), headers, VERSION)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    headers = validators("job-1", VERSION)
+    request = _request(if_none_match='W/"other"', if_modified_since="Mon, 02 Mar 2026 00:00:00 GMT")
+    assert not is_not_modified(request, headers, VERSION)
+
+
+def test_if_modified_since_has_second_precision():
+    headers = validators("job-1", VERSION)
+    assert is_not_modified(_request(if_modified_since=headers["Last-Modified"]), headers, VERSION)
+    earlier = "Sun, 01 Mar 2026 11:59:59 GMT"
+    assert not is_not_modified(_request(if_modified_since=earlier), headers, VERSION)
+    assert not is_not_modified(_request(if_modified_since="yesterday"), headers, VERSION)
+
+
+def test_version_fields_extend_projections_only():
+    assert with_version_fields(None) is None
+    assert with_version_fields(["job_id", "updated_at"]) == ["job_id", "updated_at", "created_at"]
@@ -0,0 +1,275 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+import core.consistency
+import core.db
+import core.dependencies
+from core.consistency import (
+    CONSISTENCY_COOKIE, CONSISTENCY_HEADER, ConsistencyTokenMiddleware, async_should_use_replica,
+    get_consistency_token, should_use_replica,
+)
+from core.dependencies import get_async_db, get_db
+from core.routing import SessionRoute
+
+
+def _lsn(value: str) -> int:
+    high, low = value.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeConnection:
+    """Answers the WAL position queries the way a server at these LSNs would"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _answer(self, statement, params):
+        self.engine.queries.append(str(statement))
+        if "pg_current_wal_lsn" in str(statement):
+            return FakeResult(self.engine.current_lsn)
+        return FakeResult(_lsn(self.engine.replay_lsn) >= _lsn(params["lsn"]))
+
+    def execute(self, statement, params=None):
+        return self._answer(statement, params)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeAsyncConnection(FakeConnection):
+    async def execute(self, statement, params=None):
+        return self._answer(statement, params)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeEngine:
+    def __init__(self, current_lsn="0/16B3748", replay_lsn="0/100"):
+        self.current_lsn = current_lsn
+        self.replay_lsn = replay_lsn
+        self.queries = []
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeAsyncEngine(FakeEngine):
+    def connect(self):
+        return FakeAsyncConnection(self)
+
+
+class Request:
+    def __init__(self, method="GET", token=None):
+        self.method = method
+        self.headers = {CONSISTENCY_HEADER: token} if token else {}
+        self.cookies = {}
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Replica routing on, with a primary and a replica that has replayed up to 0/100"""
+    engines = {}
+
+    def engine(cls):
+        def get(replica: bool = False):
+            return engines.setdefault((cls, replica), cls())
+        return get
+
+    for module in (core.consistency, core.dependencies):
+        monkeypatch.setattr(module, "REPLICA_ENABLED", True)
+    monkeypatch.setattr(core.consistency, "get_engine", engine(FakeEngine))
+    monkeypatch.setattr(core.consistency, "get_async_engine", engine(FakeAsyncEngine))
+    return engines
+
+
+def _request(app, method: str, path: str, **kwargs):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+def _write_app(status_code: int = 201):
+    app = FastAPI()
+
+    @app.api_route("/write", methods=["GET", "POST"], status_code=status_code)
+    def write():
+        return {}
+
+    app.add_middleware(ConsistencyTokenMiddleware)
+    return app
+
+
+def test_a_write_returns_the_primary_lsn_as_header_and_cookie(replica):
+    response = _request(_write_app(), "POST", "/write")
+    assert response.headers[CONSISTENCY_HEADER] == "0/16B3748"
+    assert response.cookies[CONSISTENCY_COOKIE] == "0/16B3748"
+    cookie = response.headers["set-cookie"]
+    assert "HttpOnly" in cookie and f"Max-Age={core.consistency.CONSISTENCY_TOKEN_TTL}" in cookie
+
+
+def test_reads_and_failed_writes_get_no_token(replica):
+    assert CONSISTENCY_HEADER not in _request(_write_app(), "GET", "/write").headers
+    response = _request(_write_app(status_code=409), "POST", "/write")
+    assert CONSISTENCY_HEADER not in response.headers and "set-cookie" not in response.headers
+    assert replica == {}
+
+
+@pytest.mark.parametrize("token, use_replica", [
+    (None, True),
+    ("0/80", True),
+    ("0/100", True),
+    ("0/101", False),
+    ("1/0", False),
+    ("not-an-lsn", True),
+])
+def test_a_token_ahead_of_the_replica_replay_reads_from_the_primary(replica, token, use_replica):
+    assert should_use_replica(Request(token=token)) is use_replica
+    assert asyncio.run(async_should_use_replica(Request(token=token))) is use_replica
+
+
+def test_the_replay_check_runs_only_for_a_read_with_a_token(replica):
+    assert not should_use_replica(Request("POST", token="0/80"))
+    assert should_use_replica(Request(token=None))
+    assert replica == {}
+    should_use_replica(Request(token="0/80"))
+    assert "pg_last_wal_replay_lsn" in replica[(FakeEngine, True)].queries[0]
+
+
+def test_an_unreachable_replica_sends_token_reads_to_the_primary(replica, monkeypatch):
+    def unreachable(replica: bool = False):
+        raise ConnectionError("replica is down")
+
+    monkeypatch.setattr(core.consistency, "get_engine", unreachable)
+    monkeypatch.setattr(core.consistency, "get_async_engine", unreachable)
+    assert not should_use_replica(Request(token="0/80"))
+    assert not asyncio.run(async_should_use_replica(Request(token="0/80")))
+
+
+class FakeSession:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def execute(self, statement):
+        self.log.append(self.name)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAsyncSession(FakeSession):
+    async def execute(self, statement):
+        self.log.append(self.name)
+
+    async def commit(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+def test_with_the_replica_disabled_nothing_touches_it(monkeypatch):
+    opened = []
+
+    def factory(name, session):
+        return lambda info=None: session(name, opened)
+
+    def untouchable(replica: bool = False):
+        raise AssertionError("the replica engine was used")
+
+    for module in (core.consistency, core.dependencies):
+        monkeypatch.setattr(module, "REPLICA_ENABLED", False)
+    monkeypatch.setattr(core.consistency, "get_engine", untouchable)
+    monkeypatch.setattr(core.consistency, "get_async_engine", untouchable)
+    monkeypatch.setattr(core.dependencies, "SessionLocal", factory("primary", FakeSession))
+    monkeypatch.setattr(core.dependencies, "ReplicaSessionLocal", factory("replica", FakeSession))
+    monkeypatch.setattr(core.dependencies, "AsyncSessionLocal", factory("primary", FakeAsyncSession))
+    monkeypatch.setattr(core.dependencies, "AsyncReplicaSessionLocal", factory("replica", FakeAsyncSession))
+
+    router = APIRouter(route_class=SessionRoute)
+
+    @router.get("/sync")
+    def read_sync(db=Depends(get_db, scope="function")):
+        db.execute("select 1")
+
+    @router.get("/async")
+    async def read_async(db=Depends(get_async_db, scope="function")):
+        await db.execute("select 1")
+
+    app = _write_app()
+    app.include_router(router)
+
+    for path in ("/sync", "/async"):
+        response = _request(app, "GET", path, headers={CONSISTENCY_HEADER: "0/80"})
+        assert response.status_code == 200
+    response = _request(app, "POST", "/write")
+    assert CONSISTENCY_HEADER not in response.headers
+    assert opened == ["primary", "primary"]
+
+
+
+@pytest.mark.parametrize("enabled, created", [
+    (False, ["primary", "primary_async"]),
+    (True, ["primary", "primary_async", "replica", "replica_async"]),
+])
+def test_replica_engines_exist_only_when_enabled(monkeypatch, enabled, created):
+    engines = []
+
+    def create(url, name):
+        engines.append(name)
+        return name
+
+    monkeypatch.setattr(core.db, "REPLICA_ENABLED", enabled)
+    monkeypatch.setattr(core.db, "DATABASE_REPLICA_URL", "postgresql://replica/db" if enabled else None)
+    monkeypatch.setattr(core.db, "_create_engine", create)
+    monkeypatch.setattr(core.db, "_create_async_engine", create)
+    for name in ("_engine", "_async_engine", "_replica_engine", "_async_replica_engine"):
+        monkeypatch.setattr(core.db, name, None)
+    for name in ("SessionLocal", "ReplicaSessionLocal"):
+        monkeypatch.setattr(core.db, name, sessionmaker())
+    for name in ("AsyncSessionLocal", "AsyncReplicaSessionLocal"):
+        monkeypatch.setattr(core.db, name, async_sessionmaker())
+
+    core.db.init_engines()
+    assert engines == created
+    replica = "replica" if enabled else "primary"
+    assert core.db.ReplicaSessionLocal.kw["bind"] == replica
+    assert core.db.AsyncReplicaSessionLocal.kw["bind"] == replica + "_async"
+    # Disposal closes each engine once
+    assert core.db.all_engines() == (created[0::2], created[1::2])
+
+def test_the_wal_queries_run_on_postgres(database_url):
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            lsn = conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+            assert get_consistency_token(Request(token=lsn)) == lsn
+            # A primary has no replay position, so it always counts as caught up
+            assert conn.execute(core.consistency._REPLICA_CAUGHT_UP, {"lsn": "FFFFFFFF/0"}).scalar() is True
+    finally:
+        engine.dispose()
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+from core.geo import MAX_SEARCH_RADIUS_KM
+from domain.zan_crew.index import CrewIndex, crew_position
+
+# Leeds city centre; 0.01 degrees of latitude is about 1.1 km
+LAT, LNG = 53.8008, -1.5491
+
+
+def _crew(zancrew_id, lat=LAT, lng=LNG, radius_km=5.0, is_online="true", home_lat=None, home_lng=None):
+    return SimpleNamespace(
+        zancrew_id=zancrew_id, zan_user_id=zancrew_id + 1000, is_online=is_online, radius_km=radius_km,
+        latitude=None if lat is None else str(lat), longitude=None if lng is None else str(lng),
+        home_lat=home_lat, home_lng=home_lng,
+    )
+
+
+def _ids(matches):
+    return [position.zancrew_id for position, _ in matches]
+
+
+def test_crew_position_requires_online_crew_with_a_radius():
+    assert crew_position(_crew(1)) is not None
+    assert crew_position(_crew(1, is_online="false")) is None
+    assert crew_position(_crew(1, is_online=None)) is None
+    assert crew_position(_crew(1, radius_km=0)) is None
+    assert crew_position(_crew(1, radius_km=None)) is None
+
+
+def test_crew_position_falls_back_to_home_and_caps_the_radius():
+    position = crew_position(_crew(1, lat=None, lng=None, home_lat="51.5", home_lng="-0.1"))
+    assert (position.lat, position.lng) == (51.5, -0.1)
+    assert crew_position(_crew(1, lat=None, lng=None)) is None
+    assert crew_position(_crew(1, radius_km=10_000)).radius_km == MAX_SEARCH_RADIUS_KM
+
+
+def test_candidates_are_nearest_first_within_each_crew_radius():
+    index = CrewIndex()
+    index.load([
+        _crew(1, lat=LAT + 0.03),                 # ~3.3 km away, radius 5 km
+        _crew(2, lat=LAT + 0.01),                 # ~1.1 km away
+        _crew(3, lat=LAT + 0.09),                 # ~10 km away, out of its own radius
+        _crew(4, lat=LAT + 0.09, radius_km=15),   # ~10 km away, radius covers the job
+        _crew(5, is_online="false"),
+    ])
+    assert index.loaded and len(index) == 4
+    matches = index.candidates(LAT, LNG)
+    assert _ids(matches) == [2, 1, 4]
+    assert [round(distance, 1) for _, distance in matches] == [1.1, 3.3, 10.0]
+    assert _ids(index.candidates(LAT, LNG, limit=2)) == [2, 1]
+
+
+def test_add_moves_and_drops_crew():
+    index = CrewIndex()
+    index.add(_crew(1))
+    assert _ids(index.candidates(LAT, LNG)) == [1]
+
+    # Moved out of range of the job, then back
+    index.add(_crew(1, lat=LAT + 1))
+    assert index.candidates(LAT, LNG) == []
+    assert len(index) == 1
+    index.add(_crew(1))
+    assert _ids(index.candidates(LAT, LNG)) == [1]
+
+    # Going offline drops them
+    index.add(_crew(1, is_online="false"))
+    assert len(index) == 0
+    assert index.candidates(LAT, LNG) == []
+
+
+def test_remove():
+    index = CrewIndex()
+    index.load([_crew(1), _crew(2)])
+    index.remove(1)
+    index.remove(99)
+    assert _ids(index.candidates(LAT, LNG)) == [2]
+    index.remove(2)
+    assert len(index) == 0 and index._cells == {}
+
+
+def test_candidates_across_the_antimeridian_and_near_the_pole():
+    index = CrewIndex()
+    index.load([_crew(1, lat=-16.5, lng=-179.98), _crew(2, lat=89.95, lng=120.0, radius_km=20)])
+    assert _ids(index.candidates(-16.5, 179.99)) == [1]
+    assert _ids(index.candidates(89.99, -60.0)) == [2]
@@ -0,0 +1,182 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, delete
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from api.routes.v1 import zan_crew
+from core.db import build_async_url
+from core.dependencies import get_async_zan_crew_service
+from domain.zan_crew.index import crew_index
+from domain.zan_crew.repository import (
+    AsyncZanCrewRepository, ZanCrewExistsError, ZanCrewRepository, _upsert_statement, zan_crew_cache,
+)
+from domain.zan_crew.service import AsyncZanCrewService
+from infrastructure.db.models import ZanCrew, ZanUser
+
+
+def _sql(rows):
+    return str(_upsert_statement(rows).compile(dialect=postgresql.dialect()))
+
+
+def test_upsert_sql_keeps_stored_values_for_nulls_and_skips_unchanged_rows():
+    sql = _sql([{"zan_user_id": 1, "phone": "+447700900001", "city": None},
+                {"zan_user_id": 2, "phone": "+447700900002", "city": "Leeds"}])
+    assert "ON CONFLICT (zan_user_id) DO UPDATE SET" in sql
+    assert "phone = coalesce(excluded.phone, zan_crew.phone)" in sql
+    assert "city = coalesce(excluded.city, zan_crew.city)" in sql
+    assert "updated_at = now()" in sql
+    # The key is never rewritten and updated_at is not part of the change check
+    assert "zan_user_id = " not in sql
+    assert ("WHERE (zan_crew.city, zan_crew.phone) IS DISTINCT FROM "
+            "(coalesce(excluded.city, zan_crew.city), coalesce(excluded.phone, zan_crew.phone))") in sql
+    assert "RETURNING zan_crew.zancrew_id" in sql
+
+
+def test_upsert_sql_covers_the_union_of_the_batch_columns():
+    sql = _sql([{"zan_user_id": 1, "phone": "+447700900001"}, {"zan_user_id": 2, "phone": "+1", "radius_km": 5.0}])
+    assert "radius_km = coalesce(excluded.radius_km, zan_crew.radius_km)" in sql
+    assert "(zan_crew.phone, zan_crew.radius_km) IS DISTINCT FROM" in sql
+
+
+class FakeZanUserRepository:
+    async def get_by_phone(self, phone):
+        return ZanUser(user_id=1, phone=phone)
+
+
+class FailingCommitSession:
+    def __init__(self, error):
+        self.error = error
+        self.rolled_back = False
+
+    def add(self, instance):
+        pass
+
+    async def commit(self):
+        raise self.error
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+def _integrity_error(constraint: str):
+    return IntegrityError("INSERT INTO zan_crew ...", {}, Exception(
+        f'duplicate key value violates unique constraint "{constraint}"'
+    ))
+
+
+def test_create_that_loses_the_unique_race_is_a_conflict():
+    db = FailingCommitSession(_integrity_error("uq_zan_crew_zan_user_id"))
+    with pytest.raises(ZanCrewExistsError, match="user_id: 1"):
+        asyncio.run(AsyncZanCrewRepository(db).create(phone="+447700900001", zan_user_id=1))
+    assert db.rolled_back
+
+    # Other integrity errors are not mistaken for a duplicate
+    db = FailingCommitSession(_integrity_error("zan_crew_zan_user_id_fkey"))
+    with pytest.raises(IntegrityError):
+        asyncio.run(AsyncZanCrewRepository(db).create(phone="+447700900001", zan_user_id=1))
+
+
+@pytest.mark.parametrize("existing", [True, False])
+def test_create_of_an_existing_crew_returns_409(existing):
+    class Repository:
+        """Finds the existing crew, or misses one a concurrent create commits first"""
+
+        async def get_by_zan_user_id(self, zan_user_id):
+            return ZanCrew(zan_user_id=zan_user_id) if existing else None
+
+        async def create(self, **fields):
+            raise ZanCrewExistsError("ZanCrew already exists for user_id: 1")
+
+    app = FastAPI()
+    app.include_router(zan_crew.router)
+    app.dependency_overrides[get_async_zan_crew_service] = lambda: AsyncZanCrewService(
+        Repository(), FakeZanUserRepository()
+    )
+
+    async def create():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/zan-crew", json={"phone": "+447700900001"})
+
+    response = asyncio.run(create())
+    assert response.status_code == 409
+    assert response.json() == {"detail": "ZanCrew already exists for user_id: 1"}
+
+
+def test_resending_an_unchanged_record_does_not_rewrite_it(database_url):
+    async def scenario():
+        url, connect_args = build_async_url(database_url)
+        engine = create_async_engine(url, connect_args=connect_args)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                users = [ZanUser(phone=f"+44770090099{i}", first_name="Upsert") for i in range(2)]
+                db.add_all(users)
+                await db.commit()
+                ids = [user.user_id for user in users]
+                repo = AsyncZanCrewRepository(db)
+                try:
+                    rows = [{"zan_user_id": i, "phone": f"+44770090099{n}", "city": "Leeds"} for n, i in enumerate(ids)]
+                    first = await repo.upsert_many(rows)
+                    assert sorted(crew.zan_user_id for crew in first) == ids
+                    assert [crew.updated_at for crew in first] == [None, None]
+
+                    # One row changes, the other sends only a null
+                    second = await repo.upsert_many([dict(rows[0], city="York"), dict(rows[1], city=None)])
+                    by_user = {crew.zan_user_id: crew for crew in second}
+                    assert sorted(by_user) == ids
+                    assert (by_user[ids[0]].city, by_user[ids[1]].city) == ("York", "Leeds")
+                    assert by_user[ids[0]].updated_at is not None
+                    assert by_user[ids[1]].updated_at is None
+
+                    # Re-sending the stored values rewrites nothing but still returns both rows
+                    stamp = by_user[ids[0]].updated_at
+                    third = await repo.upsert_many([dict(rows[0], city="York"), rows[1]])
+                    assert {crew.zan_user_id: crew.updated_at for crew in third} == {ids[0]: stamp, ids[1]: None}
+                finally:
+                    await db.execute(delete(ZanCrew).where(ZanCrew.zan_user_id.in_(ids)))
+                    await db.execute(delete(ZanUser).where(ZanUser.user_id.in_(ids)))
+                    await db.commit()
+                    zan_crew_cache.clear()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_a_duplicate_create_is_a_conflict_on_both_drivers(database_url):
+    async def create_async(user_id):
+        url, connect_args = build_async_url(database_url)
+        engine = create_async_engine(url, connect_args=connect_args)
+        try:
+            async with AsyncSession(engine) as db:
+                await AsyncZanCrewRepository(db).create(phone="+447700900997", zan_user_id=user_id)
+        finally:
+            await engine.dispose()
+
+    engine = create_engine(database_url)
+    try:
+        with Session(engine) as db:
+            user = ZanUser(phone="+447700900997", first_name="Duplicate")
+            db.add(user)
+            db.commit()
+            user_id = user.user_id
+            zancrew_id = None
+            try:
+                zancrew_id = ZanCrewRepository(db).create(phone=user.phone, zan_user_id=user_id).zancrew_id
+                # Both skip the existence check, as a racing request would
+                with pytest.raises(ZanCrewExistsError):
+                    ZanCrewRepository(db).create(phone="+447700900997", zan_user_id=user_id)
+                with pytest.raises(ZanCrewExistsError):
+                    asyncio.run(create_async(user_id))
+            finally:
+                db.execute(delete(ZanCrew).where(ZanCrew.zan_user_id == user_id))
+                db.execute(delete(ZanUser).where(ZanUser.user_id == user_id))
+                db.commit()
+                crew_index.remove(zancrew_id)
+    finally:
+        engine.dispose()
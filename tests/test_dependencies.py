@@ -0,0 +1,129 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+
+import core.consistency
+import core.dependencies
+from core.dependencies import get_async_db
+from core.routing import SessionRoute
+
+
+class FakeSessionFactory:
+    """Stands in for an async_sessionmaker, logging what its sessions do"""
+
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def __call__(self, info):
+        self.log.append((self.name, "open", info))
+        return FakeAsyncSession(self.name, self.log)
+
+
+class FakeAsyncSession:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    async def execute(self, statement):
+        self.log.append((self.name, "execute"))
+
+    def add(self, instance):
+        self.log.append((self.name, "add"))
+
+    async def commit(self):
+        self.log.append((self.name, "commit"))
+
+    async def close(self):
+        self.log.append((self.name, "close"))
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    log, checks = [], []
+
+    async def caught_up(lsn):
+        checks.append(lsn)
+        return lsn == "0/10"
+
+    monkeypatch.setattr(core.dependencies, "REPLICA_ENABLED", True)
+    monkeypatch.setattr(core.consistency, "REPLICA_ENABLED", True)
+    monkeypatch.setattr(core.consistency, "async_replica_has_caught_up", caught_up)
+    monkeypatch.setattr(core.dependencies, "AsyncSessionLocal", FakeSessionFactory("primary", log))
+    monkeypatch.setattr(core.dependencies, "AsyncReplicaSessionLocal", FakeSessionFactory("replica", log))
+    return log, checks
+
+
+def _app():
+    router = APIRouter(route_class=SessionRoute)
+
+    @router.api_route("/query", methods=["GET", "POST"])
+    async def query(db=Depends(get_async_db, scope="function")):
+        await db.execute("select 1")
+
+    @router.get("/add")
+    async def add(db=Depends(get_async_db, scope="function")):
+        db.add(object())
+        await db.execute("select 1")
+
+    @router.get("/untouched")
+    async def untouched(db=Depends(get_async_db, scope="function")):
+        return None
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def _request(method: str, path: str, **kwargs):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_app()), base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    response = asyncio.run(send())
+    assert response.status_code == 200
+    return response
+
+
+def test_reads_open_a_replica_session_released_before_the_response(sessions):
+    log, checks = sessions
+    _request("GET", "/query")
+    assert log == [
+        ("replica", "open", {"replica": True}),
+        ("replica", "execute"), ("replica", "commit"), ("replica", "close"),
+    ]
+    assert checks == []
+
+
+@pytest.mark.parametrize("token, database", [("0/10", "replica"), ("0/FF", "primary")])
+def test_reads_with_a_consistency_token_wait_for_the_replica_or_use_the_primary(sessions, token, database):
+    log, checks = sessions
+    _request("GET", "/query", headers={"X-Consistency-Token": token})
+    assert checks == [token]
+    # Either way the lookup caches are bypassed for this session
+    assert log[0] == (database, "open", {"replica": True, "read_your_writes": True})
+
+
+def test_writes_open_a_primary_session_without_checking_the_replica(sessions):
+    log, checks = sessions
+    _request("POST", "/query", headers={"X-Consistency-Token": "0/10"})
+    assert log[0] == ("primary", "open", {})
+    assert checks == []
+
+
+def test_a_sync_call_before_any_query_uses_the_primary(sessions):
+    log, checks = sessions
+    _request("GET", "/add")
+    assert log == [
+        ("primary", "open", {"replica": True}),
+        ("primary", "add"), ("primary", "execute"), ("primary", "commit"), ("primary", "close"),
+    ]
+    assert checks == []
+
+
+def test_an_untouched_session_is_never_opened(sessions):
+    log, checks = sessions
+    _request("GET", "/untouched")
+    assert log == [] and checks == []
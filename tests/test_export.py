@@ -0,0 +1,165 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import core.export
+from api.routes.v1 import jobs, zan_crew, zan_users
+from core.auth import get_current_user
+from core.db import build_async_url
+from core.export import _csv, _csv_value, _ndjson, export_response
+from infrastructure.db.models import ZanUser
+
+STMT = select(ZanUser.user_id, ZanUser.first_name, ZanUser.address, ZanUser.created_at)
+
+
+def _fake_batches(*batches):
+    async def fake(stmt):
+        for batch in batches:
+            yield batch
+    return fake
+
+
+def _collect(body):
+    async def read():
+        return [chunk async for chunk in body]
+    return asyncio.run(read())
+
+
+def _row(user_id, first_name, address, created_at):
+    return {"user_id": user_id, "first_name": first_name, "address": address, "created_at": created_at}
+
+
+@pytest.mark.parametrize("value, written", [
+    (None, None),
+    ("plain", "plain"),
+    (42, 42),
+    (datetime(2026, 1, 2, 3, 4, 5, 6, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+     "2026-01-02T03:04:05.000006+05:30"),
+    (datetime(2026, 1, 2, 3, 4, 5), "2026-01-02T03:04:05"),
+    (date(2026, 1, 2), "2026-01-02"),
+])
+def test_csv_value(value, written):
+    assert _csv_value(value) == written
+
+
+def test_csv_quotes_awkward_values_and_writes_none_as_empty(monkeypatch):
+    created = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    rows = [
+        _row(1, "Asha", "12 High Street, Leeds", created),
+        _row(2, 'Sam "Fixit"', "Flat 2\nMill Lane", None),
+        _row(3, None, "", created),
+    ]
+    monkeypatch.setattr(core.export, "_batches", _fake_batches(rows[:2], rows[2:]))
+    chunks = _collect(_csv(STMT))
+    # The header goes out with the first batch, then one chunk per batch
+    assert len(chunks) == 2
+    text = b"".join(chunks).decode()
+    assert text.startswith("user_id,first_name,address,created_at\r\n"
+                           '1,Asha,"12 High Street, Leeds",2026-01-02T03:04:05+00:00\r\n'
+                           '2,"Sam ""Fixit""","Flat 2\nMill Lane",\r\n')
+    assert list(csv.reader(io.StringIO(text, newline=""))) == [
+        ["user_id", "first_name", "address", "created_at"],
+        ["1", "Asha", "12 High Street, Leeds", "2026-01-02T03:04:05+00:00"],
+        ["2", 'Sam "Fixit"', "Flat 2\nMill Lane", ""],
+        ["3", "", "", "2026-01-02T03:04:05+00:00"],
+    ]
+
+
+def test_csv_of_an_empty_table_is_the_header(monkeypatch):
+    monkeypatch.setattr(core.export, "_batches", _fake_batches())
+    assert _collect(_csv(STMT)) == [b"user_id,first_name,address,created_at\r\n"]
+
+
+def test_ndjson_writes_one_object_per_row(monkeypatch):
+    rows = [_row(1, "Asha", 'a "quoted", multi\nline', datetime(2026, 1, 2, 3, 4, 5)), _row(2, None, None, None)]
+    monkeypatch.setattr(core.export, "_batches", _fake_batches(rows))
+    lines = b"".join(_collect(_ndjson(STMT))).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        _row(1, "Asha", 'a "quoted", multi\nline', "2026-01-02T03:04:05"),
+        _row(2, None, None, None),
+    ]
+
+
+@pytest.mark.parametrize("router, path, name", [
+    (zan_users.router, "/zan-users/export", "zan-users"),
+    (zan_crew.router, "/zan-crew/export", "zan-crew"),
+    (jobs.router, "/jobs/export", "jobs"),
+])
+def test_the_format_query_parameter(monkeypatch, router, path, name):
+    monkeypatch.setattr(core.export, "_batches", _fake_batches())
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "exporter"}
+
+    def get(params):
+        async def send():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.get(path, params=params)
+        return asyncio.run(send())
+
+    for params, export_format in (({}, "ndjson"), ({"format": "ndjson"}, "ndjson"), ({"format": "csv"}, "csv"),
+                                  # Only the alias is read
+                                  ({"export_format": "csv"}, "ndjson")):
+        response = get(params)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith(core.export.EXPORT_MEDIA_TYPES[export_format])
+        disposition = response.headers["content-disposition"]
+        assert disposition.startswith(f'attachment; filename="{name}-') and disposition.endswith(f'.{export_format}"')
+
+    for value in ("xml", "CSV", ""):
+        response = get({"format": value})
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["query", "format"]
+
+
+def test_the_whole_stream_reads_one_snapshot(database_url, monkeypatch):
+    monkeypatch.setattr(core.export, "EXPORT_BATCH_SIZE", 2)
+
+    async def scenario():
+        url, connect_args = build_async_url(database_url)
+        engine = create_async_engine(url, connect_args=connect_args)
+        monkeypatch.setattr(core.export, "get_async_engine", lambda replica=False: engine)
+        try:
+            async with engine.begin() as conn:
+                ids = list((await conn.execute(ZanUser.__table__.insert().returning(ZanUser.user_id), [
+                    {"phone": f"+44770090098{i}", "first_name": f"Export {i}"} for i in range(5)
+                ])).scalars())
+            try:
+                stmt = select(
+                    ZanUser.user_id, ZanUser.first_name,
+                    func.current_setting("transaction_isolation").label("isolation"),
+                    func.current_setting("transaction_read_only").label("read_only"),
+                ).where(ZanUser.user_id.in_(ids)).order_by(ZanUser.user_id)
+                body = export_response(stmt, "ndjson", "zan-users").body_iterator
+                chunks = [await anext(body)]
+
+                # Commit changes to rows the export has not sent yet
+                async with engine.begin() as conn:
+                    await conn.execute(update(ZanUser).where(ZanUser.user_id == ids[-1]).values(first_name="Changed"))
+                    await conn.execute(delete(ZanUser).where(ZanUser.user_id == ids[-2]))
+                    await conn.execute(ZanUser.__table__.insert(), {"phone": "+447700900989", "first_name": "Late"})
+                chunks += [chunk async for chunk in body]
+
+                rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+                assert len(chunks) == 3
+                assert [(row["user_id"], row["first_name"]) for row in rows] == [
+                    (user_id, f"Export {i}") for i, user_id in enumerate(ids)
+                ]
+                assert {(row["isolation"], row["read_only"]) for row in rows} == {("repeatable read", "on")}
+            finally:
+                async with engine.begin() as conn:
+                    await conn.execute(delete(ZanUser).where(
+                        ZanUser.user_id.in_(ids) | (ZanUser.phone == "+447700900989")
+                    ))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.fields import InvalidFieldsError, parse_fields, projected_columns, sparse_response
+from domain.job.schemas import JobResponse
+from infrastructure.db.models import Job
+
+
+def test_no_projection_without_fields():
+    assert parse_fields(None, JobResponse) is None
+
+
+def test_fields_keep_request_order_without_duplicates():
+    assert parse_fields("task_title, job_id,task_title,", JobResponse) == ["task_title", "job_id"]
+
+
+@pytest.mark.parametrize("fields, message", [
+    ("", "at least one field"),
+    (" , ", "at least one field"),
+    ("job_id,password", "Unknown fields: password"),
+])
+def test_invalid_fields_are_rejected(fields, message):
+    with pytest.raises(InvalidFieldsError, match=message):
+        parse_fields(fields, JobResponse)
+
+
+def test_projection_always_selects_the_primary_key():
+    columns = projected_columns(Job, ["task_title", "scheduled_at"], "job_id")
+    assert [column.name for column in columns] == ["job_id", "task_title", "scheduled_at"]
+    columns = projected_columns(Job, ["task_title", "job_id"], "job_id")
+    assert [column.name for column in columns] == ["task_title", "job_id"]
+
+
+def test_sparse_response_keeps_only_requested_keys_and_route_headers():
+    row = SimpleNamespace(_mapping={"job_id": 1, "task_title": "Fix tap"})
+    route_response = SimpleNamespace(headers=SimpleNamespace(raw=[(b"x-next-cursor", b"abc")]))
+    sparse = sparse_response([row], ["task_title"], route_response)
+    assert sparse.body == b'[{"task_title":"Fix tap"}]'
+    assert sparse.headers["x-next-cursor"] == "abc"
+    assert sparse_response(row, ["job_id"]).body == b'{"job_id":1}'
@@ -0,0 +1,82 @@
+from core.geo import (
+    CELL_COLUMNS, MAX_SEARCH_RADIUS_KM, bounding_box, cell_ranges, geo_columns, grid_cell, haversine_km,
+    parse_latitude, parse_longitude,
+)
+
+
+def _covered(ranges, cell):
+    return any(first <= cell <= last for first, last in ranges)
+
+
+def test_coordinates_outside_their_range_are_dropped():
+    assert parse_latitude("53.8008") == 53.8008
+    assert parse_longitude(" -1.5491 ") == -1.5491
+    for value in (None, "", "north", "nan", "90.5"):
+        assert parse_latitude(value) is None
+    assert parse_longitude("180") == 180.0
+    assert parse_longitude("-180.5") is None
+
+
+def test_grid_cells():
+    assert grid_cell(-90.0, -180.0) == 0
+    assert grid_cell(-90.0, -179.95) == 0
+    assert grid_cell(-89.85, -180.0) == CELL_COLUMNS
+    # The northern and eastern edges fall in the last row and column
+    assert grid_cell(90.0, 180.0) == grid_cell(89.95, 179.95)
+    assert grid_cell(None, 0.0) is None
+
+
+def test_haversine_distance():
+    # London to Paris
+    assert round(haversine_km(51.5074, -0.1278, 48.8566, 2.3522)) == 344
+    assert haversine_km(53.8, -1.5, 53.8, -1.5) == 0.0
+
+
+def test_geo_columns_follow_the_stored_coordinates():
+    assert geo_columns("53.8008", "-1.5491") == {
+        "geo_lat": 53.8008, "geo_lng": -1.5491, "geo_cell": grid_cell(53.8008, -1.5491),
+    }
+    assert geo_columns("53.8008", "east") == {"geo_lat": 53.8008, "geo_lng": None, "geo_cell": None}
+
+
+def test_bounding_box_without_wrap():
+    min_lat, max_lat, lng_ranges = bounding_box(51.5, -0.1, 5)
+    assert min_lat < 51.5 < max_lat
+    assert len(lng_ranges) == 1
+    west, east = lng_ranges[0]
+    assert west < -0.1 < east
+
+
+def test_bounding_box_splits_at_the_antimeridian():
+    _, _, east_side = bounding_box(0.0, 179.9, 50)
+    assert east_side[0][0] == -180.0 and east_side[0][1] > -180.0
+    assert east_side[1][1] == 180.0 and east_side[1][0] < 179.9
+
+    _, _, west_side = bounding_box(0.0, -179.9, 50)
+    assert west_side[0][0] == -180.0 and west_side[0][1] > -179.9
+    assert west_side[1][1] == 180.0 and west_side[1][0] < 180.0
+
+
+def test_cell_ranges_reach_across_the_antimeridian():
+    ranges = cell_ranges(-16.5, 179.99, 10)
+    assert _covered(ranges, grid_cell(-16.5, -179.98))
+    assert _covered(ranges, grid_cell(-16.5, 179.98))
+    assert haversine_km(-16.5, 179.99, -16.5, -179.98) < 10
+
+
+def test_cell_ranges_near_a_pole_stay_few():
+    ranges = cell_ranges(89.9, 0.0, MAX_SEARCH_RADIUS_KM)
+    assert len(ranges) == 1
+    first, last = ranges[0]
+    # Whole rows of cells, every longitude included
+    assert first % CELL_COLUMNS == 0 and (last + 1) % CELL_COLUMNS == 0
+    assert _covered(ranges, grid_cell(89.95, 179.9))
+    assert _covered(ranges, grid_cell(89.95, -179.9))
+
+
+def test_cell_ranges_are_sorted_and_disjoint():
+    for lat, lng in ((51.5, -0.1), (0.0, 179.99), (-45.0, -179.99), (80.0, 10.0)):
+        ranges = cell_ranges(lat, lng, MAX_SEARCH_RADIUS_KM)
+        for (_, last), (first, _) in zip(ranges, ranges[1:]):
+            assert first > last + 1
+        assert _covered(ranges, grid_cell(lat, lng))
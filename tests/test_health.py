@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+import core.db
+import core.health
+from api.routes.v2 import health
+from core.health import DatabaseProbe
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Fresh primary engines for database_url, and a probe that has never run"""
+    def use(database_url):
+        monkeypatch.setattr(core.db, "DATABASE_URL", database_url)
+        monkeypatch.setattr(core.db, "ASYNC_DATABASE_URL", None)
+        for module in (core.db, core.health):
+            monkeypatch.setattr(module, "REPLICA_ENABLED", False)
+        for name in ("_engine", "_async_engine", "_replica_engine", "_async_replica_engine"):
+            monkeypatch.setattr(core.db, name, None)
+        for name in ("SessionLocal", "ReplicaSessionLocal"):
+            monkeypatch.setattr(core.db, name, sessionmaker())
+        for name in ("AsyncSessionLocal", "AsyncReplicaSessionLocal"):
+            monkeypatch.setattr(core.db, name, async_sessionmaker())
+        monkeypatch.setattr(health, "database_probe", DatabaseProbe(ttl=60))
+    return use
+
+
+def _deep_health():
+    app = FastAPI()
+    app.include_router(health.router)
+
+    async def check():
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return [await client.get("/health/deep") for _ in range(2)]
+        finally:
+            await core.db.dispose_engines()
+
+    return asyncio.run(check())
+
+
+def test_an_unreachable_primary_is_down_with_pool_stats(engines):
+    # Nothing listens on port 1, so every connection attempt is refused
+    engines("postgresql://zanzo@127.0.0.1:1/zanzo")
+    first, second = _deep_health()
+    assert first.status_code == second.status_code == 503
+    body = first.json()
+    assert body["status"] == "down"
+    primary = body["database"]["primary"]
+    assert primary["ok"] is False and primary["error"]
+    assert "replica" not in body["database"] and body["database"]["cached"] is False
+    # The failed probe is reused, so a polling load balancer does not retry the database
+    assert second.json()["database"]["cached"] is True
+    assert second.json()["database"]["primary"] == primary
+
+    pool = body["pools"]["primary_async"]
+    assert pool["checked_out"] == 0 and pool["checkout_timeouts"] == 0
+    assert "checkout_wait_ms" in pool and "primary" in body["pools"]
+    assert set(body["caches"]) == {"zan_user", "zan_crew"}
+
+
+def test_a_reachable_primary_is_ok(engines, database_url):
+    engines(database_url)
+    response, _ = _deep_health()
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["database"]["primary"]["ok"] is True
+    assert body["pools"]["primary_async"]["checked_out"] == 0
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from core.pagination import InvalidCursorError, encode_cursor
+from domain.job.service import _parse_listing
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def test_defaults_to_job_id_ascending():
+    assert _parse_listing() == ({}, "job_id", False, None)
+    assert _parse_listing(encode_cursor(40)) == ({}, "job_id", False, 40)
+
+
+def test_descending_sort_keys():
+    _, key, descending, _ = _parse_listing(sort="-estimated_cost_pence")
+    assert (key, descending) == ("estimated_cost_pence", True)
+
+
+@pytest.mark.parametrize("sort", ["task_title", "-task_title", "", "--job_id", "job_id;drop table job"])
+def test_unknown_sort_keys_are_rejected(sort):
+    with pytest.raises(ValueError, match="Cannot sort by"):
+        _parse_listing(sort=sort)
+
+
+def test_aware_window_bounds_become_naive_utc():
+    filters, *_ = _parse_listing(filters={
+        "scheduled_from": datetime(2030, 1, 1, 10, 0, tzinfo=IST),
+        "scheduled_to": datetime(2030, 1, 2, tzinfo=timezone.utc),
+        "bucket": "standard",
+    })
+    assert filters == {
+        "scheduled_from": datetime(2030, 1, 1, 4, 30),
+        "scheduled_to": datetime(2030, 1, 2),
+        "bucket": "standard",
+    }
+
+
+def test_naive_bounds_are_kept():
+    filters, *_ = _parse_listing(filters={"scheduled_from": datetime(2030, 1, 1, 10, 0)})
+    assert filters == {"scheduled_from": datetime(2030, 1, 1, 10, 0)}
+
+
+def test_window_must_not_be_empty():
+    # 10:00 IST is 04:30 UTC, before the naive 05:00 UTC bound
+    _parse_listing(filters={"scheduled_from": datetime(2030, 1, 1, 10, 0, tzinfo=IST),
+                            "scheduled_to": datetime(2030, 1, 1, 5, 0)})
+    with pytest.raises(ValueError, match="scheduled_from must be before scheduled_to"):
+        _parse_listing(filters={"scheduled_from": datetime(2030, 1, 1, 10, 0, tzinfo=IST),
+                                "scheduled_to": datetime(2030, 1, 1, 4, 30)})
+
+
+def test_keyset_cursors_follow_the_sort_key():
+    cursor = encode_cursor([datetime(2030, 1, 1, 10, 0), 7])
+    assert _parse_listing(cursor, sort="-scheduled_at")[3] == [datetime(2030, 1, 1, 10, 0), 7]
+    assert _parse_listing(encode_cursor([4500, 7]), sort="estimated_cost_pence")[3] == [4500, 7]
+
+
+@pytest.mark.parametrize("cursor, sort", [
+    (encode_cursor(["not a date", 7]), "scheduled_at"),
+    (encode_cursor([4500, 7]), "scheduled_at"),
+    (encode_cursor(["2030-01-01T10:00:00", 7]), "estimated_cost_pence"),
+    (encode_cursor([4500, 7]), "job_id"),
+    (encode_cursor(7), "estimated_cost_pence"),
+])
+def test_cursors_from_another_sort_are_rejected(cursor, sort):
+    with pytest.raises(InvalidCursorError):
+        _parse_listing(cursor, sort=sort)
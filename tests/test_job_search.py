@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import REAL, delete
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from core.db import build_async_url
+from core.pagination import NEXT_CURSOR_HEADER, decode_keyset_cursor, set_next_cursor
+from domain.job.repository import AsyncJobRepository, _select_search
+from domain.job.service import AsyncJobService, MAX_SEARCH_TAGS
+from infrastructure.db.models import Job, ZanUser
+
+
+def _compiled(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def test_text_search_uses_websearch_syntax_and_ranks_best_first():
+    query = 'garden "fence repair" -paint OR hedge'
+    compiled = _compiled(_select_search(query))
+    sql = str(compiled)
+    # The query goes to Postgres as typed; websearch_to_tsquery parses it
+    assert "jobs.search_vector @@ websearch_to_tsquery(" in sql
+    assert "ts_rank(jobs.search_vector, websearch_to_tsquery(" in sql
+    assert sorted(compiled.params.values()) == sorted(["english", query])
+    assert sql.endswith("DESC, jobs.job_id")
+
+
+def test_tag_only_search_ranks_every_job_zero():
+    compiled = _compiled(_select_search(None, ["plumbing", "urgent"]))
+    sql = str(compiled)
+    assert "ts_rank" not in sql and "@@" not in sql
+    assert "jobs.tag_list @> " in sql
+    assert compiled.params == {"param_1": 0.0, "tag_list_1": ["plumbing", "urgent"]}
+    assert isinstance(compiled.binds["param_1"].type, REAL)
+
+
+def test_rank_cursor_is_bound_as_real():
+    compiled = _compiled(_select_search("fence", None, [0.0607927106320858, 42]))
+    # ts_rank returns real, and the cursor holds that real widened to a float
+    assert compiled.params["param_1"] == 0.0607927106320858
+    assert isinstance(compiled.binds["param_1"].type, REAL)
+    assert "< %(param_1)s OR ts_rank" in str(compiled)
+    assert "= %(param_1)s AND jobs.job_id > %(job_id_1)s" in str(compiled)
+
+
+def test_rank_survives_the_cursor_round_trip():
+    response = SimpleNamespace(headers={})
+    rank = 0.0607927106320858  # a float4 ts_rank widened to a Python float
+    set_next_cursor(response, [SimpleNamespace(rank=rank, job_id=42)], 1, ("rank", "job_id"))
+    assert decode_keyset_cursor(response.headers[NEXT_CURSOR_HEADER], (float, int), int) == [rank, 42]
+
+
+class FakeJobRepository:
+    def __init__(self):
+        self.searches = []
+
+    async def search(self, query, tags, limit, after):
+        self.searches.append((query, tags, limit, after))
+        return []
+
+
+def test_search_arguments_are_normalised():
+    repo = FakeJobRepository()
+    asyncio.run(AsyncJobService(repo).search_jobs("  fence  ", " Plumbing, urgent,,plumbing ", 10))
+    assert repo.searches == [("fence", ["plumbing", "urgent"], 10, None)]
+
+
+@pytest.mark.parametrize("query, tags, message", [
+    (None, None, "Provide a search query"),
+    ("   ", " , ", "Provide a search query"),
+    (None, ",".join(f"tag{i}" for i in range(MAX_SEARCH_TAGS + 1)), f"At most {MAX_SEARCH_TAGS} tags"),
+])
+def test_search_needs_text_or_a_few_tags(query, tags, message):
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(AsyncJobService(FakeJobRepository()).search_jobs(query, tags))
+
+
+def _job(user_id: int, title: str, tags: str) -> Job:
+    return Job(
+        user_id=user_id, task_title=title, polished_task=title, location_address="1 Park Row, Leeds",
+        latitude="53.8008", longitude="-1.5491", scheduled_at=datetime(2030, 1, 1, 10, 0),
+        duration_hours=1, duration_minutes=0, estimated_cost_pence=4500, people_required=1,
+        actions="[]", tags=tags, payment_mode="card", payment_status="pending", currency="GBP",
+        pickup_adress="", pickup_latitude="", pickup_longitude="",
+    )
+
+
+def test_search_on_postgres(database_url):
+    async def scenario():
+        url, connect_args = build_async_url(database_url)
+        engine = create_async_engine(url, connect_args=connect_args)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                user = ZanUser(phone="+447700900996", first_name="Search")
+                db.add(user)
+                await db.commit()
+                titles = {
+                    "fence": "Zqx fence repair in the garden",
+                    "paint": "Zqx fence repair and paint",
+                    "hedge": "Zqx hedge trimming",
+                    "gutter": "Zqx gutter cleaning",
+                }
+                db.add_all([_job(user.user_id, title, f"Zqxtag, {name}") for name, title in titles.items()])
+                await db.commit()
+                repo = AsyncJobRepository(db)
+
+                async def found(query=None, tags=None):
+                    return {job.task_title for job in await repo.search(query, tags, 100)}
+
+                try:
+                    assert await found('zqx "fence repair"') == {titles["fence"], titles["paint"]}
+                    assert await found('zqx "fence repair" -paint') == {titles["fence"]}
+                    assert await found("zqx hedge OR gutter") == {titles["hedge"], titles["gutter"]}
+
+                    tagged = await repo.search(None, ["zqxtag", "hedge"], 100)
+                    assert [(job.task_title, job.rank) for job in tagged] == [(titles["hedge"], 0.0)]
+
+                    # Page one row at a time through equal and unequal ranks
+                    for query, tags in (("zqx", None), ("zqx fence", None), (None, ["zqxtag"])):
+                        everything = [job.job_id for job in await repo.search(query, tags, 100)]
+                        paged, after = [], None
+                        while True:
+                            response = SimpleNamespace(headers={})
+                            page = await repo.search(query, tags, 1, after)
+                            paged += [job.job_id for job in page]
+                            set_next_cursor(response, page, 1, ("rank", "job_id"))
+                            if NEXT_CURSOR_HEADER not in response.headers:
+                                break
+                            after = decode_keyset_cursor(response.headers[NEXT_CURSOR_HEADER], (float, int), int)
+                        assert paged == everything and len(everything) == len(set(everything))
+                finally:
+                    await db.execute(delete(Job).where(Job.user_id == user.user_id))
+                    await db.delete(user)
+                    await db.commit()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
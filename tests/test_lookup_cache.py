@@ -0,0 +1,187 @@
+from datetime import datetime
+
+import pytest
+
+from core.cache import LookupCache
+from domain.zan_crew.repository import ZanCrewRepository, zan_crew_cache
+from domain.zan_user.repository import ZanUserRepository, zan_user_cache
+from domain.zan_user.service import ZanUserService
+from infrastructure.db.models import ZanUser
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+        self.rowcount = 0 if row is None else 1
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.row
+
+
+class FakeSession:
+    """Answers every query with one zan_user row and counts the loads"""
+
+    def __init__(self, row, **info):
+        self.row = row
+        self.info = info
+        self.loads = 0
+
+    def execute(self, statement):
+        if statement.is_select:
+            self.loads += 1
+        return FakeResult(self.row)
+
+    def commit(self):
+        pass
+
+    def refresh(self, instance):
+        pass
+
+    def delete(self, instance):
+        self.row = None
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    zan_user_cache.clear()
+    zan_crew_cache.clear()
+    yield
+    zan_user_cache.clear()
+    zan_crew_cache.clear()
+
+
+def _user(**values):
+    return ZanUser(**{"user_id": 1, "phone": "+447700900001", "first_name": "Asha",
+                      "created_at": datetime(2026, 1, 1), **values})
+
+
+def test_hits_and_misses():
+    cache = LookupCache("test", maxsize=10, ttl=60)
+    assert cache.get(("user_id", 1)) is None
+    assert cache.set(("user_id", 1), "snapshot", 1, cache.generation())
+    assert cache.get(("user_id", 1)) == "snapshot"
+    assert cache.stats() == {
+        "size": 1, "maxsize": 10, "ttl_seconds": 60, "replica_ttl_seconds": 0,
+        "hits": 1, "misses": 1, "hit_rate": 0.5,
+    }
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = LookupCache("test", maxsize=10, ttl=60, replica_ttl=10, timer=clock)
+    cache.set("primary", "p", 1, cache.generation())
+    cache.set("replica", "r", 2, cache.generation(), replica=True)
+    clock.now = 9.9
+    assert (cache.get("primary"), cache.get("replica")) == ("p", "r")
+    clock.now = 10
+    assert (cache.get("primary"), cache.get("replica")) == ("p", None)
+    clock.now = 60
+    assert cache.get("primary") is None
+
+
+def test_replica_ttl_is_capped_and_zero_turns_replica_fills_off():
+    assert LookupCache("test", maxsize=10, ttl=60, replica_ttl=600).replica_ttl == 60
+    cache = LookupCache("test", maxsize=10, ttl=60)
+    assert not cache.set("key", "r", 1, cache.generation(), replica=True)
+    assert cache.get("key") is None
+
+
+def test_invalidate_drops_every_key_of_an_owner():
+    cache = LookupCache("test", maxsize=10, ttl=60)
+    generation = cache.generation()
+    cache.set(("user_id", 1), "one", 1, generation)
+    cache.set(("phone", "+44"), "one", 1, generation)
+    cache.set(("user_id", 2), "two", 2, generation)
+    cache.invalidate(1)
+    assert cache.get(("user_id", 1)) is None and cache.get(("phone", "+44")) is None
+    assert cache.get(("user_id", 2)) == "two"
+
+
+def test_a_load_that_raced_an_invalidation_is_not_cached():
+    cache = LookupCache("test", maxsize=10, ttl=60)
+    generation = cache.generation()
+    # The row is read, then a write to the same entity invalidates it
+    cache.invalidate(1)
+    assert not cache.set(("user_id", 1), "old", 1, generation)
+    assert cache.get(("user_id", 1)) is None
+    # Other entities and later loads are cached as usual
+    assert cache.set(("user_id", 2), "two", 2, generation)
+    assert cache.set(("user_id", 1), "new", 1, cache.generation())
+    assert cache.get(("user_id", 1)) == "new"
+
+
+def test_lookups_read_through_the_cache():
+    db = FakeSession(_user())
+    repo = ZanUserRepository(db)
+    assert repo.get_by_id(1).first_name == "Asha"
+    assert repo.get_by_id(1).first_name == "Asha"
+    assert db.loads == 1
+    # A conditional GET reads the row and refreshes the snapshot
+    repo.get_by_id(1, cached=False)
+    assert db.loads == 2
+
+
+def test_replica_reads_fill_and_token_reads_bypass_the_cache(monkeypatch):
+    monkeypatch.setattr(zan_user_cache, "replica_ttl", 10)
+    replica = FakeSession(_user(), replica=True)
+    ZanUserRepository(replica).get_by_id(1)
+    ZanUserRepository(replica).get_by_id(1)
+    assert replica.loads == 1
+
+    monkeypatch.setattr(zan_user_cache, "replica_ttl", 0)
+    zan_user_cache.clear()
+    ZanUserRepository(replica).get_by_id(1)
+    ZanUserRepository(replica).get_by_id(1)
+    assert replica.loads == 3
+
+    token = FakeSession(_user(first_name="Fresh"), replica=True, read_your_writes=True)
+    assert ZanUserRepository(token).get_by_id(1).first_name == "Fresh"
+    assert token.loads == 1
+
+
+def test_update_invalidates_the_user():
+    db = FakeSession(_user())
+    service = ZanUserService(ZanUserRepository(db), ZanCrewRepository(db))
+    service.get_zan_user(1)
+    service.update_zan_user(1, first_name="Bea")
+    assert service.get_zan_user(1).first_name == "Bea"
+    assert db.loads == 3
+
+
+def test_delete_invalidates_the_user_and_their_crew():
+    db = FakeSession(_user())
+    zan_crew_cache.set(("zan_user_id", 1), "crew", 1, zan_crew_cache.generation())
+    service = ZanUserService(ZanUserRepository(db), ZanCrewRepository(db))
+    service.get_zan_user(1)
+    service.delete_zan_user(1)
+    with pytest.raises(ValueError, match="ZanUser not found"):
+        service.get_zan_user(1)
+    assert zan_crew_cache.get(("zan_user_id", 1)) is None
+
+
+def test_phone_update_cascades_to_the_crew_cache():
+    db = FakeSession(_user())
+    generation = zan_crew_cache.generation()
+    zan_crew_cache.set(("zan_user_id", 1), "crew", 1, generation)
+    zan_crew_cache.set(("phone", "+447700900001"), "crew", 1, generation)
+    zan_crew_cache.set(("zan_user_id", 2), "other crew", 2, generation)
+    service = ZanUserService(ZanUserRepository(db), ZanCrewRepository(db))
+
+    service.update_zan_user(1, first_name="Bea")
+    assert zan_crew_cache.get(("zan_user_id", 1)) == "crew"
+
+    service.update_zan_user(1, phone="+447700900002")
+    assert zan_crew_cache.get(("zan_user_id", 1)) is None
+    assert zan_crew_cache.get(("phone", "+447700900001")) is None
+    assert zan_crew_cache.get(("zan_user_id", 2)) == "other crew"
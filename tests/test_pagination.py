@@ -0,0 +1,75 @@
+import base64
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from core.pagination import (
+    NEXT_CURSOR_HEADER, InvalidCursorError, decode_cursor, decode_id_cursor, decode_keyset_cursor,
+    encode_cursor, set_next_cursor,
+)
+
+
+def _raw_cursor(payload: bytes) -> str:
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def test_cursor_round_trips():
+    for after in (42, [3.5, 7], ["2030-01-01T10:00:00", 9]):
+        cursor = encode_cursor(after)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == after
+
+
+def test_datetime_keys_are_encoded_as_iso_strings():
+    after = decode_cursor(encode_cursor([datetime(2030, 1, 1, 10, 30), 5]))
+    assert after == ["2030-01-01T10:30:00", 5]
+
+
+def test_id_cursor():
+    assert decode_id_cursor(None) is None
+    assert decode_id_cursor(encode_cursor(17)) == 17
+    for after in ("17", 1.5, True, None, [17]):
+        with pytest.raises(InvalidCursorError):
+            decode_id_cursor(encode_cursor(after))
+
+
+def test_keyset_cursor_checks_each_part():
+    cursor = encode_cursor([2.5, 10])
+    assert decode_keyset_cursor(cursor, (float, int), int) == [2.5, 10]
+    assert decode_keyset_cursor(None, float, int) is None
+    with pytest.raises(InvalidCursorError):
+        decode_keyset_cursor(cursor, float, int, int)
+    with pytest.raises(InvalidCursorError):
+        decode_keyset_cursor(encode_cursor([2.5, "10"]), float, int)
+    with pytest.raises(InvalidCursorError):
+        decode_keyset_cursor(encode_cursor([2.5, True]), float, int)
+    with pytest.raises(InvalidCursorError):
+        decode_keyset_cursor(encode_cursor(10), int)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode_cursor(17)[:-2],
+    _raw_cursor(b"[17]"),
+    _raw_cursor(b'{"before": 17}'),
+    _raw_cursor(b"\xff\xfe"),
+    "",
+])
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_id_cursor(cursor)
+
+
+def test_next_cursor_only_for_full_pages():
+    rows = [SimpleNamespace(job_id=i, distance_km=i / 10) for i in (1, 2)]
+
+    response = SimpleNamespace(headers={})
+    set_next_cursor(response, rows, 3, "job_id")
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+    set_next_cursor(response, rows, 2, "job_id")
+    assert decode_id_cursor(response.headers[NEXT_CURSOR_HEADER]) == 2
+
+    set_next_cursor(response, rows, 2, ("distance_km", "job_id"))
+    assert decode_keyset_cursor(response.headers[NEXT_CURSOR_HEADER], float, int) == [0.2, 2]
@@ -0,0 +1,144 @@
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import create_engine, delete, func, literal, select, update
+from sqlalchemy.orm import Session
+
+import export_jobs_parquet
+from export_jobs_parquet import WATERMARK_FILE, read_watermark, window_end
+from infrastructure.db.models import Job, ZanUser
+
+PHONE = "+447700900979"
+
+
+def _job(user_id: int, title: str) -> Job:
+    return Job(
+        user_id=user_id, task_title=title, polished_task=title, location_address="1 Park Row, Leeds",
+        latitude="53.8008", longitude="-1.5491", scheduled_at=datetime(2030, 1, 1, 10, 0),
+        duration_hours=1, duration_minutes=0, estimated_cost_pence=4500, people_required=1,
+        actions="[]", tags="Parquet", payment_mode="card", payment_status="pending", currency="GBP",
+        pickup_adress="", pickup_latitude="", pickup_longitude="",
+    )
+
+
+@pytest.fixture
+def jobs(database_url, monkeypatch):
+    """Three fresh jobs, with the export pointed at the test database"""
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    monkeypatch.delenv("DATABASE_REPLICA_URL", raising=False)
+    engine = create_engine(database_url)
+    with Session(engine) as db:
+        user = ZanUser(phone=PHONE, first_name="Parquet")
+        db.add(user)
+        db.commit()
+        db.add_all([_job(user.user_id, f"Parquet job {i}") for i in range(3)])
+        db.commit()
+        ids = list(db.scalars(select(Job.job_id).where(Job.user_id == user.user_id).order_by(Job.job_id)))
+        # End the read, so each update's now() is taken after the runs before it
+        db.commit()
+        try:
+            yield db, ids
+        finally:
+            db.execute(delete(Job).where(Job.user_id == user.user_id))
+            db.execute(delete(ZanUser).where(ZanUser.user_id == user.user_id))
+            db.commit()
+    engine.dispose()
+
+
+def _run(monkeypatch, out, ids, *args):
+    """Run the export and return the test's job ids in the file it wrote, in file order"""
+    before = set(os.listdir(out)) if out.exists() else set()
+    monkeypatch.setattr(sys, "argv", ["export_jobs_parquet.py", "--out", str(out), *args])
+    export_jobs_parquet.main()
+    written = [name for name in os.listdir(out) if name.endswith(".parquet") and name not in before]
+    assert len(written) <= 1
+    if not written:
+        return []
+    exported = pq.read_table(out / written[0], columns=["job_id"]).column("job_id").to_pylist()
+    return [job_id for job_id in exported if job_id in ids]
+
+
+def _touch(db, *ids):
+    db.execute(update(Job).where(Job.job_id.in_(ids)).values(short_title="Edited"))
+    db.commit()
+
+
+def test_each_run_exports_only_the_jobs_changed_since_the_last(jobs, monkeypatch, tmp_path):
+    db, ids = jobs
+    out = tmp_path / "jobs"
+    runs = [_run(monkeypatch, out, ids, "--lag-seconds", "0")]
+    assert runs[0] == ids
+    watermarks = [read_watermark(str(out / WATERMARK_FILE))]
+
+    _touch(db, ids[1])
+    runs.append(_run(monkeypatch, out, ids, "--lag-seconds", "0"))
+    watermarks.append(read_watermark(str(out / WATERMARK_FILE)))
+    assert runs[-1] == [ids[1]]
+
+    # Nothing changed: no rows, but the watermark still advances
+    runs.append(_run(monkeypatch, out, ids, "--lag-seconds", "0"))
+    watermarks.append(read_watermark(str(out / WATERMARK_FILE)))
+    assert runs[-1] == []
+
+    _touch(db, ids[0], ids[2])
+    runs.append(_run(monkeypatch, out, ids, "--lag-seconds", "0"))
+    assert runs[-1] == [ids[0], ids[2]]
+
+    assert watermarks == sorted(watermarks) and len(set(watermarks)) == len(watermarks)
+    # Every change went out exactly once, and every file survived
+    assert Counter(job_id for run in runs for job_id in run) == {ids[0]: 2, ids[1]: 2, ids[2]: 2}
+    assert len([name for name in os.listdir(out) if name.endswith(".parquet")]) == 3
+
+
+def test_changes_inside_the_lag_wait_for_a_later_run(jobs, monkeypatch, tmp_path):
+    db, ids = jobs
+    out = tmp_path / "jobs"
+    db.execute(update(Job).where(Job.job_id == ids[0]).values(updated_at=func.now() - timedelta(hours=2)))
+    db.commit()
+    assert _run(monkeypatch, out, ids, "--lag-seconds", "3600") == [ids[0]]
+    watermark = read_watermark(str(out / WATERMARK_FILE))
+
+    assert _run(monkeypatch, out, ids, "--lag-seconds", "0") == ids[1:]
+    # A longer lag than the last run's keeps the watermark, so nothing is sent again
+    latest = read_watermark(str(out / WATERMARK_FILE))
+    assert latest > watermark
+    assert _run(monkeypatch, out, ids, "--lag-seconds", "3600") == []
+    assert read_watermark(str(out / WATERMARK_FILE)) == latest
+
+    assert _run(monkeypatch, out, ids, "--full", "--lag-seconds", "0") == ids
+
+
+class ReplayAt:
+    """sqlalchemy.func, with the replica's last replayed commit pinned to a time"""
+
+    def __init__(self, replayed):
+        self.replayed = replayed
+
+    def pg_last_xact_replay_timestamp(self):
+        return literal(self.replayed)
+
+    def __getattr__(self, name):
+        return getattr(func, name)
+
+
+def test_the_window_ends_at_the_replica_replay_time(database_url, monkeypatch):
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn, conn.begin():
+            now = conn.execute(select(func.now())).scalar()
+            # On the primary there is no replay position, so the clock decides
+            assert window_end(conn, 60) == now - timedelta(seconds=60)
+            assert window_end(conn, 0) == now
+
+            behind = now - timedelta(minutes=5)
+            monkeypatch.setattr(export_jobs_parquet, "func", ReplayAt(behind))
+            assert window_end(conn, 60) == behind - timedelta(seconds=60)
+            # A replay time ahead of the local clock is capped at the clock
+            monkeypatch.setattr(export_jobs_parquet, "func", ReplayAt(now + timedelta(minutes=5)))
+            assert window_end(conn, 60) == now - timedelta(seconds=60)
+    finally:
+        engine.dispose()
@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from domain.job.repository import AsyncJobRepository, _updatable as job_updatable, _with_geo
+from domain.job.schemas import JobUpdate
+from domain.zan_crew.index import crew_index
+from domain.zan_crew.repository import AsyncZanCrewRepository, _updatable as crew_updatable, zan_crew_cache
+from domain.zan_crew.schemas import ZanCrewUpdate
+from infrastructure.db.models import Job
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.row
+
+
+class FakeAsyncSession:
+    """Records each statement and answers it with the row it was given"""
+
+    def __init__(self, row=None):
+        self.row = row
+        self.statements = []
+        self.commits = 0
+        self.info = {}
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.row)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _compiled(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def _sql(expression):
+    return str(expression.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def _set_columns(statement):
+    # Bound parameters other than the WHERE clause's primary key
+    return sorted(name for name in _compiled(statement).params if not name.endswith("_id_1"))
+
+
+def test_explicit_nulls_are_kept_only_on_nullable_columns():
+    assert job_updatable({"imp_notes": None, "task_title": None, "bucket": "standard"}) == {
+        "imp_notes": None, "bucket": "standard",
+    }
+    assert crew_updatable({"city": None, "phone": None, "zan_user_id": None}) == {"city": None}
+
+
+def test_unset_fields_are_not_sent():
+    assert JobUpdate(task_title="Fix tap").model_dump(exclude_unset=True) == {"task_title": "Fix tap"}
+    assert JobUpdate(imp_notes=None).model_dump(exclude_unset=True) == {"imp_notes": None}
+    assert ZanCrewUpdate().model_dump(exclude_unset=True) == {}
+
+
+def test_job_update_sets_only_the_sent_columns():
+    db = FakeAsyncSession(row=SimpleNamespace(job_id=7))
+    job = asyncio.run(AsyncJobRepository(db).update_fields(7, {"task_title": "Fix tap", "imp_notes": None,
+                                                                "actions": None}))
+    assert job.job_id == 7 and db.commits == 1
+    [statement] = db.statements
+    assert _set_columns(statement) == ["imp_notes", "task_title"]
+    assert "RETURNING" in str(_compiled(statement))
+
+
+def test_job_update_with_nothing_to_set_only_reads():
+    db = FakeAsyncSession(row=SimpleNamespace(job_id=7))
+    asyncio.run(AsyncJobRepository(db).update_fields(7, {"task_title": None}))
+    [statement] = db.statements
+    assert str(_compiled(statement)).startswith("SELECT")
+    assert db.commits == 0
+
+
+def test_geo_columns_follow_a_full_coordinate_change():
+    values = _with_geo({"latitude": "53.8008", "longitude": "-1.5491"})
+    cell = _sql(values["geo_cell"])
+    assert "53.8008" in cell and "-1.5491" in cell
+    assert "jobs." not in cell
+    assert _with_geo({"task_title": "Fix tap"}) == {"task_title": "Fix tap"}
+
+
+@pytest.mark.parametrize("changed, value, stored", [
+    ("latitude", "53.8008", "geo_lng"),
+    ("longitude", "-1.5491", "geo_lat"),
+])
+def test_one_coordinate_change_recomputes_the_cell_from_the_stored_other(changed, value, stored):
+    values = _with_geo({changed: value})
+    assert set(values) == {changed, "geo_lat", "geo_lng", "geo_cell"}
+    # The other coordinate is the row's own, read by the UPDATE itself
+    assert values[stored] is getattr(Job, stored)
+    cell = _sql(values["geo_cell"])
+    assert value in cell and f"jobs.{stored}" in cell
+
+
+def test_unparseable_coordinate_clears_the_cell():
+    values = _with_geo({"latitude": "north"})
+    assert _sql(values["geo_lat"]) == "NULL"
+    assert None in _compiled(values["geo_cell"]).params.values()
+
+
+def test_crew_update_sets_only_the_sent_columns_and_refreshes_cache_and_index(monkeypatch):
+    crew = SimpleNamespace(zancrew_id=3, zan_user_id=1003, is_online="true", radius_km=5.0,
+                           latitude="53.8008", longitude="-1.5491", home_lat=None, home_lng=None)
+    invalidated, indexed = [], []
+    monkeypatch.setattr(zan_crew_cache, "invalidate", invalidated.append)
+    monkeypatch.setattr(crew_index, "add", indexed.append)
+
+    db = FakeAsyncSession(row=crew)
+    fields = ZanCrewUpdate(is_online="true", phone=None, city=None).model_dump(exclude_unset=True)
+    assert asyncio.run(AsyncZanCrewRepository(db).update_fields(3, fields)) is crew
+    [statement] = db.statements
+    assert _set_columns(statement) == ["city", "is_online"]
+    assert db.commits == 1
+    assert invalidated == [1003] and indexed == [crew]
+
+
+def test_crew_update_of_a_missing_row_touches_neither_cache_nor_index(monkeypatch):
+    invalidated, indexed = [], []
+    monkeypatch.setattr(zan_crew_cache, "invalidate", invalidated.append)
+    monkeypatch.setattr(crew_index, "add", indexed.append)
+
+    db = FakeAsyncSession(row=None)
+    assert asyncio.run(AsyncZanCrewRepository(db).update_fields(3, {"city": "Leeds"})) is None
+    assert invalidated == [] and indexed == []
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import check_query_plans
+from check_query_plans import PlanRecorder
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+        self.executed = []
+
+    def execute(self, statement, parameters):
+        self.executed.append(statement)
+
+    def fetchone(self):
+        return [json.dumps([{"Plan": self.plan}])]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Hands out a DBAPI cursor whose EXPLAIN returns the given plan"""
+
+    def __init__(self, plan):
+        self.explain = FakeCursor(plan)
+        self.connection = self
+        self.dbapi_connection = self
+
+    def cursor(self):
+        return self.explain
+
+
+def _record(recorder, plan, statement="SELECT * FROM jobs WHERE tags = %(tags)s", executemany=False):
+    conn = FakeConnection(plan)
+    recorder.before_cursor_execute(conn, None, statement, {"tags": "x"}, None, executemany)
+    return conn.explain.executed
+
+
+def _recorder():
+    recorder = PlanRecorder()
+    recorder.max_seq_rows = 1000
+    recorder.table_rows = {"jobs": 5000, "blogs": 10}
+    recorder.label = "JobRepository.get_by_tags"
+    return recorder
+
+
+def test_a_seq_scan_of_a_large_table_is_a_violation():
+    recorder = _recorder()
+    nested = {"Node Type": "Nested Loop", "Plans": [
+        {"Node Type": "Index Scan", "Relation Name": "blogs"},
+        {"Node Type": "Seq Scan", "Relation Name": "jobs"},
+    ]}
+    assert _record(recorder, nested) == ["EXPLAIN (FORMAT JSON) SELECT * FROM jobs WHERE tags = %(tags)s"]
+    assert recorder.statements == 1
+    assert recorder.violations == [
+        ("JobRepository.get_by_tags", "jobs", "SELECT * FROM jobs WHERE tags = %(tags)s")
+    ]
+
+
+def test_small_tables_index_scans_and_unlabelled_statements_pass():
+    recorder = _recorder()
+    _record(recorder, {"Node Type": "Seq Scan", "Relation Name": "blogs"})
+    _record(recorder, {"Node Type": "Index Scan", "Relation Name": "jobs"})
+    assert recorder.statements == 2 and recorder.violations == []
+
+    # Seeding, executemany batches and non-DML statements are never explained
+    recorder.label = None
+    assert _record(recorder, {"Node Type": "Seq Scan", "Relation Name": "jobs"}) == []
+    recorder.label = "seed"
+    assert _record(recorder, {}, executemany=True) == []
+    assert _record(recorder, {}, statement="ANALYZE jobs") == []
+    assert recorder.statements == 2
+
+
+def test_every_repository_query_uses_an_index(database_url):
+    """Runs the full check, so a lookup that loses its index fails the suite"""
+    result = subprocess.run(
+        [sys.executable, check_query_plans.__file__, "--scale", "1500"],
+        cwd=ROOT, capture_output=True, text=True, timeout=300,
+        env=dict(os.environ, DATABASE_URL=database_url, PYTHONPATH=str(ROOT)),
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "No sequential scans over large tables" in result.stdout
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from api.routes.v1.jobs import router as jobs_router
+from api.routes.v1.zan_crew import router as zan_crew_router
+from core.responses import compiled_adapter, compiled_response
+from domain.job.schemas import JobResponse, JobSearchResponse
+from domain.zan_crew.schemas import ZanCrewResponse
+from infrastructure.db.models import Job, ZanCrew
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def _default_body(router, path: str, rows) -> bytes:
+    """The body FastAPI builds from the route's response_model"""
+    route = next(
+        route for route in router.routes
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods
+    )
+    return JSONResponse(asyncio.run(serialize_response(field=route.response_field, response_content=rows))).body
+
+
+def _job(job_id: int, **fields) -> Job:
+    values = dict(
+        job_id=job_id, user_id=7, task_title="Fix a leaking tap", polished_task="Replace the tap washer",
+        location_address="12 High Street, Leeds", latitude="53.8008", longitude="-1.5491",
+        scheduled_at=datetime(2026, 3, 1, 9, 0), duration_hours=1, duration_minutes=30,
+        estimated_cost_pence=4500, people_required=1, actions="repair", tags="Plumbing",
+        payment_mode="card", payment_status="pending", currency="GBP", pickup_adress="",
+        pickup_latitude="", pickup_longitude="", created_at=datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc),
+    )
+    values.update(fields)
+    return Job(**values)
+
+
+def _crew(zancrew_id: int, **fields) -> ZanCrew:
+    values = dict(zancrew_id=zancrew_id, phone=f"+4470000{zancrew_id:05d}", zan_user_id=zancrew_id,
+                  created_at=datetime(2026, 1, 1, 12, 30))
+    values.update(fields)
+    return ZanCrew(**values)
+
+
+JOBS = [
+    # Every optional field left None
+    _job(1),
+    _job(2, assigned_zancrew_user_id=9, short_title="Tap", imp_notes="Ring the bell\nthen wait",
+         bucket="plumbing", chat_room_id="1e5f00d2", updated_at=datetime(2026, 1, 2, 8, 0, 0, 500, tzinfo=IST)),
+    _job(3, task_title='Fit a "smart" thermostat – 2nd floor ☎', scheduled_at=datetime(2026, 3, 1, 9, 0, 0, 123456)),
+]
+
+CREW = [
+    _crew(1),
+    _crew(2, city="Kochi", radius_km=12.5, face_match_score=0.97, birth_date=datetime(1990, 5, 17),
+          updated_at=datetime(2026, 1, 3, 23, 59, 59, 999999, tzinfo=timezone.utc)),
+    _crew(3, pan_name="ÅSHA RAO", radius_km=3.0, face_match_score=1 / 3, updated_at=datetime(2026, 1, 4, tzinfo=IST)),
+]
+
+
+def test_job_pages_match_the_default_response_bytes():
+    assert compiled_response(JOBS, List[JobResponse]).body == _default_body(jobs_router, "/jobs", JOBS)
+    assert compiled_response([], List[JobResponse]).body == _default_body(jobs_router, "/jobs", []) == b"[]"
+
+
+def test_crew_pages_match_the_default_response_bytes():
+    assert compiled_response(CREW, List[ZanCrewResponse]).body == _default_body(zan_crew_router, "/zan-crew", CREW)
+
+
+@pytest.mark.parametrize("value", [0.0, 0.0001, 9.99e-05, 1e-05, 1.5e-07, -1e-05, 9.9e15, 1e16, 1.2e16, 1e300])
+def test_floats_are_written_as_the_json_module_writes_them(value):
+    crew = [_crew(1, radius_km=value, face_match_score=None)]
+    assert compiled_response(crew, List[ZanCrewResponse]).body == _default_body(zan_crew_router, "/zan-crew", crew)
+
+    job = _job(1)
+    job.rank = value
+    compiled = compiled_response([job], List[JobSearchResponse]).body
+    assert compiled == _default_body(jobs_router, "/jobs/search", [job])
+
+
+def test_ordinary_pages_skip_the_stdlib_encoder(monkeypatch):
+    adapter = compiled_adapter(List[ZanCrewResponse])
+    monkeypatch.setattr(type(adapter), "dump_python", lambda *args, **kwargs: pytest.fail("re-encoded"))
+    compiled_response(CREW, List[ZanCrewResponse])
+
+
+def test_infinity_is_rejected_as_on_the_default_path():
+    crew = [_crew(1, radius_km=float("inf"))]
+    with pytest.raises(ValueError, match="Out of range float values"):
+        _default_body(zan_crew_router, "/zan-crew", crew)
+    with pytest.raises(ValueError, match="Out of range float values"):
+        compiled_response(crew, List[ZanCrewResponse])
@@ -0,0 +1,213 @@
+import asyncio
+from typing import List
+
+import httpx
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from pydantic import BaseModel, ConfigDict, field_validator
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from core.db import AsyncLazySession, LazySession
+from core.responses import compiled_response
+from core.routing import SessionRoute, track_session
+
+
+# What happened to the connection, session and response, in order
+EVENTS = []
+
+
+class Row(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    job_id: int
+
+    @field_validator("job_id")
+    @classmethod
+    def serialized(cls, value):
+        EVENTS.append("serialize")
+        return value
+
+
+@pytest.fixture
+def events():
+    EVENTS.clear()
+    return EVENTS
+
+
+@pytest.fixture
+def engine(events):
+    engine = create_engine("sqlite://")
+    event.listen(engine, "checkout", lambda *args: events.append("checkout"))
+    event.listen(engine, "checkin", lambda *args: events.append("checkin"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine, events):
+    factory = sessionmaker(bind=engine)
+    event.listen(factory, "after_commit", lambda session: events.append("commit"))
+    return factory
+
+
+class FakeAsyncSession:
+    def __init__(self, events, info):
+        self.events = events
+        self.info = info
+
+    async def execute(self, statement):
+        self.events.append("execute")
+
+    async def commit(self):
+        self.events.append("commit")
+
+    async def close(self):
+        self.events.append("close")
+
+    def add(self, instance):
+        self.events.append("add")
+
+
+def test_first_attribute_access_opens_the_session(session_factory):
+    opened = []
+    db = LazySession(lambda: opened.append(session_factory()) or opened[-1])
+    assert opened == []
+    assert db.info == {}
+    assert len(opened) == 1
+    db.execute(text("select 1"))
+    assert len(opened) == 1 and db.bind is opened[0].bind
+    db.close()
+
+
+def test_untouched_session_never_checks_out_a_connection(session_factory, events):
+    db = LazySession(session_factory)
+    db.release()
+    db.close()
+    assert events == []
+
+    # Touched, the connection goes back on release, not on close
+    db = LazySession(session_factory)
+    db.execute(text("select 1"))
+    db.release()
+    assert events == ["checkout", "commit", "checkin"]
+    db.close()
+    assert events == ["checkout", "commit", "checkin"]
+
+
+def test_async_session_opens_on_the_first_awaited_call(events):
+    opened = []
+
+    async def open_session(info):
+        opened.append(info)
+        return FakeAsyncSession(events, info)
+
+    async def scenario():
+        untouched = AsyncLazySession(open_session, lambda info: None, {"replica": True})
+        assert untouched.info == {"replica": True}
+        await untouched.release()
+        await untouched.close()
+        assert opened == [] and events == []
+
+        db = AsyncLazySession(open_session, lambda info: None, {"replica": True})
+        call = db.execute("select 1")
+        assert opened == []
+        await call
+        await db.execute("select 2")
+        await db.release()
+        await db.close()
+        assert opened == [{"replica": True}]
+        assert events == ["execute", "execute", "commit", "close"]
+
+    asyncio.run(scenario())
+
+
+def test_async_session_serves_sync_calls_from_the_fallback(events):
+    async def open_session(info):
+        raise AssertionError("a sync call must not wait for the replica")
+
+    db = AsyncLazySession(open_session, lambda info: FakeAsyncSession(events, info), {"replica": True})
+    db.add(object())
+    assert events == ["add"] and db.info == {"replica": True}
+    asyncio.run(db.commit())
+    assert events == ["add", "commit"]
+
+
+def _app(session_factory, events):
+    def get_db():
+        db = track_session(LazySession(session_factory))
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def open_session(info):
+        return FakeAsyncSession(events, info)
+
+    async def get_async_db():
+        db = track_session(AsyncLazySession(open_session, lambda info: None))
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    router = APIRouter(route_class=SessionRoute)
+
+    @router.get("/compiled", response_model=List[Row])
+    def compiled(db=Depends(get_db, scope="function")):
+        rows = db.execute(text("select 1 as job_id union all select 2")).all()
+        return compiled_response(rows, List[Row])
+
+    @router.get("/default", response_model=List[Row])
+    def default(db=Depends(get_db, scope="function")):
+        return db.execute(text("select 1 as job_id")).all()
+
+    @router.get("/async", response_model=List[Row])
+    async def async_compiled(db=Depends(get_async_db, scope="function")):
+        await db.execute("select 1")
+        return compiled_response([{"job_id": 1}], List[Row])
+
+    @router.get("/untouched", response_model=List[Row])
+    def untouched(db=Depends(get_db, scope="function")):
+        return compiled_response([], List[Row])
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def recording(scope, receive, send):
+        async def recorded_send(message):
+            if message["type"] == "http.response.start":
+                events.append("sent")
+            await send(message)
+        await app(scope, receive, recorded_send)
+    return recording
+
+
+async def _get(app, path: str):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path)
+
+
+def test_release_commits_before_the_compiled_body_and_the_response(session_factory, events):
+    response = asyncio.run(_get(_app(session_factory, events), "/compiled"))
+    assert response.json() == [{"job_id": 1}, {"job_id": 2}]
+    assert response.headers["content-length"] == str(len(response.content))
+    assert events == ["checkout", "commit", "checkin", "serialize", "serialize", "sent"]
+
+
+def test_release_commits_before_default_serialization(session_factory, events):
+    response = asyncio.run(_get(_app(session_factory, events), "/default"))
+    assert response.json() == [{"job_id": 1}]
+    assert events == ["checkout", "commit", "checkin", "serialize", "sent"]
+
+
+def test_async_release_commits_before_the_compiled_body(session_factory, events):
+    response = asyncio.run(_get(_app(session_factory, events), "/async"))
+    assert response.json() == [{"job_id": 1}]
+    assert events == ["execute", "commit", "serialize", "close", "sent"]
+
+
+def test_untouched_request_session_never_checks_out_a_connection(session_factory, events):
+    response = asyncio.run(_get(_app(session_factory, events), "/untouched"))
+    assert response.json() == []
+    assert events == ["sent"]
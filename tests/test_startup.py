@@ -0,0 +1,155 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import core.db
+import core.startup
+import main
+from core.db import build_async_url
+from core.startup import SchemaVersionError, database_revisions, migration_heads
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAD = "add_jobs_listing_indexes"
+
+
+class FakeEngine:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+        log.append(("create", name))
+
+    def dispose(self):
+        self.log.append(("dispose", self.name))
+
+
+class FakeAsyncEngine(FakeEngine):
+    async def dispose(self):
+        self.log.append(("dispose", self.name))
+
+
+class FakeCrewIndex:
+    async def refresh_periodically(self, session_factory, seconds):
+        await asyncio.Event().wait()
+
+
+@pytest.fixture
+def startup(monkeypatch):
+    """The real lifespan over fake engines, with the database work around them logged"""
+    log = []
+
+    def logged(name):
+        async def call(*args):
+            log.append(name)
+        return call
+
+    monkeypatch.setattr(core.db, "REPLICA_ENABLED", False)
+    monkeypatch.setattr(core.db, "_create_engine", lambda url, name: FakeEngine(name, log))
+    monkeypatch.setattr(core.db, "_create_async_engine", lambda url, name: FakeAsyncEngine(name, log))
+    for name in ("_engine", "_async_engine", "_replica_engine", "_async_replica_engine"):
+        monkeypatch.setattr(core.db, name, None)
+    for name in ("SessionLocal", "ReplicaSessionLocal"):
+        monkeypatch.setattr(core.db, name, sessionmaker())
+    for name in ("AsyncSessionLocal", "AsyncReplicaSessionLocal"):
+        monkeypatch.setattr(core.db, name, async_sessionmaker())
+    monkeypatch.setattr(core.startup, "database_revisions", logged("database_revisions"))
+    monkeypatch.setattr(core.startup, "SCHEMA_CHECK", "off")
+    monkeypatch.setattr(main, "prewarm_pools", logged("prewarm_pools"))
+    monkeypatch.setattr(main, "warm_crew_index", logged("warm_crew_index"))
+    monkeypatch.setattr(main, "close_supabase_pool", logged("close_supabase_pool"))
+    monkeypatch.setattr(main, "crew_index", FakeCrewIndex())
+    monkeypatch.setattr(main, "SUPABASE_JWT_SECRET", "secret")
+    return log
+
+
+async def _serve(requests: int = 3):
+    """Start the app, serve some requests and shut it down, as a server would"""
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            for _ in range(requests):
+                assert (await client.get("/")).status_code == 200
+                # Request handlers reach the engines through the idempotent getters
+                core.db.get_async_engine()
+        refresh = main.app.state.crew_index_refresh
+    await asyncio.sleep(0)
+    return refresh
+
+
+def test_each_lifespan_creates_and_disposes_the_engines_once(startup):
+    lifespans = [
+        ("create", "primary"), ("create", "primary_async"), "prewarm_pools", "warm_crew_index",
+        "close_supabase_pool", ("dispose", "primary_async"), ("dispose", "primary"),
+    ]
+    refresh = asyncio.run(_serve())
+    assert startup == lifespans
+    assert refresh.cancelled()
+    assert core.db._engine is None and core.db._async_engine is None
+
+    # A second run in the same process starts afresh
+    asyncio.run(_serve())
+    assert startup == lifespans * 2
+
+
+@pytest.mark.parametrize("schema_check, current, fails", [
+    ("strict", {"add_jobs_search_columns"}, True),
+    ("strict", set(), True),
+    ("strict", {HEAD}, False),
+    ("warn", {"add_jobs_search_columns"}, False),
+    ("off", {"add_jobs_search_columns"}, False),
+])
+def test_the_schema_check_at_startup(startup, monkeypatch, capsys, schema_check, current, fails):
+    async def revisions():
+        startup.append("database_revisions")
+        return current
+
+    monkeypatch.setattr(core.startup, "SCHEMA_CHECK", schema_check)
+    monkeypatch.setattr(core.startup, "database_revisions", revisions)
+    if fails:
+        with pytest.raises(SchemaVersionError, match=f"expected alembic head {HEAD}. Run `alembic upgrade head`"):
+            asyncio.run(_serve())
+        # Nothing is warmed or served on a stale schema
+        assert "prewarm_pools" not in startup
+        return
+    asyncio.run(_serve())
+    assert "prewarm_pools" in startup
+    assert ("database_revisions" in startup) is (schema_check != "off")
+    assert ("Warning: Database schema is at add_jobs_search_columns" in capsys.readouterr().out) is (
+        schema_check == "warn"
+    )
+
+
+def test_the_migration_scripts_have_one_head():
+    assert migration_heads() == {HEAD}
+
+
+def test_the_test_database_is_at_the_migration_head(database_url, monkeypatch):
+    async def revisions():
+        url, connect_args = build_async_url(database_url)
+        engine = create_async_engine(url, connect_args=connect_args)
+        monkeypatch.setattr(core.startup, "get_async_engine", lambda: engine)
+        try:
+            return await database_revisions()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(revisions()) == migration_heads()
+
+
+def test_importing_main_creates_no_engine():
+    script = (
+        "import sys, sqlalchemy, sqlalchemy.ext.asyncio\n"
+        "def refuse(*args, **kwargs):\n"
+        "    raise AssertionError('engine created at import')\n"
+        "sqlalchemy.create_engine = sqlalchemy.ext.asyncio.create_async_engine = refuse\n"
+        "import main, core.db\n"
+        "assert core.db._engine is None and core.db._async_engine is None\n"
+        "loaded = sorted(m for m in sys.modules if m.split('.')[0] in ('psycopg2', 'asyncpg', 'supabase'))\n"
+        "assert not loaded, loaded\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr